@@ -0,0 +1,543 @@
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<45} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def bench_occupancy():
+    """Occupancy index at semester scale (100k+ events)."""
+    from services.occupancy import GROUP, ROOM, TEACHER, Booking, OccupancyIndex
+
+    rng = random.Random(42)
+    n_events, n_rooms, n_courses, n_days = 120_000, 150, 3_000, 120
+    slot_ids = list(range(1, 8))
+    origin = date(2025, 10, 1)
+    course_owners = {c: (rng.randrange(400), rng.randrange(600)) for c in range(n_courses)}
+    bookings = [
+        Booking(
+            rng.randrange(n_courses),
+            rng.randrange(n_rooms),
+            origin + timedelta(days=rng.randrange(n_days)),
+            rng.choice(slot_ids),
+        )
+        for _ in range(n_events)
+    ]
+
+    print(f"occupancy: {n_events} events, {n_rooms} rooms, {n_courses} courses, {n_days} days")
+    index = timed("build index", lambda: OccupancyIndex.build(bookings, slot_ids, course_owners))
+
+    probes = [(rng.randrange(n_rooms), origin + timedelta(days=rng.randrange(n_days)), rng.choice(slot_ids)) for _ in range(10_000)]
+    timed("10k room conflict checks", lambda: [index.is_busy(ROOM, r, d, s) for r, d, s in probes])
+    timed("10k teacher+group conflict checks", lambda: [
+        index.is_busy(TEACHER, r, d, s) or index.is_busy(GROUP, r, d, s) for r, d, s in probes
+    ])
+    room_ids = list(range(n_rooms))
+    timed("1k free-room lookups over all rooms", lambda: [index.free_rooms(room_ids, d, s) for _, d, s in probes[:1000]])
+    timed("1k incremental add/remove", lambda: [
+        (index.apply(b, 1), index.apply(b, -1)) for b in bookings[:1000]
+    ])
+    fresh = OccupancyIndex.build(bookings, slot_ids, course_owners)
+    mismatches = timed("consistency diff against a fresh load", lambda: index.diff(fresh))
+    print(f"  mismatches: {len(mismatches)}")
+
+
+def bench_recommendations_insert():
+    """Writing generated recommendations: one flush per row vs one INSERT ... ON CONFLICT."""
+    from model import Base, ChangeRecomendation, Room
+    from services.recommendation_engine import Candidate, save_recommendations, save_recommendations_one_by_one
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    origin = date(2025, 10, 1)
+    rooms = [Room(id=room_id) for room_id in range(1, 51)]
+
+    def candidates(n):
+        return [
+            Candidate(origin + timedelta(days=i // 350), i // 50 % 7 + 1, rooms[i % 50], score=1.0 / (i + 1))
+            for i in range(n)
+        ]
+
+    def run(save, batch, prefill=0):
+        with session_factory() as db:
+            if prefill:
+                save(db, 1, batch[:prefill])
+            saved = save(db, 1, batch)
+            db.rollback()
+        return saved
+
+    print(f"recommendations insert ({engine.dialect.name})")
+    for n in (10, 100, 1000):
+        batch = candidates(n)
+        timed(f"{n} rows, flush per row", lambda: run(save_recommendations_one_by_one, batch), repeat=3)
+        timed(f"{n} rows, bulk insert", lambda: run(save_recommendations, batch), repeat=3)
+        saved = timed(f"{n} rows, bulk insert, half already stored", lambda: run(save_recommendations, batch, n // 2), repeat=3)
+        print(f"  rows returned by the last run: {len(saved)} (+{n // 2} prefilled)")
+    assert not session_factory().query(ChangeRecomendation).count()
+
+
+def bench_export():
+    """Streaming timetable export (Core rows, server-side cursor) vs loading the ORM graph."""
+    import os
+    import tempfile
+    import tracemalloc
+    from datetime import time as clock_time
+
+    from model import Base, Course, CourseEvent, Group, Room, RoomType, TimeSlots, User, UserRole
+    from services.export import encode_csv, encode_ndjson, stream_event_batches
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session, joinedload
+
+    n_events, n_rooms, n_courses = 200_000, 100, 1_000
+    path = os.path.join(tempfile.mkdtemp(), "export.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(7)
+    origin = date(2022, 10, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"u{i}@example.com", "password": "x", "name": f"Imie{i}", "surname": f"Nazwisko{i}",
+             "role": UserRole.PROWADZACY}
+            for i in range(1, 201)
+        ])
+        conn.execute(insert(Group), [{"id": i, "name": f"Grupa {i}", "leader_id": i} for i in range(1, 201)])
+        conn.execute(insert(Room), [
+            {"id": i, "name": f"Sala {i}", "capacity": 30, "type": RoomType.LECTURE_HALL} for i in range(1, n_rooms + 1)
+        ])
+        conn.execute(insert(TimeSlots), [
+            {"id": i, "start_time": clock_time(7 + i), "end_time": clock_time(8 + i)} for i in range(1, 8)
+        ])
+        conn.execute(insert(Course), [
+            {"id": i, "name": f"Kurs {i}", "teacher_id": rng.randint(1, 200), "group_id": rng.randint(1, 200)}
+            for i in range(1, n_courses + 1)
+        ])
+        # Unikalne (sala, dzień, slot): kolejne komórki siatki
+        conn.execute(insert(CourseEvent), [
+            {"course_id": rng.randint(1, n_courses), "room_id": i % n_rooms + 1,
+             "day": origin + timedelta(days=i // (n_rooms * 7)), "time_slot_id": i // n_rooms % 7 + 1,
+             "canceled": False, "was_rescheduled": False}
+            for i in range(n_events)
+        ])
+
+    def measure(label, fn):
+        started = time.perf_counter()
+        count = fn()
+        elapsed = time.perf_counter() - started
+        # Osobny przebieg pod tracemalloc, który sam spowalnia kilkukrotnie
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {label:<45} {elapsed * 1000:10.2f} ms {count / elapsed:12,.0f} rows/s  peak {peak / 2**20:7.1f} MiB")
+
+    def consume(encoder):
+        rows = 0
+
+        def counted(batches):
+            nonlocal rows
+            for batch in batches:
+                rows += len(batch)
+                yield batch
+
+        for _ in encoder(counted(stream_event_batches(bind=engine))):
+            pass
+        return rows
+
+    def load_orm():
+        with Session(engine) as db:
+            return len(db.query(CourseEvent).options(
+                joinedload(CourseEvent.course).joinedload(Course.teacher),
+                joinedload(CourseEvent.course).joinedload(Course.group),
+                joinedload(CourseEvent.room),
+            ).all())
+
+    print(f"export: {n_events} events ({engine.dialect.name})")
+    measure("stream CSV", lambda: consume(encode_csv))
+    measure("stream NDJSON", lambda: consume(encode_ndjson))
+    measure("ORM load of all events (previous path)", load_orm)
+    engine.dispose()
+    os.remove(path)
+
+
+def bench_import():
+    """Bulk CSV import (one conflict query + executemany/COPY) vs adding ORM objects one by one."""
+    import io
+    import os
+    import tempfile
+    from datetime import time as clock_time
+
+    from model import Base, Course, CourseEvent, Group, Room, RoomType, TimeSlots, User, UserRole
+    from services.event_import import import_events
+    from sqlalchemy import create_engine, delete, insert
+    from sqlalchemy.orm import Session
+
+    n_rows, n_rooms, n_courses = 100_000, 100, 2_000
+    path = os.path.join(tempfile.mkdtemp(), "import.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    origin = date(2030, 10, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"u{i}@example.com", "password": "x", "name": f"Imie{i}", "surname": f"Nazwisko{i}",
+             "role": UserRole.PROWADZACY}
+            for i in range(1, n_courses + 1)
+        ])
+        conn.execute(insert(Group), [{"id": i, "name": f"Grupa {i}", "leader_id": i} for i in range(1, n_courses + 1)])
+        conn.execute(insert(Room), [
+            {"id": i, "name": f"Sala {i}", "capacity": 30, "type": RoomType.LECTURE_HALL} for i in range(1, n_rooms + 1)
+        ])
+        conn.execute(insert(TimeSlots), [
+            {"id": i, "start_time": clock_time(7 + i), "end_time": clock_time(8 + i)} for i in range(1, 8)
+        ])
+        # Kurs i ma własnego prowadzącego i grupę, więc konflikty dają tylko sale
+        conn.execute(insert(Course), [
+            {"id": i, "name": f"Kurs {i}", "teacher_id": i, "group_id": i} for i in range(1, n_courses + 1)
+        ])
+
+    # Kolejne komórki (sala, dzień, slot), kurs zmienia się z każdym dniem i salą
+    rows = [
+        (i // (n_rooms * 7) * 7 % n_courses + i % n_rooms + 1, i % n_rooms + 1,
+         origin + timedelta(days=i // (n_rooms * 7)), i // n_rooms % 7 + 1)
+        for i in range(n_rows)
+    ]
+    csv_text = "course,room,day,slot\n" + "".join(
+        f"{course},Sala {room},{day.isoformat()},{slot}\n" for course, room, day, slot in rows
+    )
+
+    def reset():
+        with engine.begin() as conn:
+            conn.execute(delete(CourseEvent))
+
+    def run_import():
+        with Session(engine) as db:
+            report = import_events(db, io.StringIO(csv_text))
+            db.commit()
+        assert report.imported == n_rows, report.errors[:3]
+
+    # Ścieżka wiersz po wierszu jest o rzędy wielkości wolniejsza: mierzona na próbce
+    sample = rows[:5_000]
+
+    def run_orm():
+        with Session(engine) as db:
+            for course, room, day, slot in sample:
+                db.add(CourseEvent(course_id=course, room_id=room, day=day, time_slot_id=slot))
+                db.flush()
+            db.commit()
+
+    print(f"import: {n_rows} rows ({engine.dialect.name})")
+    timed("import_events (CSV, atomic)", run_import)
+    reset()
+    started = time.perf_counter()
+    run_orm()
+    elapsed = (time.perf_counter() - started) * n_rows / len(sample)
+    print(f"  {'ORM add + flush per row (previous path)':<45} {elapsed:10.2f} s (scaled from {len(sample)} rows)")
+    engine.dispose()
+    os.remove(path)
+
+
+def bench_room_assignment():
+    """Room auto-assignment: min-cost matching per (day, slot), in-process vs a process pool."""
+    from services.room_assignment import Cell, solve_cells
+
+    n_days, n_slots, n_events, n_rooms = 120, 7, 40, 150
+    rng = random.Random(11)
+    rooms = [(room_id, rng.choice([20, 30, 45, 60, 90, 120, 200]), rng.getrandbits(6)) for room_id in range(n_rooms)]
+    origin = date(2030, 10, 1)
+    cells = [
+        Cell(origin + timedelta(days=day), slot,
+             [(day * 10_000 + slot * 100 + i, rng.randint(10, 150), rng.choice([0, 0, 1, 2, 5])) for i in range(n_events)],
+             rng.sample(rooms, n_rooms - rng.randint(0, 40)))
+        for day in range(n_days) for slot in range(n_slots)
+    ]
+    print(f"room_assignment: {len(cells)} cells x {n_events} events x ~{n_rooms} rooms")
+    for workers in (1, 4):
+        solutions, shards = timed(f"solve_cells(workers={workers})", lambda: solve_cells(cells, workers))
+        placed = sum(len(solution.assigned) for solution in solutions)
+        print(f"    {shards} shard(s), {placed} placed, {len(cells) * n_events - placed} unassigned")
+
+
+def bench_utilization():
+    """Utilization analytics over a semester: vectorized report, then a cached repeat."""
+    import os
+    import tempfile
+    from datetime import time as clock_time
+
+    from model import Base, Course, CourseEvent, Group, Room, RoomType, TimeSlots, User, UserRole
+    from services.utilization import compute_utilization, get_utilization
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session
+
+    n_events, n_rooms, n_courses = 100_000, 150, 1_000
+    path = os.path.join(tempfile.mkdtemp(), "utilization.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(5)
+    origin = date(2030, 10, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"u{i}@example.com", "password": "x", "name": "Imie", "surname": "Nazwisko",
+             "role": UserRole.PROWADZACY}
+            for i in range(1, 201)
+        ])
+        conn.execute(insert(Group), [
+            {"id": i, "name": f"Grupa {i}", "leader_id": i, "size": rng.randint(10, 120)} for i in range(1, 201)
+        ])
+        conn.execute(insert(Room), [
+            {"id": i, "name": f"Sala {i}", "capacity": rng.choice([20, 30, 60, 120, 200]), "type": rng.choice(list(RoomType))}
+            for i in range(1, n_rooms + 1)
+        ])
+        conn.execute(insert(TimeSlots), [
+            {"id": i, "start_time": clock_time(7 + i), "end_time": clock_time(8 + i)} for i in range(1, 8)
+        ])
+        conn.execute(insert(Course), [
+            {"id": i, "name": f"Kurs {i}", "teacher_id": rng.randint(1, 200), "group_id": rng.randint(1, 200)}
+            for i in range(1, n_courses + 1)
+        ])
+        conn.execute(insert(CourseEvent), [
+            {"course_id": rng.randint(1, n_courses), "room_id": i % n_rooms + 1,
+             "day": origin + timedelta(days=i // (n_rooms * 7)), "time_slot_id": i // n_rooms % 7 + 1,
+             "canceled": False, "was_rescheduled": False}
+            for i in range(n_events)
+        ])
+    date_to = origin + timedelta(days=n_events // (n_rooms * 7))
+
+    print(f"utilization: {n_events} events, {n_rooms} rooms ({engine.dialect.name})")
+    with Session(engine) as db:
+        timed("compute_utilization (one read + NumPy)", lambda: compute_utilization(db, origin, date_to), repeat=3)
+        get_utilization(db, origin, date_to)
+        timed("get_utilization (cached window)", lambda: get_utilization(db, origin, date_to), repeat=20)
+    engine.dispose()
+    os.remove(path)
+
+
+def bench_auth_concurrency():
+    """p99 of /auth/me while 50 logins run at once: bcrypt inline on the event loop vs in the hashing pool."""
+    import asyncio
+    import os
+    import tempfile
+
+    import httpx
+    from database import get_async_db, get_db
+    from fastapi import Depends, Form, HTTPException
+    from main import app
+    from model import Base, User, UserRole
+    from routers.auth import create_access_token, get_password_hash, verify_password
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import Session, sessionmaker
+
+    n_logins = 50
+    path = os.path.join(tempfile.mkdtemp(), "auth.db")
+    # Stara ścieżka trzyma połączenie na każde logowanie, a zablokowana pętla nie pozwala ich oddać:
+    # przy domyślnej puli (5 + 10) 50 logowań zakleszcza się do pool_timeout
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=n_logins + 5)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(email="bench@example.com", password=get_password_hash("bench123"), name="Bench", surname="Mark",
+                    role=UserRole.ADMIN))
+        db.commit()
+    factory = sessionmaker(bind=engine, autoflush=False)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=n_logins + 5)
+    async_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def bench_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def bench_async_db():
+        async with async_factory() as db:
+            yield db
+
+    # Dotychczasowa implementacja logowania: zapytanie i bcrypt bezpośrednio w async def
+    async def blocking_login(username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+        user = db.query(User).filter(User.email == username).first()
+        if not user or not verify_password(password, user.password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    app.dependency_overrides[get_db] = bench_db
+    app.dependency_overrides[get_async_db] = bench_async_db
+    app.add_api_route("/bench/blocking-login", blocking_login, methods=["POST"])
+    me_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.com'})}"}
+    credentials = {"username": "bench@example.com", "password": "bench123"}
+
+    async def scenario(login_path):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/auth/me", headers=me_headers)
+            latencies = []
+            logins = [asyncio.create_task(client.post(login_path, data=credentials)) for _ in range(n_logins)]
+            started = time.perf_counter()
+            while not all(task.done() for task in logins):
+                sent = time.perf_counter()
+                response = await client.get("/auth/me", headers=me_headers)
+                assert response.status_code == 200, response.text
+                latencies.append(time.perf_counter() - sent)
+            elapsed = time.perf_counter() - started
+            assert all(task.result().status_code == 200 for task in logins)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        return len(latencies), p50, p99, elapsed
+
+    print(f"auth_concurrency: /auth/me during {n_logins} parallel logins")
+    try:
+        for label, login_path in (("bcrypt on the event loop (previous)", "/bench/blocking-login"),
+                                  ("bcrypt in the hashing pool", "/auth/token/")):
+            count, p50, p99, elapsed = asyncio.run(scenario(login_path))
+            print(f"  {label:<45} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  ({count} requests, logins done in {elapsed:.2f} s)")
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_async_db, None)
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+        os.remove(path)
+
+
+def bench_async_db():
+    """Throughput of one page of /courses/events/all-style reads: sync Session in the threadpool vs AsyncSession."""
+    import asyncio
+    import os
+    import tempfile
+    from datetime import time as clock_time
+
+    import httpx
+    from fastapi import Depends, FastAPI
+    from model import Base, Course, CourseEvent, Group, Room, RoomType, TimeSlots, User, UserRole
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import Session, joinedload, sessionmaker
+
+    n_events, n_requests, concurrency, page = 20_000, 600, 64, 100
+    path = os.path.join(tempfile.mkdtemp(), "async.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=concurrency)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=concurrency)
+    Base.metadata.create_all(engine)
+    rng = random.Random(3)
+    origin = date(2030, 10, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"u{i}@example.com", "password": "x", "name": "Imie", "surname": "Nazwisko",
+             "role": UserRole.PROWADZACY}
+            for i in range(1, 101)
+        ])
+        conn.execute(insert(Group), [{"id": i, "name": f"Grupa {i}", "leader_id": i} for i in range(1, 101)])
+        conn.execute(insert(Room), [
+            {"id": i, "name": f"Sala {i}", "capacity": 30, "type": RoomType.LECTURE_HALL} for i in range(1, 51)
+        ])
+        conn.execute(insert(TimeSlots), [
+            {"id": i, "start_time": clock_time(7 + i), "end_time": clock_time(8 + i)} for i in range(1, 8)
+        ])
+        conn.execute(insert(Course), [
+            {"id": i, "name": f"Kurs {i}", "teacher_id": rng.randint(1, 100), "group_id": rng.randint(1, 100)}
+            for i in range(1, 501)
+        ])
+        conn.execute(insert(CourseEvent), [
+            {"course_id": rng.randint(1, 500), "room_id": i % 50 + 1, "day": origin + timedelta(days=i // 350),
+             "time_slot_id": i // 50 % 7 + 1, "canceled": False, "was_rescheduled": False}
+            for i in range(n_events)
+        ])
+
+    factory = sessionmaker(bind=engine, autoflush=False)
+    async_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def page_stmt(offset_day):
+        return select(CourseEvent).options(
+            joinedload(CourseEvent.course).joinedload(Course.teacher),
+            joinedload(CourseEvent.course).joinedload(Course.group).joinedload(Group.leader),
+            joinedload(CourseEvent.room),
+        ).where(CourseEvent.day >= origin + timedelta(days=offset_day)).order_by(
+            CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.id
+        ).limit(page)
+
+    def sync_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def async_db():
+        async with async_factory() as db:
+            yield db
+
+    bench_app = FastAPI()
+
+    @bench_app.get("/sync/{offset_day}")
+    def sync_page(offset_day: int, db: Session = Depends(sync_db)):
+        return len(db.execute(page_stmt(offset_day)).unique().scalars().all())
+
+    @bench_app.get("/async/{offset_day}")
+    async def async_page(offset_day: int, db: AsyncSession = Depends(async_db)):
+        return len((await db.execute(page_stmt(offset_day))).unique().scalars().all())
+
+    async def run(prefix):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        transport = httpx.ASGITransport(app=bench_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def one(i):
+                async with semaphore:
+                    sent = time.perf_counter()
+                    response = await client.get(f"{prefix}/{i % 50}")
+                    assert response.json() == page
+                    latencies.append(time.perf_counter() - sent)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(n_requests)))
+            elapsed = time.perf_counter() - started
+        latencies.sort()
+        return n_requests / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+    print(f"async_db: {n_requests} page reads ({page} events each), {concurrency} in flight ({engine.dialect.name})")
+    try:
+        for label, prefix in (("sync Session (threadpool)", "/sync"), ("AsyncSession", "/async")):
+            throughput, p50, p99 = asyncio.run(run(prefix))
+            print(f"  {label:<45} {throughput:8.1f} req/s  p50 {p50:8.2f} ms  p99 {p99:8.2f} ms")
+    finally:
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+        os.remove(path)
+
+
+BENCHMARKS = {
+    "occupancy": bench_occupancy,
+    "recommendations_insert": bench_recommendations_insert,
+    "export": bench_export,
+    "import": bench_import,
+    "room_assignment": bench_room_assignment,
+    "utilization": bench_utilization,
+    "auth_concurrency": bench_auth_concurrency,
+    "async_db": bench_async_db,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        print(f"Available: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
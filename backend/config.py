@@ -1,5 +1,5 @@
-import os
 from functools import lru_cache
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -9,19 +9,94 @@ class Settings(BaseSettings):
     Central settings management for the application.
     Loads variables from environment variables, which are injected by Docker Compose.
     """
-    # === KLUCZOWA ZMIANA TUTAJ ===
-    # Ta linia mówi: "Spróbuj znaleźć DATABASE_URL_UNPOOLED. Jeśli jej nie ma,
-    # poszukaj standardowej DATABASE_URL". Dzięki temu kod działa
-    # zarówno na Vercelu, jak i lokalnie w Dockerze.
-    DATABASE_URL: str = os.environ.get("DATABASE_URL_UNPOOLED", os.environ.get("DATABASE_URL"))
-    # === KONIEC KLUCZOWEJ ZMIANY ===
+    # DATABASE_URL może prowadzić przez zewnętrzny pooler (np. na Vercelu),
+    # DATABASE_URL_UNPOOLED to bezpośrednie połączenie z bazą. Którego używamy,
+    # zależy od DB_POOL_MODE, patrz `database_url`.
+    DATABASE_URL: Optional[str] = None
+    DATABASE_URL_UNPOOLED: Optional[str] = None
+
+    # Pula połączeń, osobno dla silnika sync i async w każdym procesie.
+    # DB_POOL_MODE=null: bez puli, połączenie na checkout (za zewnętrznym poolerem, np. PgBouncer)
+    DB_POOL_MODE: Literal["queue", "null"] = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
 
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 # 24 godziny
+    # Cache zalogowanych użytkowników w get_current_user (na proces)
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_SIZE: int = 1024
+    # Kursy prowadzone i grupy kierowane przez użytkownika (sprawdzanie uprawnień do zgłoszeń)
+    AUTHZ_CACHE_TTL_SECONDS: int = 300
+    AUTHZ_CACHE_SIZE: int = 1024
+    # Oba cache'e są per proces; zmiany z innych workerów widać po odczycie wersji
+    # z cache_versions, robionym najwyżej raz na tyle sekund (tyle może trwać
+    # używanie odebranych uprawnień lub konta dezaktywowanego w innym procesie)
+    CACHE_VERSION_CHECK_SECONDS: float = 1.0
+    # Wątki do bcrypt (0 = min(4, liczba rdzeni))
+    PASSWORD_HASH_WORKERS: int = 0
+
+    # Indeks zajętości jest trzymany w pamięci procesu, więc co jakiś czas
+    # przeładowujemy go z bazy, żeby zobaczyć zmiany z innych workerów.
+    OCCUPANCY_INDEX_TTL_SECONDS: int = 300
+    EQUIPMENT_MASKS_TTL_SECONDS: int = 300
+    UNAVAILABILITY_INDEX_TTL_SECONDS: int = 300
+
+    # Ile najlepszych rekomendacji zapisujemy dla jednego zgłoszenia i wagi oceny
+    RECOMMENDATION_TOP_K: int = 20
+    RECOMMENDATION_WEIGHT_CAPACITY: float = 1.0
+    RECOMMENDATION_WEIGHT_DAY: float = 1.0
+    RECOMMENDATION_WEIGHT_ROOM_TYPE: float = 0.5
+    RECOMMENDATION_BATCH_WORKERS: int = 4
+
+    # Kolejka zadań w tle (worker.py)
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_SECONDS: int = 10
+    JOB_TIMEOUT_SECONDS: int = 15 * 60
+    # Co ile sekund działające zadanie odświeża updated_at; musi być dużo krótsze niż JOB_TIMEOUT_SECONDS
+    JOB_HEARTBEAT_SECONDS: int = 60
+
+    # Kalendarze .ics: ile dni wstecz obejmuje feed i ile feedów trzymamy w pamięci
+    CALENDAR_FEED_PAST_DAYS: int = 180
+    CALENDAR_FEED_CACHE_SIZE: int = 512
+
+    # Stronicowanie /courses/events/all (keyset)
+    EVENTS_PAGE_SIZE: int = 500
+    EVENTS_MAX_PAGE_SIZE: int = 2000
+
+    # Automatyczny przydział sal: liczba procesów solvera (1 = w procesie API)
+    ROOM_ASSIGNMENT_WORKERS: int = 4
+    ROOM_ASSIGNMENT_MAX_DAYS: int = 183
+
+    # Analityka wykorzystania sal: ważność raportu i próg "nieużywanej" sali
+    UTILIZATION_CACHE_TTL_SECONDS: int = 300
+    UTILIZATION_IDLE_THRESHOLD: float = 0.1
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8', extra='ignore')
 
+    @property
+    def database_url(self) -> str:
+        """
+        URL the engines connect to.
+
+        With our own pool (queue) the direct DATABASE_URL_UNPOOLED is preferred,
+        since connections are reused anyway. Without one (null) every checkout
+        opens a connection, so it must go through the external pooler behind
+        DATABASE_URL.
+        """
+        if self.DB_POOL_MODE == "null":
+            url = self.DATABASE_URL or self.DATABASE_URL_UNPOOLED
+        else:
+            url = self.DATABASE_URL_UNPOOLED or self.DATABASE_URL
+        if not url:
+            raise ValueError("Set DATABASE_URL or DATABASE_URL_UNPOOLED")
+        return url
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -18,6 +18,10 @@ def main():
         print("Connection successful.")
         print("Dropping all existing tables...")
         with conn.begin():
+            conn.execute(text("DROP TABLE IF EXISTS job_output_chunks CASCADE;"))
+            conn.execute(text("DROP TABLE IF EXISTS jobs CASCADE;"))
+            conn.execute(text("DROP TABLE IF EXISTS feed_versions CASCADE;"))
+            conn.execute(text("DROP TABLE IF EXISTS cache_versions CASCADE;"))
             conn.execute(text("DROP TABLE IF EXISTS room_equipment_association CASCADE;"))
             conn.execute(text("DROP TABLE IF EXISTS change_recommendations CASCADE;"))
             conn.execute(text("DROP TABLE IF EXISTS availability_proposals CASCADE;"))
@@ -33,6 +37,7 @@ def main():
             conn.execute(text("DROP TYPE IF EXISTS userrole;"))
             conn.execute(text("DROP TYPE IF EXISTS roomtype;"))
             conn.execute(text("DROP TYPE IF EXISTS changerequeststatus;"))
+            conn.execute(text("DROP TYPE IF EXISTS jobstatus;"))
         print("All tables dropped.")
 
     print("Creating all tables from metadata...")
@@ -1,17 +1,51 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from config import get_settings
+from services.db_pool import engine_pool_options, instrument_pool
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL)
+# Sterowniki asynchroniczne odpowiadające synchronicznym z Settings.database_url
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """Database URL rewritten for the async driver; libpq-only parameters are translated for asyncpg."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for '{parsed.get_backend_name()}'")
+    if driver == "postgresql+asyncpg":
+        query = dict(parsed.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        parsed = parsed.set(query=query)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+engine = create_engine(settings.database_url, **engine_pool_options(settings.database_url, settings))
+instrument_pool(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+ASYNC_DATABASE_URL = async_database_url(settings.database_url)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_pool_options(ASYNC_DATABASE_URL, settings, is_async=True))
+instrument_pool(async_engine.sync_engine)
+# Bez expire_on_commit: odczyt atrybutu po commicie nie może w trybie async doładować wiersza
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -6,12 +6,16 @@ from sqlalchemy import (
     Date,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
+    Index,
     Integer,
+    JSON,
     String,
     Text,
     Time,
     Table, UniqueConstraint,
+    func,
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -30,6 +34,12 @@ class ChangeRequestStatus(str, enum.Enum):
     REJECTED = "REJECTED"
     CANCELLED = "CANCELLED"
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
 class RoomType(str, enum.Enum):
     LECTURE_HALL = "LECTURE_HALL"
     LABORATORY = "LABORATORY"
@@ -63,6 +73,8 @@ class Group(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=True)
     year = Column(Integer, nullable=True)
+    # Liczba studentów; używana przy automatycznym przydziale sal
+    size = Column(Integer, nullable=True)
     leader_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     leader = relationship("User", back_populates="led_group")
     courses = relationship("Course", back_populates="group")
@@ -93,16 +105,33 @@ class RoomUnavailability(Base):
     reason = Column(Text, nullable=True)
     room = relationship("Room", back_populates="unavailability")
 
+    __table_args__ = (
+        Index('ix_room_unavailability_room_start', 'room_id', 'start_datetime'),
+        # Zapytania o nakładanie się przedziałów (&&) na Postgresie
+        Index(
+            'ix_room_unavailability_period',
+            func.tsrange(start_datetime, end_datetime, '[)'),
+            postgresql_using='gist',
+        ).ddl_if(dialect='postgresql'),
+    )
+
 class Course(Base):
     __tablename__ = "courses"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    # Wymagane wyposażenie sali, nazwy po przecinku (jak ChangeRequest.room_requirements)
+    room_requirements = Column(Text, nullable=True)
     teacher = relationship("User", back_populates="taught_courses")
     group = relationship("Group", back_populates="courses")
     events = relationship("CourseEvent", back_populates="course", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_courses_teacher_id', 'teacher_id'),
+        Index('ix_courses_group_id', 'group_id'),
+    )
+
 class TimeSlots(Base):
     __tablename__ = "time_slots"
     id = Column(Integer, primary_key=True)
@@ -124,6 +153,9 @@ class CourseEvent(Base):
 
     __table_args__ = (
         UniqueConstraint('room_id', 'day', 'time_slot_id', name='uq_room_day_time'),
+        # Kolejność stronicowania (day, time_slot_id, id) i filtry po kursie
+        Index('ix_course_events_day_slot_id', 'day', 'time_slot_id', 'id'),
+        Index('ix_course_events_course_day', 'course_id', 'day'),
     )
 
 class ChangeRequest(Base):
@@ -166,6 +198,7 @@ class ChangeRecomendation(Base):
     accepted_by_leader = Column(Boolean, default=False)
     rejected_by_teacher = Column(Boolean, default=False)
     rejected_by_leader = Column(Boolean, default=False)
+    score = Column(Float, nullable=True)
     recommended_room = relationship("Room", back_populates="change_recommendations", lazy="joined")
     change_request = relationship("ChangeRequest", back_populates="change_recommendations")
     source_proposal = relationship("AvailabilityProposal", lazy="joined")
@@ -178,4 +211,41 @@ class ChangeRecomendation(Base):
             'recommended_room_id',
             name='uq_unique_recommendation'
         ),
-    )
\ No newline at end of file
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(50), nullable=False)
+    key = Column(String(100), nullable=True, index=True)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    # Kto zlecił zadanie; tylko on (i ADMIN/KOORDYNATOR) widzi jego status i wynik
+    created_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class JobOutputChunk(Base):
+    """Kolejny fragment wyniku zadania (np. eksportu CSV); zapisywany i wysyłany po jednym."""
+    __tablename__ = "job_output_chunks"
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(Text, nullable=False)
+
+class FeedVersion(Base):
+    """Wersja danych kalendarza (teacher/group/room); podbijana przy każdej zmianie jego wydarzeń."""
+    __tablename__ = "feed_versions"
+    kind = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class CacheVersion(Base):
+    """Wersja danych cache'u trzymanego w pamięci procesów (np. uprawnień); podbijana w transakcji zmiany."""
+    __tablename__ = "cache_versions"
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
 
 from config import get_settings
-from database import get_db
+from database import get_async_db
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from model import User, UserRole
 from passlib.context import CryptContext
-from routers.schemas import Token, TokenData, UserResponse
-from sqlalchemy.orm import Session
+from routers.schemas import PrincipalCacheStats, Token, TokenData, UserResponse
+from services.principal_cache import load_principal_async, principal_cache
+from services.hashing import run_hashing
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import (
     HTTP_401_UNAUTHORIZED,
     HTTP_403_FORBIDDEN,
@@ -38,7 +41,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
     credentials_exception = HTTPException(
         status_code=HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,7 +55,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = await load_principal_async(db, token_data.email)
     if user is None:
         raise credentials_exception
     return user
@@ -69,18 +72,25 @@ def role_required(allowed_roles: list[UserRole]):
 
 @router.post("/token", response_model=Token, include_in_schema=False)
 @router.post("/token/", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    credentials = (await db.execute(select(User.email, User.password).where(User.email == form_data.username))).first()
+    # Koniec transakcji oddaje połączenie do puli na czas liczenia bcrypt, który idzie do osobnej, ograniczonej puli
+    await db.rollback()
+    if not credentials or not await run_hashing(verify_password, form_data.password, credentials[1]):
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    access_token = create_access_token(data={"sub": credentials[0]}, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.get("/cache-stats", response_model=PrincipalCacheStats)
+async def get_principal_cache_stats(current_user: User = Depends(role_required([UserRole.ADMIN]))):
+    """Hit/miss counters of the authenticated user cache of this worker."""
+    return principal_cache.stats()
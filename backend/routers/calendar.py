@@ -0,0 +1,80 @@
+from typing import Optional
+
+from database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from model import Group, Room, User, UserRole
+from routers.auth import get_current_user
+from services.authorization import get_authorization_context
+from services.calendar_feeds import (
+    FEED_KINDS, check_feed_token, current_etag, etag_matches, feed_token, get_feed
+)
+from services.occupancy import GROUP, ROOM, TEACHER
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_304_NOT_MODIFIED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+
+router = APIRouter(prefix="/calendar", tags=["Calendar"])
+
+_ROUTES = {TEACHER: "teachers", GROUP: "groups", ROOM: "rooms"}
+
+
+def _feed_name(db: Session, kind: str, entity_id: int) -> Optional[str]:
+    if kind == TEACHER:
+        teacher = db.query(User).filter(User.id == entity_id, User.role == UserRole.PROWADZACY).first()
+        return f"{teacher.name} {teacher.surname}" if teacher else None
+    if kind == GROUP:
+        group = db.query(Group).filter(Group.id == entity_id).first()
+        return group.name if group else None
+    room = db.query(Room).filter(Room.id == entity_id).first()
+    return room.name if room else None
+
+
+def _serve_feed(kind: str, entity_id: int, token: str, if_none_match: Optional[str], db: Session) -> Response:
+    if not check_feed_token(kind, entity_id, token):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Invalid feed token")
+
+    etag = current_etag(db, kind, entity_id)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+
+    name = _feed_name(db, kind, entity_id)
+    if name is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Calendar not found")
+    return Response(
+        content=get_feed(db, kind, entity_id, name, etag),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
+
+@router.get("/teachers/{teacher_id}.ics")
+def teacher_feed(teacher_id: int, token: str = Query(...), if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    return _serve_feed(TEACHER, teacher_id, token, if_none_match, db)
+
+@router.get("/groups/{group_id}.ics")
+def group_feed(group_id: int, token: str = Query(...), if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    return _serve_feed(GROUP, group_id, token, if_none_match, db)
+
+@router.get("/rooms/{room_id}.ics")
+def room_feed(room_id: int, token: str = Query(...), if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    return _serve_feed(ROOM, room_id, token, if_none_match, db)
+
+@router.get("/feed-url")
+def get_feed_url(
+    request: Request,
+    kind: str = Query(..., pattern="^(teacher|group|room)$"),
+    entity_id: int = Query(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Adres subskrypcji .ics (z tokenem) do wklejenia w aplikacji kalendarza."""
+    is_staff = current_user.role in (UserRole.ADMIN, UserRole.KOORDYNATOR)
+    if kind == TEACHER and not (is_staff or current_user.id == entity_id):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Not authorized to subscribe to this calendar")
+    if kind == GROUP and not is_staff:
+        if entity_id not in get_authorization_context(db, current_user.id).led_group_ids:
+            raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Not authorized to subscribe to this calendar")
+    if kind not in FEED_KINDS:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Unknown calendar")
+
+    path = request.url_for(f"{_ROUTES[kind][:-1]}_feed", **{f"{_ROUTES[kind][:-1]}_id": entity_id})
+    return {"url": f"{path}?token={feed_token(kind, entity_id)}"}
@@ -1,42 +1,91 @@
-from datetime import date, timedelta
+import time
 from typing import List
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
+from config import get_settings
+from database import get_async_db, get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from model import (
-    AvailabilityProposal, ChangeRecomendation, ChangeRequest, CourseEvent,
-    Equipment, Room, RoomUnavailability, User, ChangeRequestStatus, Course, Group
+    ChangeRecomendation, ChangeRequest, CourseEvent,
+    Room, User, Group, UserRole
 )
-from routers.auth import get_current_user
-from routers.schemas import ChangeRecomendationResponse, ChangeRequestResponse
-from sqlalchemy import func, or_, extract
-from sqlalchemy.exc import IntegrityError
+from routers.auth import get_current_user, role_required
+from routers.schemas import (
+    ChangeRecomendationResponse, ChangeRequestResponse, FinalizationSimulationResponse,
+    RecommendationBatchRequest, RecommendationBatchResponse, SimulatedConflict, SimulatedEvent
+)
+from services.authorization import get_authorization_context
+from services.finalization import find_conflicts_in_index, finalize_recommendation, plan_finalization
+from services.jobs import CYCLICAL_FINALIZE, enqueue
+from services.occupancy import get_occupancy_index
+from services.recommendation_batch import pending_change_request_ids, run_batch
+from services.recommendation_engine import compute_candidates, save_recommendations
+from services.recommendation_stream import MEDIA_TYPES, NDJSON, stream_recommendations
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
+from starlette.status import HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
 
+settings = get_settings()
 router = APIRouter(prefix="/recommendations", tags=["Change Recommendations"])
 
 @router.get("/{change_request_id}", response_model=List[ChangeRecomendationResponse])
-def get_recommendations(change_request_id: int, db: Session = Depends(get_db)):
-    recs = db.query(ChangeRecomendation).options(
-        joinedload(ChangeRecomendation.recommended_room)
-    ).filter_by(change_request_id=change_request_id).all()
+async def get_recommendations(change_request_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Unikalność (dzień, slot, sala) gwarantuje uq_unique_recommendation
+    stmt = select(ChangeRecomendation).options(
+        joinedload(ChangeRecomendation.recommended_room).selectinload(Room.equipment)
+    ).filter_by(change_request_id=change_request_id).order_by(
+        ChangeRecomendation.score.desc().nullslast(),
+        ChangeRecomendation.recommended_day,
+        ChangeRecomendation.recommended_slot_id,
+        ChangeRecomendation.recommended_room_id
+    )
+    return (await db.execute(stmt)).unique().scalars().all()
+
+@router.post("/{change_request_id}/stream")
+def stream_find_recommendations(
+    change_request_id: int,
+    fmt: str = Query(NDJSON, alias="format", pattern="^(ndjson|sse)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Streaming wariant POST /recommendations/{id}: kandydaci wysyłani na bieżąco (NDJSON lub SSE).
 
-    seen = set()
-    unique_recs = []
-    for r in recs:
-        key = (r.recommended_day, r.recommended_slot_id, r.recommended_room_id)
-        if key in seen:
-            continue
-        seen.add(key)
-        unique_recs.append(r)
+    Też POST, bo po zakończeniu skanu zapisuje najlepsze rekomendacje; SSE trzeba więc
+    czytać przez fetch, nie EventSource.
+    """
+    change_request = db.query(ChangeRequest).filter(ChangeRequest.id == change_request_id).first()
+    if not change_request:
+        raise HTTPException(status_code=404, detail="Change request not found")
 
-    unique_recs.sort(key=lambda r: (
-        r.recommended_day,
-        r.recommended_slot_id,
-        r.recommended_room_id
-    ))
+    course = change_request.course_event.course
+    if not course.teacher or not course.group.leader:
+        raise HTTPException(status_code=404, detail="Could not determine both parties for the request.")
 
-    return unique_recs
+    return StreamingResponse(
+        stream_recommendations(change_request_id, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/batch", response_model=RecommendationBatchResponse)
+def find_recommendations_batch(
+    batch: RecommendationBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR])),
+):
+    started = time.perf_counter()
+    request_ids = list(dict.fromkeys(batch.change_request_ids))
+    if batch.all_pending:
+        request_ids += [i for i in pending_change_request_ids(db) if i not in request_ids]
+    if not request_ids:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Provide change_request_ids or set all_pending.")
+
+    results = run_batch(request_ids, settings.RECOMMENDATION_BATCH_WORKERS)
+    return RecommendationBatchResponse(
+        results=results,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
 
 @router.post("/{change_request_id}")
 def find_recommendations(
@@ -52,157 +101,38 @@ def find_recommendations(
     if existing_rec:
         return existing_rec
 
-    course_event = change_request.course_event
-    teacher = course_event.course.teacher
-    group = course_event.course.group
-    group_leader = group.leader
-
-    if not teacher or not group_leader:
+    course = change_request.course_event.course
+    if not course.teacher or not course.group.leader:
         raise HTTPException(status_code=404, detail="Could not determine both parties for the request.")
 
-    teacher_proposals = db.query(
-        AvailabilityProposal.day,
-        AvailabilityProposal.time_slot_id
-    ).filter(
-        AvailabilityProposal.change_request_id == change_request_id,
-        AvailabilityProposal.user_id == teacher.id
-    ).subquery()
-
-    common_slots = db.query(
-        AvailabilityProposal.day,
-        AvailabilityProposal.time_slot_id
-    ).filter(
-        AvailabilityProposal.change_request_id == change_request_id,
-        AvailabilityProposal.user_id == group_leader.id
-    ).join(
-        teacher_proposals,
-        (AvailabilityProposal.day == teacher_proposals.c.day) &
-        (AvailabilityProposal.time_slot_id == teacher_proposals.c.time_slot_id)
-    ).distinct().all()
-
-    if not common_slots:
-        return []
-
-    recommendations = []
-    processed_keys = set()
-
-    for day, slot_id in common_slots:
-        unavailable_by_block = db.query(RoomUnavailability.room_id).filter(
-            RoomUnavailability.start_datetime <= day,
-            RoomUnavailability.end_datetime >= day
-        ).subquery()
-
-        unavailable_by_event = db.query(CourseEvent.room_id).filter(
-            CourseEvent.day == day,
-            CourseEvent.time_slot_id == slot_id,
-            CourseEvent.canceled == False,
-            CourseEvent.room_id.isnot(None)
-        ).subquery()
-
-        base_query = db.query(Room).filter(
-            Room.id.notin_(unavailable_by_block),
-            Room.id.notin_(unavailable_by_event),
-        )
-
-        if change_request.minimum_capacity > 0:
-            base_query = base_query.filter(Room.capacity >= change_request.minimum_capacity)
-
-        if change_request.room_requirements:
-            required_eq_names = [
-                name.strip().lower()
-                for name in change_request.room_requirements.split(',')
-                if name.strip()
-            ]
-            if required_eq_names:
-                base_query = base_query.join(Room.equipment).filter(
-                    func.lower(Equipment.name).in_(required_eq_names)
-                ).group_by(Room.id).having(
-                    func.count(Equipment.id) >= len(required_eq_names)
-                )
-
-        available_rooms = base_query.order_by(Room.capacity).all()
-
-        for room in available_rooms:
-            key = (day, slot_id, room.id)
-            if key in processed_keys:
-                continue
-
-            # Upewnij się, że nie istnieje w bazie (np. po wielokrotnym kliknięciu)
-            existing = db.query(ChangeRecomendation).filter_by(
-                change_request_id=change_request_id,
-                recommended_day=day,
-                recommended_slot_id=slot_id,
-                recommended_room_id=room.id
-            ).first()
-            if existing:
-                continue
-
-            # Sprawdź konflikty nauczyciela i grupy
-            teacher_conflict = db.query(CourseEvent).join(Course).filter(
-                Course.teacher_id == teacher.id,
-                CourseEvent.day == day,
-                CourseEvent.time_slot_id == slot_id,
-                CourseEvent.canceled == False
-            ).first()
-            if teacher_conflict:
-                continue
-
-            group_conflict = db.query(CourseEvent).join(Course).filter(
-                Course.group_id == group.id,
-                CourseEvent.day == day,
-                CourseEvent.time_slot_id == slot_id,
-                CourseEvent.canceled == False
-            ).first()
-            if group_conflict:
-                continue
-
-            # Wszystko OK – dodaj
-            processed_keys.add(key)
-            recommendation = ChangeRecomendation(
-                change_request_id=change_request_id,
-                recommended_day=day,
-                recommended_slot_id=slot_id,
-                recommended_room_id=room.id,
-                source_proposal_id=None  # lub przypisz, jeśli chcesz
-            )
-            try:
-                db.add(recommendation)
-                db.flush()
-            except IntegrityError:
-                db.rollback()
-                continue
-            # db.add(recommendation)
-            # db.flush()
-            recommendation.recommended_room = room
-            recommendations.append(recommendation)
+    candidates = compute_candidates(db, change_request)
+    recommendations = save_recommendations(db, change_request_id, candidates)
+    rooms = {candidate.room.id: candidate.room for candidate in candidates}
+    for recommendation in recommendations:
+        recommendation.recommended_room = rooms[recommendation.recommended_room_id]
 
     db.commit()
 
     return recommendations
 
 
-def shift_to_weekday(original_date: date, target_weekday: int) -> date:
-    """Zwraca datę z tego samego tygodnia co `original_date`, ale z podmienionym dniem tygodnia (0=pon, 6=niedz)."""
-    current_weekday = original_date.weekday()
-    return original_date + timedelta(days=(target_weekday - current_weekday))
-
 @router.post("/{recommendation_id}/reject", status_code=204)
 def reject_single_recommendation(
     recommendation_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    recommendation = db.query(ChangeRecomendation).filter(
-        ChangeRecomendation.id == recommendation_id
-    ).first()
+    recommendation = db.query(ChangeRecomendation).options(
+        joinedload(ChangeRecomendation.change_request).joinedload(ChangeRequest.course_event)
+    ).filter(ChangeRecomendation.id == recommendation_id).first()
 
     if not recommendation:
         raise HTTPException(status_code=404, detail="Recommendation not found")
 
-    change_request = recommendation.change_request
-    course = change_request.course_event.course
-    is_leader = current_user.id == course.group.leader_id
-    is_teacher = current_user.id == course.teacher_id
+    authorization = get_authorization_context(db, current_user.id)
+    course_id = recommendation.change_request.course_event.course_id
+    is_leader = authorization.is_leader(course_id)
+    is_teacher = authorization.is_teacher(course_id)
     if not (is_leader or is_teacher):
         raise HTTPException(status_code=403, detail="Not authorized to reject recommendation")
 
@@ -220,6 +150,7 @@ def reject_single_recommendation(
 @router.post("/{recommendation_id}/accept", response_model=ChangeRequestResponse)
 def accept_recommendation(
     recommendation_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -230,13 +161,12 @@ def accept_recommendation(
     if not rec:
         raise HTTPException(status_code=404, detail="Recommendation not found")
 
-    course = rec.change_request.course_event.course
+    authorization = get_authorization_context(db, current_user.id)
+    course_id = rec.change_request.course_event.course_id
 
-    if current_user.id == course.teacher_id:
-        print("teacher")
+    if authorization.is_teacher(course_id):
         rec.accepted_by_teacher = True
-    elif current_user.id == course.group.leader_id:
-        print("leader")
+    elif authorization.is_leader(course_id):
         rec.accepted_by_leader = True
     else:
         raise HTTPException(status_code=403, detail="Not authorized to accept this recommendation.")
@@ -244,104 +174,60 @@ def accept_recommendation(
     db.flush()
 
     if rec.accepted_by_teacher and rec.accepted_by_leader:
-        return finalize_recommendation(rec, db)
+        if not rec.change_request.cyclical:
+            return finalize_recommendation(rec, db)
+        # Przepisanie całego semestru robi worker; klient śledzi postęp przez /jobs/{id}
+        job = enqueue(
+            db, CYCLICAL_FINALIZE, {"recommendation_id": rec.id, "change_request_id": rec.change_request_id},
+            key=f"finalize:{rec.change_request_id}", created_by=current_user.id
+        )
+        db.commit()
+        response.status_code = HTTP_202_ACCEPTED
+        response.headers["Location"] = f"/jobs/{job.id}"
+        response.headers["X-Job-Id"] = str(job.id)
+        return rec.change_request
 
     db.commit()
     return rec.change_request
 
-def finalize_recommendation(rec: ChangeRecomendation, db: Session):
-    change_request = rec.change_request
-    original_event = change_request.course_event
-    course = original_event.course
-    group = course.group
-
-    if change_request.cyclical:
-        original_weekday = (original_event.day.weekday() + 1) % 7
-        target_weekday = rec.recommended_day.weekday()
-
-        start = change_request.start_date or rec.recommended_day
-        end = change_request.end_date or date.max
-
-        related_events = db.query(CourseEvent).filter(
-            CourseEvent.course_id == original_event.course_id,
-            extract('dow', CourseEvent.day) == original_weekday,
-            CourseEvent.time_slot_id == original_event.time_slot_id,
-            CourseEvent.day >= start,
-            CourseEvent.day <= end,
-            CourseEvent.canceled == False
-        ).all()
-
-        for event in related_events:
-            new_day = shift_to_weekday(event.day, target_weekday)
-            new_event = CourseEvent(
-                course_id=event.course_id,
-                room_id=rec.recommended_room_id,
-                day=new_day,
-                time_slot_id=rec.recommended_slot_id,
-                canceled=False,
-                was_rescheduled=False
-            )
-
-            conflict = db.query(CourseEvent).filter(
-                CourseEvent.room_id == new_event.room_id,
-                CourseEvent.day == new_event.day,
-                CourseEvent.time_slot_id == new_event.time_slot_id,
-                CourseEvent.canceled == False,
-            ).first()
-            if conflict:
-                raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Room is already booked.")
-
-            group_conflict = db.query(CourseEvent).join(Course).filter(
-                Course.group_id == group.id,
-                CourseEvent.time_slot_id == new_event.time_slot_id,
-                CourseEvent.day == new_event.day,
-                CourseEvent.canceled == False,
-            ).first()
-            if group_conflict:
-                raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Group has other event")
-
-            db.add(new_event)
-            event.canceled = True
-
-    else:
-        new_event = CourseEvent(
-            course_id=original_event.course_id,
-            room_id=rec.recommended_room_id,
-            day=rec.recommended_day,
-            time_slot_id=rec.recommended_slot_id,
-            canceled=False,
-            was_rescheduled=True
-        )
-        conflict = db.query(CourseEvent).filter(
-            CourseEvent.room_id == new_event.room_id,
-            CourseEvent.day == new_event.day,
-            CourseEvent.time_slot_id == new_event.time_slot_id,
-            CourseEvent.canceled == False,
-        ).first()
-        if conflict:
-            raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Room is already booked.")
-
-        db.add(new_event)
-        original_event.canceled = True
-
-    change_request.status = ChangeRequestStatus.ACCEPTED
-
-    # Czyszczenie danych pomocniczych
-    db.query(ChangeRecomendation).filter(
-        ChangeRecomendation.change_request_id == change_request.id
-    ).delete(synchronize_session=False)
-
-    db.query(AvailabilityProposal).filter(
-        AvailabilityProposal.change_request_id == change_request.id
-    ).delete(synchronize_session=False)
+@router.get("/{recommendation_id}/simulate", response_model=FinalizationSimulationResponse)
+def simulate_finalization(
+    recommendation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Skutki akceptacji rekomendacji (nowe/odwołane wydarzenia, konflikty) bez zapisu do bazy."""
+    started = time.perf_counter()
+    rec = db.query(ChangeRecomendation).options(
+        joinedload(ChangeRecomendation.change_request).joinedload(ChangeRequest.course_event).joinedload(CourseEvent.course)
+    ).filter(ChangeRecomendation.id == recommendation_id).first()
+    if not rec:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
 
-    db.commit()
-    db.refresh(change_request)
-    return change_request
+    authorization = get_authorization_context(db, current_user.id)
+    course_id = rec.change_request.course_event.course_id
+    if not (authorization.is_teacher(course_id) or authorization.is_leader(course_id)):
+        raise HTTPException(status_code=403, detail="Not authorized to simulate this recommendation.")
+
+    plan = plan_finalization(db, rec)
+    plan.conflicts = find_conflicts_in_index(get_occupancy_index(db), plan)
+    return FinalizationSimulationResponse(
+        recommendation_id=rec.id,
+        change_request_id=rec.change_request_id,
+        cyclical=bool(rec.change_request.cyclical),
+        feasible=not plan.conflicts,
+        created=[SimulatedEvent(**booking._asdict()) for booking in plan.created],
+        cancelled=[
+            SimulatedEvent(id=e.id, course_id=e.course_id, room_id=e.room_id, day=e.day, time_slot_id=e.time_slot_id)
+            for e in plan.cancelled
+        ],
+        conflicts=[SimulatedConflict(day=day, kinds=sorted(kinds)) for day, kinds in sorted(plan.conflicts.items())],
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
 
 @router.get("/{recommendation_id}/acceptance-status")
-def get_acceptance_status(recommendation_id: int, db: Session = Depends(get_db)):
-    rec = db.query(ChangeRecomendation).filter(ChangeRecomendation.id == recommendation_id).first()
+async def get_acceptance_status(recommendation_id: int, db: AsyncSession = Depends(get_async_db)):
+    rec = await db.get(ChangeRecomendation, recommendation_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Recommendation not found")
     return {
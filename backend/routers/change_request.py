@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from database import get_db
+from database import get_async_db, get_db
 from fastapi import APIRouter, Depends, HTTPException, Query
 from model import (
     ChangeRequest, Course, CourseEvent, Group, User, ChangeRequestStatus,
@@ -9,54 +9,50 @@ from model import (
 )
 from routers.auth import get_current_user
 from routers.schemas import ChangeRequestCreate, ChangeRequestResponse, ChangeRequestUpdate, ProposalStatusResponse
-from sqlalchemy import or_
+from services.authorization import get_authorization_context, get_authorization_context_async
+from services.equipment_masks import get_equipment_masks
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
 
 router = APIRouter(prefix="/change-requests", tags=["Change Requests"])
 
+# Zagnieżdżone ładowanie do pobrania wszystkich potrzebnych danych jednym zapytaniem
+# (w sesji async nic nie może doładować się leniwie przy serializacji)
+REQUEST_RESPONSE_OPTIONS = [
+    joinedload(ChangeRequest.initiator),
+    joinedload(ChangeRequest.course_event)
+        .joinedload(CourseEvent.course)
+        .joinedload(Course.teacher),
+    joinedload(ChangeRequest.course_event)
+        .joinedload(CourseEvent.course)
+        .joinedload(Course.group)
+        .joinedload(Group.leader)
+]
+
 @router.get("/related", response_model=List[ChangeRequestResponse], status_code=HTTP_200_OK)
-def get_related_requests(
+async def get_related_requests(
     status: Optional[ChangeRequestStatus] = Query(None, description="Optional status filter"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ) -> List[ChangeRequestResponse]:
-    
-    # Zagnieżdżone ładowanie do pobrania wszystkich potrzebnych danych jednym zapytaniem
-    q_options = [
-        joinedload(ChangeRequest.initiator),
-        joinedload(ChangeRequest.course_event)
-            .joinedload(CourseEvent.course)
-            .joinedload(Course.teacher),
-        joinedload(ChangeRequest.course_event)
-            .joinedload(CourseEvent.course)
-            .joinedload(Course.group)
-            .joinedload(Group.leader)
-    ]
-
-    if current_user.role in [UserRole.ADMIN, UserRole.KOORDYNATOR]:
-        query = db.query(ChangeRequest).options(*q_options)
-    else:
-        # Logika do znajdowania powiązanych zgłoszeń pozostaje ta sama
-        teacher_course_ids = db.query(Course.id).filter(Course.teacher_id == current_user.id).scalar_subquery()
-        leader_group_ids = db.query(Group.id).filter(Group.leader_id == current_user.id).scalar_subquery()
-        leader_course_ids = db.query(Course.id).filter(Course.group_id.in_(leader_group_ids)).scalar_subquery()
-        related_course_ids = db.query(Course.id).filter(or_(Course.id.in_(teacher_course_ids), Course.id.in_(leader_course_ids))).scalar_subquery()
-        related_event_ids = db.query(CourseEvent.id).filter(CourseEvent.course_id.in_(related_course_ids)).scalar_subquery()
-
-        query = db.query(ChangeRequest).filter(
+    stmt = select(ChangeRequest).options(*REQUEST_RESPONSE_OPTIONS)
+    if current_user.role not in [UserRole.ADMIN, UserRole.KOORDYNATOR]:
+        authorization = await get_authorization_context_async(db, current_user.id)
+        related_event_ids = select(CourseEvent.id).where(CourseEvent.course_id.in_(authorization.related_course_ids))
+        stmt = stmt.where(
             or_(
                 ChangeRequest.initiator_id == current_user.id,
                 ChangeRequest.course_event_id.in_(related_event_ids),
             )
-        ).options(*q_options)
+        )
 
     if status:
-        query = query.filter(ChangeRequest.status == status)
+        stmt = stmt.where(ChangeRequest.status == status)
 
-    return query.order_by(ChangeRequest.created_at.desc()).all()
+    return (await db.execute(stmt.order_by(ChangeRequest.created_at.desc()))).unique().scalars().all()
 
-# ... reszta pliku change_request.py bez zmian ...
 @router.post("", response_model=ChangeRequestResponse, status_code=HTTP_201_CREATED)
 @router.post("/", response_model=ChangeRequestResponse, status_code=HTTP_201_CREATED, include_in_schema=False)
 def create_request(
@@ -80,11 +76,15 @@ def create_request(
     db.add(new_request)
     db.commit()
     db.refresh(new_request)
+    # Wymagania sprzętowe parsujemy raz, przy tworzeniu zgłoszenia
+    get_equipment_masks(db).requirement_mask(new_request.room_requirements)
     return new_request
 
 @router.get("/{request_id}", response_model=ChangeRequestResponse, status_code=HTTP_200_OK)
-def get_request_by_id(request_id: int, db: Session = Depends(get_db)) -> ChangeRequest:
-    request = db.query(ChangeRequest).filter(ChangeRequest.id == request_id).first()
+async def get_request_by_id(request_id: int, db: AsyncSession = Depends(get_async_db)) -> ChangeRequest:
+    request = (await db.execute(
+        select(ChangeRequest).options(*REQUEST_RESPONSE_OPTIONS).where(ChangeRequest.id == request_id)
+    )).unique().scalars().first()
     if not request:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Change request not found")
     return request
@@ -139,17 +139,16 @@ def update_request(
 def reject_request(
     request_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
 ):
-    db_request = db.query(ChangeRequest).options(joinedload(ChangeRequest.course_event).joinedload(CourseEvent.course).joinedload(Course.group)).filter(ChangeRequest.id == request_id).first()
+    db_request = db.query(ChangeRequest).options(joinedload(ChangeRequest.course_event)).filter(ChangeRequest.id == request_id).first()
     if not db_request:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Change request not found")
 
     if db_request.status != ChangeRequestStatus.PENDING:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="This request has already been processed.")
     
-    course = db_request.course_event.course
-    is_leader = current_user.id == course.group.leader_id
-    is_teacher = current_user.id == course.teacher_id
-    if not (is_leader or is_teacher):
+    authorization = get_authorization_context(db, current_user.id)
+    course_id = db_request.course_event.course_id
+    if not (authorization.is_leader(course_id) or authorization.is_teacher(course_id)):
         raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Not authorized to reject this request.")
 
     db_request.status = ChangeRequestStatus.REJECTED
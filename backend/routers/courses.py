@@ -1,20 +1,37 @@
-from typing import List
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
+import io
+import time
+from datetime import date
+from typing import List, Optional
+from config import get_settings
+from database import get_async_db, get_db
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
 from model import Course, CourseEvent, Group, Room, TimeSlots, User, UserRole
 from routers.auth import get_current_user, role_required
 from routers.schemas import (
     CourseCreate, CourseEventCreate, CourseEventResponse, CourseUpdate,
-    CourseResponse, CourseEventUpdate, CourseEventWithDetailsResponse
+    CourseResponse, CourseEventSeriesCreate, CourseEventUpdate, CourseEventWithDetailsResponse,
+    EventImportResponse, RoomAssignmentRequest, RoomAssignmentResponse
 )
+from services.event_import import import_events
+from services.event_series import insert_series, series_days
+from services.finalization import describe_conflicts, find_slot_conflicts
+from services.occupancy import HELD, get_occupancy_index
+from services.pagination import decode_cursor, encode_cursor
+from services.room_assignment import assign_rooms
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from starlette.status import (
-    HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_404_NOT_FOUND,
+    HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND,
     HTTP_409_CONFLICT, HTTP_422_UNPROCESSABLE_ENTITY
 )
 
+settings = get_settings()
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
+MAX_SERIES_OCCURRENCES = 60
+
 @router.get("", response_model=List[CourseResponse])
 @router.get("/", response_model=List[CourseResponse], include_in_schema=False)
 def get_courses(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -76,17 +93,94 @@ def delete_course(course_id: int, db: Session = Depends(get_db), current_user: U
 
 # --- Events Management ---
 
+def room_booked(db: Session, room_id: int, day: date, time_slot_id: int, exclude_event: Optional[CourseEvent] = None) -> bool:
+    """
+    Whether another event holds the room in this slot.
+
+    Cancelled events count too: their rows stay in the table and
+    uq_room_day_time would reject the insert. The occupancy index answers the
+    common "busy" case without a query, but it is per process and may be
+    stale, so a free cell is confirmed in the database.
+    """
+    # Indeks liczy też samo edytowane wydarzenie, jeśli już zajmuje tę komórkę
+    occupies_cell = (
+        exclude_event is not None
+        and (exclude_event.room_id, exclude_event.day, exclude_event.time_slot_id) == (room_id, day, time_slot_id)
+    )
+    if get_occupancy_index(db).count(HELD, room_id, day, time_slot_id) - int(occupies_cell) > 0:
+        return True
+    query = db.query(CourseEvent.id).filter(
+        CourseEvent.room_id == room_id,
+        CourseEvent.day == day,
+        CourseEvent.time_slot_id == time_slot_id
+    )
+    if exclude_event is not None:
+        query = query.filter(CourseEvent.id != exclude_event.id)
+    return query.first() is not None
+
+def commit_room_booking(db: Session, room_id: Optional[int]) -> None:
+    """Commits an event write; a uq_room_day_time violation (concurrent or cancelled booking) becomes 409."""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Sala {room_id} jest już zarezerwowana w tym terminie.")
+
 @router.get("/events/all", response_model=List[CourseEventWithDetailsResponse], tags=["Course Events"])
-def get_all_events(db: Session = Depends(get_db), current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR, UserRole.PROWADZACY, UserRole.STAROSTA]))):
+async def get_all_events(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    room_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    canceled: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR, UserRole.PROWADZACY, UserRole.STAROSTA])),
+):
     """
-    Retrieves all course events with their associated course and room details.
-    This is an optimized endpoint to prevent N+1 query problems on the client-side.
+    Retrieves course events with their associated course and room details, one page at a time.
+
+    Pages are ordered by (day, time_slot_id, id). When more events remain, the
+    `X-Next-Cursor` header holds the cursor to pass back for the next page.
     """
-    events = db.query(CourseEvent).options(
+    limit = min(limit or settings.EVENTS_PAGE_SIZE, settings.EVENTS_MAX_PAGE_SIZE)
+    stmt = select(CourseEvent).options(
         joinedload(CourseEvent.course).joinedload(Course.teacher),
         joinedload(CourseEvent.course).joinedload(Course.group).joinedload(Group.leader),
         joinedload(CourseEvent.room)
-    ).order_by(CourseEvent.day.desc(), CourseEvent.time_slot_id).all()
+    )
+    if teacher_id is not None or group_id is not None:
+        stmt = stmt.join(Course, CourseEvent.course_id == Course.id)
+        if teacher_id is not None:
+            stmt = stmt.where(Course.teacher_id == teacher_id)
+        if group_id is not None:
+            stmt = stmt.where(Course.group_id == group_id)
+    if date_from is not None:
+        stmt = stmt.where(CourseEvent.day >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(CourseEvent.day <= date_to)
+    if room_id is not None:
+        stmt = stmt.where(CourseEvent.room_id == room_id)
+    if course_id is not None:
+        stmt = stmt.where(CourseEvent.course_id == course_id)
+    if canceled is not None:
+        stmt = stmt.where(CourseEvent.canceled == canceled)
+    if cursor:
+        stmt = stmt.where(
+            tuple_(CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.id) > tuple_(*decode_cursor(cursor))
+        )
+
+    # Jeden wiersz więcej mówi, czy istnieje następna strona
+    stmt = stmt.order_by(CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.id).limit(limit + 1)
+    events = (await db.execute(stmt)).unique().scalars().all()
+    if len(events) > limit:
+        events = events[:limit]
+        last = events[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.day, last.time_slot_id, last.id)
     return events
 
 @router.post("/events", response_model=CourseEventResponse, status_code=HTTP_201_CREATED, tags=["Course Events"])
@@ -97,15 +191,123 @@ def create_event(event_data: CourseEventCreate, db: Session = Depends(get_db), c
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Sala nie istnieje.")
     if not db.query(TimeSlots).filter(TimeSlots.id == event_data.time_slot_id).first():
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Slot czasowy nie istnieje.")
-    conflict = db.query(CourseEvent).filter(CourseEvent.room_id == event_data.room_id, CourseEvent.day == event_data.day, CourseEvent.time_slot_id == event_data.time_slot_id, CourseEvent.canceled == False).first()
-    if conflict:
+    if event_data.room_id and room_booked(db, event_data.room_id, event_data.day, event_data.time_slot_id):
         raise HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Sala {event_data.room_id} jest już zarezerwowana.")
     new_event = CourseEvent(**event_data.dict())
     db.add(new_event)
-    db.commit()
+    commit_room_booking(db, event_data.room_id)
     db.refresh(new_event)
     return new_event
 
+@router.post("/events/series", response_model=List[CourseEventResponse], status_code=HTTP_201_CREATED, tags=["Course Events"])
+def create_event_series(series: CourseEventSeriesCreate, db: Session = Depends(get_db), current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR]))):
+    """
+    Creates a recurring event (every `interval_weeks` weeks on `weekday`) in one transaction.
+
+    Room, teacher and group conflicts of all occurrences are checked at once;
+    when any occurrence conflicts nothing is created and every date is reported.
+    """
+    if series.end_date < series.start_date:
+        raise HTTPException(status_code=HTTP_422_UNPROCESSABLE_ENTITY, detail="Data końcowa jest wcześniejsza niż początkowa.")
+    course = db.query(Course).filter(Course.id == series.course_id).first()
+    if not course:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Kurs nie znaleziony.")
+    if series.room_id and not db.query(Room).filter(Room.id == series.room_id).first():
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Sala nie istnieje.")
+    if not db.query(TimeSlots).filter(TimeSlots.id == series.time_slot_id).first():
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Slot czasowy nie istnieje.")
+
+    days = series_days(series.start_date, series.end_date, series.weekday, series.interval_weeks, series.skip_dates)
+    if not days:
+        raise HTTPException(status_code=HTTP_422_UNPROCESSABLE_ENTITY, detail="Seria nie zawiera żadnego terminu.")
+    if len(days) > MAX_SERIES_OCCURRENCES:
+        raise HTTPException(status_code=HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Seria może mieć najwyżej {MAX_SERIES_OCCURRENCES} terminów.")
+
+    conflicts = find_slot_conflicts(db, days, series.time_slot_id, series.room_id, course.teacher_id, course.group_id)
+    if conflicts:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=describe_conflicts(conflicts))
+
+    events = insert_series(db, course.id, series.room_id, series.time_slot_id, days)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Sala została zarezerwowana w trakcie tworzenia serii, spróbuj ponownie.")
+    return events
+
+@router.post("/events/import", response_model=EventImportResponse, tags=["Course Events"])
+def import_course_events(
+    response: Response,
+    file: UploadFile = File(..., description="CSV z kolumnami course,room,day,slot"),
+    atomic: bool = Query(True, description="Nie zapisuj nic, jeśli którykolwiek wiersz jest błędny"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR])),
+):
+    """Bulk import of course events; returns a per-row error report (422 when an atomic import is rejected)."""
+    started = time.perf_counter()
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_events(db, stream, atomic=atomic)
+        db.commit()
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Plik musi być zakodowany w UTF-8.")
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Sala została zarezerwowana w trakcie importu, spróbuj ponownie.")
+    finally:
+        stream.detach()
+
+    if report.errors and not report.imported:
+        response.status_code = HTTP_422_UNPROCESSABLE_ENTITY
+    return EventImportResponse(
+        rows=report.rows,
+        imported=report.imported,
+        atomic=atomic,
+        errors=[{"row": error.row, "errors": error.errors} for error in report.errors],
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+
+@router.post("/events/assign-rooms", response_model=RoomAssignmentResponse, tags=["Course Events"])
+def assign_rooms_to_events(
+    request: RoomAssignmentRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR])),
+):
+    """Assigns rooms to every event without one in the range (capacity, equipment, blocks, bookings)."""
+    if request.date_to < request.date_from:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Data końcowa nie może być wcześniejsza niż początkowa.")
+    if (request.date_to - request.date_from).days >= settings.ROOM_ASSIGNMENT_MAX_DAYS:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Zakres nie może przekraczać {settings.ROOM_ASSIGNMENT_MAX_DAYS} dni."
+        )
+
+    result = assign_rooms(
+        db, request.date_from, request.date_to,
+        workers=settings.ROOM_ASSIGNMENT_WORKERS, apply=not request.dry_run
+    )
+    if not request.dry_run:
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Sala została zarezerwowana w trakcie przydziału, spróbuj ponownie.")
+
+    return RoomAssignmentResponse(
+        dry_run=request.dry_run,
+        cells=result.cells,
+        shards=result.shards,
+        assigned=[{"event_id": event_id, "room_id": room_id} for event_id, room_id in result.assigned.items()],
+        unassigned=[
+            {"event_id": event_id, "day": day, "time_slot_id": time_slot_id, "reason": reason}
+            for event_id, (day, time_slot_id, reason) in sorted(result.unassigned.items())
+        ],
+        wasted_seats=result.wasted_seats,
+        load_ms=result.load_ms,
+        solve_ms=result.solve_ms,
+    )
+
 @router.put("/events/{event_id}", response_model=CourseEventResponse, tags=["Course Events"])
 def update_event(event_id: int, event_data: CourseEventUpdate, db: Session = Depends(get_db), current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR]))):
     """
@@ -125,20 +327,13 @@ def update_event(event_id: int, event_data: CourseEventUpdate, db: Session = Dep
     if new_room_id and (
         "day" in update_data or "time_slot_id" in update_data or "room_id" in update_data
     ):
-         conflict = db.query(CourseEvent).filter(
-            CourseEvent.id != event_id,
-            CourseEvent.room_id == new_room_id,
-            CourseEvent.day == new_day,
-            CourseEvent.time_slot_id == new_time_slot_id,
-            CourseEvent.canceled == False
-        ).first()
-         if conflict:
+         if room_booked(db, new_room_id, new_day, new_time_slot_id, exclude_event=db_event):
             raise HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Sala {new_room_id} jest już zarezerwowana w tym terminie.")
 
     for key, value in update_data.items():
         setattr(db_event, key, value)
         
-    db.commit()
+    commit_room_booking(db, new_room_id)
     db.refresh(db_event)
     return db_event
 
@@ -159,14 +354,14 @@ def delete_event(event_id: int, db: Session = Depends(get_db), current_user: Use
     return None
 
 @router.get("/{course_id}/events", response_model=List[CourseEventResponse])
-def get_events_for_course(course_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if not db.query(Course).filter(Course.id == course_id).first():
+async def get_events_for_course(course_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    if await db.get(Course, course_id) is None:
         raise HTTPException(status_code=404, detail="Kurs nie znaleziony.")
-    return db.query(CourseEvent).filter(CourseEvent.course_id == course_id).all()
+    return (await db.execute(select(CourseEvent).where(CourseEvent.course_id == course_id))).unique().scalars().all()
 
 @router.get("/events/{event_id}", response_model=CourseEventResponse)
-def get_course_event(event_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    course_event = db.query(CourseEvent).filter(CourseEvent.id == event_id).first()
+async def get_course_event(event_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    course_event = await db.get(CourseEvent, event_id)
     if not course_event:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Wydarzenie nie znalezione.")
     return course_event
\ No newline at end of file
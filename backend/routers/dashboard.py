@@ -1,14 +1,22 @@
-from typing import List
-from database import get_db
-from fastapi import APIRouter, Depends
+from datetime import date, timedelta
+from typing import List, Optional
+from database import async_engine, engine, get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
 from model import User, Room, ChangeRequest, CourseEvent, ChangeRequestStatus, UserRole
 from routers.auth import role_required
-from routers.schemas import DashboardDataResponse, DashboardStatCard, ChangeRequestResponse
+from routers.schemas import DashboardDataResponse, DashboardStatCard, ChangeRequestResponse, PoolStats, UtilizationResponse
+from services.db_pool import pool_stats
+from services.occupancy import check_consistency
+from services.utilization import get_utilization
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from starlette.status import HTTP_400_BAD_REQUEST
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+MAX_UTILIZATION_DAYS = 366
+DEFAULT_UTILIZATION_DAYS = 28
+
 @router.get("/stats", response_model=DashboardDataResponse)
 def get_dashboard_stats(
     db: Session = Depends(get_db),
@@ -39,4 +47,40 @@ def get_dashboard_stats(
     return DashboardDataResponse(
         stats=stats,
         recent_pending_requests=recent_pending_requests
-    )
\ No newline at end of file
+    )
+
+@router.get("/occupancy/consistency")
+def get_occupancy_consistency(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN]))
+):
+    """Compares the in-memory occupancy index with the `course_events` table."""
+    mismatches = check_consistency(db)
+    return {
+        "consistent": not mismatches,
+        "mismatch_count": len(mismatches),
+        "mismatches": mismatches[:100],
+    }
+
+@router.get("/db-pool", response_model=List[PoolStats])
+def get_db_pool_stats(current_user: User = Depends(role_required([UserRole.ADMIN]))):
+    """Connection pools of this worker: occupancy, checkout waits and overflow since start."""
+    return [pool_stats("sync", engine.pool), pool_stats("async", async_engine.pool)]
+
+@router.get("/utilization", response_model=UtilizationResponse)
+def get_room_utilization(
+    date_from: Optional[date] = Query(None, description="Domyślnie 4 tygodnie przed date_to"),
+    date_to: Optional[date] = Query(None, description="Domyślnie dzisiaj"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR]))
+):
+    """Room utilization by weekday and time slot, peak hours, capacity fit and idle rooms (cached per window)."""
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_UTILIZATION_DAYS - 1)
+    if date_to < date_from:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Data końcowa nie może być wcześniejsza niż początkowa.")
+    if (date_to - date_from).days >= MAX_UTILIZATION_DAYS:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Zakres nie może przekraczać {MAX_UTILIZATION_DAYS} dni.")
+
+    report, cached = get_utilization(db, date_from, date_to)
+    return UtilizationResponse(**report, cached=cached)
@@ -0,0 +1,28 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from model import User, UserRole
+from routers.auth import role_required
+from services.export import CSV, ENCODERS, MEDIA_TYPES, stream_event_batches
+from starlette.status import HTTP_400_BAD_REQUEST
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+@router.get("/events")
+def export_events(
+    fmt: str = Query(CSV, alias="format", pattern="^(csv|ndjson)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR])),
+):
+    """Streamuje wydarzenia (CSV lub NDJSON) prosto z kursora po stronie serwera, bez budowania obiektów ORM."""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'")
+    filename = f"timetable-{date_from or 'start'}-{date_to or 'end'}.{fmt}"
+    return StreamingResponse(
+        ENCODERS[fmt](stream_event_batches(date_from, date_to)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,66 @@
+from datetime import date
+from typing import Optional
+
+from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from model import ChangeRequest, CourseEvent, Job, JobStatus, User, UserRole
+from routers.auth import get_current_user, role_required
+from routers.schemas import JobResponse
+from services.authorization import get_authorization_context
+from services.jobs import EXPORT_EVENTS, enqueue, has_output, stream_output
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_202_ACCEPTED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+def get_visible_job(db: Session, job_id: int, current_user: User) -> Job:
+    """
+    The job, if `current_user` may see it: ADMIN/KOORDYNATOR, the user who
+    enqueued it, or the teacher/leader of the change request it works on.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
+    if current_user.role in (UserRole.ADMIN, UserRole.KOORDYNATOR) or job.created_by_id == current_user.id:
+        return job
+
+    change_request_id = (job.payload or {}).get("change_request_id")
+    if change_request_id is not None:
+        course_id = db.query(CourseEvent.course_id).join(
+            ChangeRequest, ChangeRequest.course_event_id == CourseEvent.id
+        ).filter(ChangeRequest.id == change_request_id).scalar()
+        if course_id in get_authorization_context(db, current_user.id).related_course_ids:
+            return job
+    raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Not authorized to view this job.")
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return get_visible_job(db, job_id, current_user)
+
+@router.get("/{job_id}/download")
+def download_job_output(job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    job = get_visible_job(db, job_id, current_user)
+    if job.status != JobStatus.SUCCEEDED or not has_output(db, job.id):
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="Job has no output yet")
+    filename = (job.result or {}).get("filename", f"job-{job.id}.txt")
+    return StreamingResponse(
+        stream_output(job.id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/exports", response_model=JobResponse, status_code=HTTP_202_ACCEPTED)
+def create_export_job(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(role_required([UserRole.ADMIN, UserRole.KOORDYNATOR])),
+):
+    job = enqueue(db, EXPORT_EVENTS, {
+        "from": date_from.isoformat() if date_from else None,
+        "to": date_to.isoformat() if date_to else None,
+    }, created_by=current_user.id)
+    db.commit()
+    db.refresh(job)
+    return job
@@ -10,8 +10,6 @@ from model import (
     UserRole,
     ChangeRecomendation
 )
-# Ważne: importujemy funkcje z innych routerów
-from routers.change_recommendation import find_recommendations, accept_recommendation
 from routers.auth import get_current_user, role_required
 from routers.schemas import (
     ProposalCreate,
@@ -26,7 +24,8 @@ from starlette.status import (
     HTTP_404_NOT_FOUND,
 )
 
-from routers.schemas import ChangeRecomendationResponse, EquipmentResponse, ProposalCreateResponse, AvailabilityProposalResponse, RoomResponse
+from routers.schemas import JobResponse, ProposalCreateResponse, AvailabilityProposalResponse
+from services.jobs import RECOMMENDATIONS, enqueue
 
 router = APIRouter(prefix="/proposals", tags=["Availability Proposals"])
 
@@ -79,42 +78,22 @@ def create_proposal(
     leader_proposal = db.query(AvailabilityProposal).filter(AvailabilityProposal.change_request_id == change_request.id, AvailabilityProposal.user_id == leader_id).first()
 
     if teacher_proposal and leader_proposal:
-        # Obie strony podały dostępność, generujemy rekomendacje
-        print("sssss")
+        # Obie strony podały dostępność - rekomendacje liczy worker w tle
         existing_recommendations = db.query(ChangeRecomendation).filter(
             ChangeRecomendation.change_request_id == change_request.id
         ).first()
 
         if not existing_recommendations:
-            print("tripple")
-            recommendations = find_recommendations(change_request.id, db, current_user)
-            if recommendations:
-                parsed_recommendations = [
-                    ChangeRecomendationResponse(
-                        id=r.id,
-                        change_request_id=r.change_request_id,
-                        recommended_day=r.recommended_day,
-                        recommended_slot_id=r.recommended_slot_id,
-                        recommended_room_id=r.recommended_room_id,
-                        source_proposal_id=r.source_proposal_id,
-                        accepted_by_teacher=r.accepted_by_teacher,
-                        accepted_by_leader=r.accepted_by_leader,
-                        rejected_by_teacher=r.rejected_by_teacher,
-                        rejected_by_leader=r.rejected_by_leader,
-                        recommended_room=RoomResponse(
-                            id=r.recommended_room.id,
-                            name=r.recommended_room.name,
-                            capacity=r.recommended_room.capacity,
-                            type=r.recommended_room.type,
-                            equipment=[EquipmentResponse.from_orm(e) for e in r.recommended_room.equipment]
-                        )
-                    )
-                    for r in recommendations
-                ]
-                return ProposalCreateResponse(
-                    type="recommendations",
-                    data=parsed_recommendations
-                )
+            job = enqueue(
+                db, RECOMMENDATIONS, {"change_request_id": change_request.id},
+                key=f"recommendations:{change_request.id}", created_by=current_user.id
+            )
+            db.commit()
+            db.refresh(job)
+            return ProposalCreateResponse(
+                type="job",
+                data=JobResponse.from_orm(job)
+            )
 
     return ProposalCreateResponse(
         type="proposal",
@@ -163,7 +142,7 @@ def delete_proposal(proposal_id: int, db: Session = Depends(get_db), current_use
     response_model=list[ProposalResponse],
     status_code=HTTP_200_OK,
 )
-async def get_change_request_proposals(
+def get_change_request_proposals(
     change_request_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -195,7 +174,7 @@ async def get_change_request_proposals(
 
 
 @router.post("/{proposal_id}/changestatus/leader", response_model=ProposalResponse)
-async def change_status_by_leader(
+def change_status_by_leader(
         proposal_id: int, new_status: bool, db: Session = Depends(get_db), current_user: User = Depends(role_required([UserRole.PROWADZACY]))
 ):
     proposal = db.query(AvailabilityProposal).filter(AvailabilityProposal.id == proposal_id).first()
@@ -225,7 +204,7 @@ async def change_status_by_leader(
 
 
 @router.post("/{proposal_id}/changestatus/representative", response_model=ProposalResponse)
-async def change_status_by_representative(
+def change_status_by_representative(
         proposal_id: int, new_status: bool, db: Session = Depends(get_db), current_user: User = Depends(role_required([UserRole.STAROSTA]))
 ):
     proposal = db.query(AvailabilityProposal).filter(AvailabilityProposal.id == proposal_id).first()
@@ -255,7 +234,7 @@ async def change_status_by_representative(
 
 
 @router.delete("/{proposal_id}", status_code=HTTP_204_NO_CONTENT)
-async def delete_proposal(
+def delete_proposal(
     proposal_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
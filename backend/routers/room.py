@@ -1,17 +1,23 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
-from model import Equipment, Room, User, UserRole
+from fastapi import APIRouter, Depends, HTTPException, Query
+from model import Equipment, Room, RoomType, TimeSlots, User, UserRole
 from routers.auth import get_current_user, role_required
-from routers.schemas import RoomCreate, RoomResponse, RoomUpdate
-from sqlalchemy.orm import Session
+from routers.schemas import RoomAvailability, RoomAvailabilityResponse, RoomCreate, RoomResponse, RoomUpdate
+from services.equipment_masks import combine_masks, get_equipment_masks
+from services.free_busy import CellGrid, compute_free_busy
+from services.unavailability_index import get_unavailability_index
+from sqlalchemy.orm import Session, selectinload
 from starlette.status import (
-    HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_404_NOT_FOUND,
+    HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND,
     HTTP_409_CONFLICT, HTTP_422_UNPROCESSABLE_ENTITY
 )
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
+MAX_AVAILABILITY_DAYS = 366
+
 @router.get("", response_model=List[RoomResponse])
 @router.get("/", response_model=List[RoomResponse], include_in_schema=False)
 def get_rooms(db: Session = Depends(get_db)):
@@ -36,6 +42,70 @@ def create_room(room_data: RoomCreate, db: Session = Depends(get_db), current_us
     db.refresh(new_room)
     return new_room
 
+def matching_rooms(
+    db: Session,
+    equipment: Optional[str],
+    equipment_ids: List[int],
+    min_capacity: int,
+    type: Optional[RoomType],
+    room_ids: Optional[List[int]] = None,
+) -> List[Room]:
+    masks = get_equipment_masks(db)
+    required = combine_masks(masks.requirement_mask(equipment), masks.ids_mask(equipment_ids))
+
+    query = db.query(Room).options(selectinload(Room.equipment))
+    if room_ids:
+        query = query.filter(Room.id.in_(room_ids))
+    if min_capacity:
+        query = query.filter(Room.capacity >= min_capacity)
+    if type:
+        query = query.filter(Room.type == type)
+    return [room for room in query.order_by(Room.capacity, Room.id).all() if masks.matches(room.id, required)]
+
+@router.get("/search", response_model=List[RoomResponse])
+def search_rooms(
+    equipment: Optional[str] = Query(None, description="Comma separated equipment names, e.g. 'Rzutnik, Sprzęt audio'"),
+    equipment_ids: List[int] = Query([], description="Required equipment IDs"),
+    min_capacity: int = Query(0, ge=0),
+    type: Optional[RoomType] = None,
+    db: Session = Depends(get_db),
+):
+    return matching_rooms(db, equipment, equipment_ids, min_capacity, type)
+
+@router.get("/availability", response_model=RoomAvailabilityResponse)
+def get_room_availability(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    room_ids: List[int] = Query([], description="Restrict to these rooms"),
+    equipment: Optional[str] = Query(None, description="Comma separated equipment names"),
+    equipment_ids: List[int] = Query([], description="Required equipment IDs"),
+    min_capacity: int = Query(0, ge=0),
+    type: Optional[RoomType] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Wolne komórki (dzień, slot) sal w zakresie dat, zakodowane jako serie [pierwsza komórka, długość].
+
+    Numer komórki: (dzień - from) * len(time_slot_ids) + pozycja slotu w time_slot_ids.
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'")
+    if (date_to - date_from).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Range is limited to {MAX_AVAILABILITY_DAYS} days")
+
+    rooms = matching_rooms(db, equipment, equipment_ids, min_capacity, type, room_ids)
+    grid = CellGrid(date_from, date_to, db.query(TimeSlots).all())
+    free = compute_free_busy(db, grid, [room.id for room in rooms], get_unavailability_index(db))
+    return RoomAvailabilityResponse(
+        date_from=date_from,
+        date_to=date_to,
+        time_slot_ids=grid.slot_ids,
+        rooms=[
+            RoomAvailability(room_id=room.id, free_cells=sum(length for _, length in free[room.id]), free=free[room.id])
+            for room in rooms
+        ],
+    )
+
 @router.get("/{room_id}", response_model=RoomResponse)
 def get_room(room_id: int, db: Session = Depends(get_db)):
     room = db.query(Room).filter(Room.id == room_id).first()
@@ -1,9 +1,11 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from model import Room, RoomUnavailability, User, UserRole
 from routers.auth import get_current_user, role_required
 from routers.schemas import RoomUnavailabilityCreate, RoomUnavailabilityResponse, RoomUnavailabilityUpdate
+from services.unavailability_index import filter_overlapping
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from starlette.status import (
@@ -18,8 +20,25 @@ router = APIRouter(prefix="/room-unavailability", tags=["Room Unavailability"])
 
 @router.get("", response_model=List[RoomUnavailabilityResponse])
 @router.get("/", response_model=List[RoomUnavailabilityResponse], include_in_schema=False)
-def get_room_unavailabilities(db: Session = Depends(get_db)) -> List[RoomUnavailability]:
-    return db.query(RoomUnavailability).all()
+def get_room_unavailabilities(
+    room_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+) -> List[RoomUnavailability]:
+    """Blokady nachodzące na przedział [from, to), opcjonalnie dla jednej sali, stronicowane."""
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'")
+    query = db.query(RoomUnavailability)
+    if room_id is not None:
+        query = query.filter(RoomUnavailability.room_id == room_id)
+    query = filter_overlapping(query, date_from, date_to, db.get_bind().dialect.name)
+    query = query.order_by(RoomUnavailability.start_datetime, RoomUnavailability.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
 @router.post("", response_model=RoomUnavailabilityResponse, status_code=HTTP_201_CREATED)
 @router.post("/", response_model=RoomUnavailabilityResponse, status_code=HTTP_201_CREATED, include_in_schema=False)
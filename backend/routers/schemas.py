@@ -1,7 +1,7 @@
-from datetime import date, datetime
-from typing import Optional, List, Union
+from datetime import date, datetime, time
+from typing import Optional, List, Tuple, Union
 
-from model import ChangeRequestStatus, RoomType, UserRole
+from model import ChangeRequestStatus, JobStatus, RoomType, UserRole
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 
 
@@ -50,6 +50,17 @@ class RoomResponse(RoomBase, OrmBase):
         orm_mode = True
         from_attributes = True
 
+class RoomAvailability(BaseModel):
+    room_id: int
+    free_cells: int
+    free: List[Tuple[int, int]]  # [pierwsza wolna komórka, liczba kolejnych wolnych komórek]
+
+class RoomAvailabilityResponse(BaseModel):
+    date_from: date
+    date_to: date
+    time_slot_ids: List[int]
+    rooms: List[RoomAvailability]
+
 class UserBase(BaseModel):
     email: EmailStr
     name: str = Field(..., min_length=2, max_length=100)
@@ -69,6 +80,7 @@ class UserUpdate(BaseModel):
 class GroupBase(BaseModel):
     name: str = Field(..., min_length=3, max_length=100)
     year: Optional[int] = Field(None, ge=1, le=5)
+    size: Optional[int] = Field(None, ge=1)
     leader_id: int
 
 class GroupCreate(GroupBase):
@@ -77,6 +89,7 @@ class GroupCreate(GroupBase):
 class GroupUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=3, max_length=100)
     year: Optional[int] = Field(None, ge=1, le=5)
+    size: Optional[int] = Field(None, ge=1)
     leader_id: Optional[int] = None
 
 class GroupResponse(GroupBase, OrmBase):
@@ -87,6 +100,7 @@ class CourseBase(BaseModel):
     name: str
     teacher_id: int
     group_id: int
+    room_requirements: Optional[str] = None
 
 class CourseCreate(CourseBase):
     pass
@@ -95,6 +109,7 @@ class CourseUpdate(BaseModel):
     name: Optional[str] = None
     teacher_id: Optional[int] = None
     group_id: Optional[int] = None
+    room_requirements: Optional[str] = None
 
 class CourseResponse(CourseBase, OrmBase):
     id: int
@@ -114,6 +129,52 @@ class CourseEventCreate(CourseEventBase):
 class CourseEventResponse(CourseEventBase, OrmBase):
     id: int
 
+class CourseEventSeriesCreate(BaseModel):
+    course_id: int
+    room_id: Optional[int] = None
+    time_slot_id: int
+    weekday: int = Field(..., ge=0, le=6, description="0 = poniedziałek, 6 = niedziela")
+    interval_weeks: int = Field(1, ge=1, le=4, description="1 = co tydzień, 2 = co dwa tygodnie")
+    start_date: date
+    end_date: date
+    skip_dates: List[date] = Field([], description="Dni bez zajęć, np. święta")
+
+class EventImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class EventImportResponse(BaseModel):
+    rows: int
+    imported: int
+    atomic: bool
+    errors: List[EventImportRowError]
+    elapsed_ms: float
+
+class RoomAssignmentRequest(BaseModel):
+    date_from: date
+    date_to: date
+    dry_run: bool = False
+
+class AssignedRoom(BaseModel):
+    event_id: int
+    room_id: int
+
+class UnassignedEvent(BaseModel):
+    event_id: int
+    day: date
+    time_slot_id: int
+    reason: str
+
+class RoomAssignmentResponse(BaseModel):
+    dry_run: bool
+    cells: int
+    shards: int
+    assigned: List[AssignedRoom]
+    unassigned: List[UnassignedEvent]
+    wasted_seats: int
+    load_ms: float
+    solve_ms: float
+
 class CourseEventUpdate(BaseModel):
     room_id: Optional[int] = Field(None, description="ID of the new room for the event")
     day: Optional[date] = Field(None, description="New date for the event")
@@ -201,11 +262,48 @@ class ChangeRecomendationResponse(BaseModel):
     accepted_by_leader: bool
     rejected_by_teacher: bool
     rejected_by_leader: bool
+    score: Optional[float] = None
 
     class Config:
         orm_mode = True
         from_attributes = True
 
+class RecommendationBatchRequest(BaseModel):
+    change_request_ids: List[int] = []
+    all_pending: bool = False
+
+class RecommendationBatchItem(BaseModel):
+    change_request_id: int
+    status: str  # "ok", "existing", "not_found" lub "error"
+    recommendations: int
+    elapsed_ms: float
+    detail: Optional[str] = None
+
+class RecommendationBatchResponse(BaseModel):
+    results: List[RecommendationBatchItem]
+    elapsed_ms: float
+
+class SimulatedEvent(BaseModel):
+    id: Optional[int] = None  # brak dla wydarzeń, które dopiero powstaną
+    course_id: int
+    room_id: Optional[int]
+    day: date
+    time_slot_id: int
+
+class SimulatedConflict(BaseModel):
+    day: date
+    kinds: List[str]  # "room", "teacher", "group"
+
+class FinalizationSimulationResponse(BaseModel):
+    recommendation_id: int
+    change_request_id: int
+    cyclical: bool
+    feasible: bool
+    created: List[SimulatedEvent]
+    cancelled: List[SimulatedEvent]
+    conflicts: List[SimulatedConflict]
+    elapsed_ms: float
+
 class AvailabilityProposalResponse(BaseModel):
     id: int
     user_id: int
@@ -217,9 +315,20 @@ class AvailabilityProposalResponse(BaseModel):
         orm_mode = True
         from_attributes = True
 
+class JobResponse(OrmBase):
+    id: int
+    type: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
 class ProposalCreateResponse(BaseModel):
-    type: str  # "proposal" lub "recommendations"
-    data: Union[AvailabilityProposalResponse, List[ChangeRecomendationResponse]]
+    type: str  # "proposal", "recommendations" lub "job"
+    data: Union[AvailabilityProposalResponse, List[ChangeRecomendationResponse], JobResponse]
 
 
 # ... reszta schematów bez zmian
@@ -247,6 +356,32 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+class PrincipalCacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl_seconds: int
+    hits: int
+    misses: int
+    hit_ratio: Optional[float]
+    evictions: int
+    invalidations: int
+
+class PoolStats(BaseModel):
+    engine: str
+    pool_class: str
+    size: Optional[int]
+    max_overflow: Optional[int]
+    checked_in: Optional[int]
+    checked_out: int
+    overflow: Optional[int]
+    checkouts: int
+    peak_checked_out: int
+    overflow_events: int
+    timeouts: int
+    wait_ms_total: float
+    wait_ms_avg: Optional[float]
+    wait_ms_max: float
+
 class ProposalStatusResponse(BaseModel):
     teacher_has_proposed: bool
     leader_has_proposed: bool
@@ -261,3 +396,45 @@ class DashboardStatCard(BaseModel):
 class DashboardDataResponse(BaseModel):
     stats: DashboardStatCard
     recent_pending_requests: List[ChangeRequestResponse]
+
+# Dni tygodnia indeksowane od 0 (poniedziałek); wartości w by_time_slot w kolejności time_slot_ids
+class RoomUtilization(BaseModel):
+    room_id: int
+    name: str
+    type: RoomType
+    capacity: int
+    available_slots: int
+    booked_slots: int
+    occupancy_rate: Optional[float]
+    by_weekday: List[Optional[float]]
+    by_time_slot: List[Optional[float]]
+    capacity_fit: Optional[float]
+    idle: bool
+
+class RoomTypeUtilization(BaseModel):
+    type: RoomType
+    rooms: int
+    occupancy_rate: Optional[float]
+    by_weekday: List[Optional[float]]
+    by_time_slot: List[Optional[float]]
+    capacity_fit: Optional[float]
+
+class UtilizationPeak(BaseModel):
+    weekday: int
+    time_slot_id: int
+    start_time: time
+    booked_slots: int
+    occupancy_rate: Optional[float]
+
+class UtilizationResponse(BaseModel):
+    date_from: date
+    date_to: date
+    time_slot_ids: List[int]
+    occupancy_rate: Optional[float]
+    rooms: List[RoomUtilization]
+    room_types: List[RoomTypeUtilization]
+    peak_hours: List[UtilizationPeak]
+    idle_threshold: float
+    idle_room_ids: List[int]
+    computed_at: datetime
+    cached: bool
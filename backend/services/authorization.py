@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Tuple
+
+from config import get_settings
+from model import Course, Group
+from services.cache_versions import AUTHORIZATION, bump_cache_version, cache_version, cache_version_async
+from sqlalchemy import event, false, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+@dataclass(frozen=True)
+class AuthorizationContext:
+    """Courses a user teaches and groups they lead, with the courses of those groups."""
+    user_id: int
+    taught_course_ids: FrozenSet[int]
+    led_group_ids: FrozenSet[int]
+    led_course_ids: FrozenSet[int]
+
+    @property
+    def related_course_ids(self) -> FrozenSet[int]:
+        return self.taught_course_ids | self.led_course_ids
+
+    def is_teacher(self, course_id: int) -> bool:
+        return course_id in self.taught_course_ids
+
+    def is_leader(self, course_id: int) -> bool:
+        return course_id in self.led_course_ids
+
+
+def _context_query(user_id: int):
+    """
+    One round trip: taught courses UNION ALL led groups outer-joined with their courses.
+
+    Rows are (course_id, group_id, teaches); a led group without courses
+    comes back with a NULL course_id.
+    """
+    taught = select(
+        Course.id.label("course_id"), Course.group_id.label("group_id"), true().label("teaches")
+    ).where(Course.teacher_id == user_id)
+    led = select(Course.id, Group.id, false()).select_from(Group).outerjoin(
+        Course, Course.group_id == Group.id
+    ).where(Group.leader_id == user_id)
+    return union_all(taught, led)
+
+
+def _build(user_id: int, rows) -> AuthorizationContext:
+    taught, groups, led = set(), set(), set()
+    for course_id, group_id, teaches in rows:
+        if teaches:
+            taught.add(course_id)
+            continue
+        groups.add(group_id)
+        if course_id is not None:
+            led.add(course_id)
+    return AuthorizationContext(user_id, frozenset(taught), frozenset(groups), frozenset(led))
+
+
+class _AuthorizationCache:
+    """
+    Contexts by user id, LRU with a TTL.
+
+    A Course or Group write clears the cache of its own process on commit and
+    bumps the `authorization` cache version, so other processes drop entries
+    built under an older version once they re-read it.
+    """
+
+    def __init__(self):
+        self._items: "OrderedDict[int, Tuple[float, int, AuthorizationContext]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, version: int) -> Optional[AuthorizationContext]:
+        ttl = get_settings().AUTHZ_CACHE_TTL_SECONDS
+        with self._lock:
+            cached = self._items.get(user_id)
+            if cached is None or cached[1] != version or time.monotonic() - cached[0] > ttl:
+                return None
+            self._items.move_to_end(user_id)
+            return cached[2]
+
+    def put(self, context: AuthorizationContext, version: int) -> None:
+        with self._lock:
+            self._items[context.user_id] = (time.monotonic(), version, context)
+            self._items.move_to_end(context.user_id)
+            while len(self._items) > get_settings().AUTHZ_CACHE_SIZE:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+authorization_cache = _AuthorizationCache()
+
+
+def get_authorization_context(db: Session, user_id: int) -> AuthorizationContext:
+    version = cache_version(db, AUTHORIZATION)
+    context = authorization_cache.get(user_id, version)
+    if context is None:
+        context = _build(user_id, db.execute(_context_query(user_id)).all())
+        authorization_cache.put(context, version)
+    return context
+
+
+async def get_authorization_context_async(db: AsyncSession, user_id: int) -> AuthorizationContext:
+    """`get_authorization_context` for an AsyncSession."""
+    version = await cache_version_async(db, AUTHORIZATION)
+    context = authorization_cache.get(user_id, version)
+    if context is None:
+        context = _build(user_id, (await db.execute(_context_query(user_id))).all())
+        authorization_cache.put(context, version)
+    return context
+
+
+@event.listens_for(Session, "after_flush")
+def _detect_membership_changes(session: Session, flush_context) -> None:
+    # Zmiana prowadzącego, starosty albo grupy kursu może dotyczyć wielu użytkowników naraz
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Course, Group)):
+            if not session.info.get("authorization_stale"):
+                bump_cache_version(session, AUTHORIZATION)
+            session.info["authorization_stale"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_on_commit(session: Session) -> None:
+    if session.info.pop("authorization_stale", False):
+        authorization_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("authorization_stale", None)
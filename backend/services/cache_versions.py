@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from config import get_settings
+from model import CacheVersion
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+AUTHORIZATION = "authorization"
+PRINCIPALS = "principals"
+
+_VERSIONS = select(CacheVersion.name, CacheVersion.version)
+_UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def bump_cache_version(session: Session, name: str) -> None:
+    """Marks the data behind cache `name` as changed, in the caller's transaction."""
+    conn = session.connection()
+    table = CacheVersion.__table__
+    insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if insert is not None:
+        conn.execute(insert(table).values(name=name, version=1).on_conflict_do_update(
+            index_elements=["name"],
+            set_={"version": table.c.version + 1},
+        ))
+        return
+    updated = conn.execute(update(table).where(table.c.name == name).values(version=table.c.version + 1))
+    if not updated.rowcount:
+        conn.execute(table.insert().values(name=name, version=1))
+
+
+class _VersionWatch:
+    """
+    Last known cache_versions rows of this process.
+
+    They are re-read at most once per CACHE_VERSION_CHECK_SECONDS, so a busy
+    worker pays one small query per interval instead of one per request.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        with self._lock:
+            return (self._checked_at is None
+                    or time.monotonic() - self._checked_at >= get_settings().CACHE_VERSION_CHECK_SECONDS)
+
+    def update(self, rows) -> None:
+        with self._lock:
+            self._versions = dict(rows)
+            self._checked_at = time.monotonic()
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._versions = {}
+            self._checked_at = None
+
+
+version_watch = _VersionWatch()
+
+
+def cache_version(db: Session, name: str) -> int:
+    """Version of cache `name`; entries built under another version are stale."""
+    if version_watch.due():
+        version_watch.update(db.execute(_VERSIONS).all())
+    return version_watch.get(name)
+
+
+async def cache_version_async(db: AsyncSession, name: str) -> int:
+    """`cache_version` for an AsyncSession."""
+    if version_watch.due():
+        version_watch.update((await db.execute(_VERSIONS)).all())
+    return version_watch.get(name)
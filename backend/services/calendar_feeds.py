@@ -0,0 +1,233 @@
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Set, Tuple
+
+from config import get_settings
+from model import Course, CourseEvent, FeedVersion, Group, Room, TimeSlots, User
+from services.occupancy import GROUP, ROOM, TEACHER, Booking
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+FEED_KINDS = (TEACHER, GROUP, ROOM)
+# Wersja wspólna dla wszystkich feedów: nazwy sal, grup, prowadzących i godziny slotów
+GLOBAL = "all"
+
+FeedKey = Tuple[str, int]
+
+_UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+_TIMEZONE = "Europe/Warsaw"
+
+
+def feed_token(kind: str, entity_id: int) -> str:
+    """Secret part of a feed URL; calendar clients cannot send a bearer token."""
+    message = f"{kind}:{entity_id}".encode()
+    return hmac.new(get_settings().SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def check_feed_token(kind: str, entity_id: int, token: str) -> bool:
+    return hmac.compare_digest(feed_token(kind, entity_id), token or "")
+
+
+def bump_versions(session: Session, keys: Iterable[FeedKey]) -> None:
+    """Increments feed versions in the caller's transaction, creating missing rows."""
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    conn = session.connection()
+    table = FeedVersion.__table__
+    insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if insert is not None:
+        stmt = insert(table).values([{"kind": kind, "entity_id": entity_id, "version": 1} for kind, entity_id in keys])
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=["kind", "entity_id"],
+            set_={"version": table.c.version + 1},
+        ))
+        return
+    for kind, entity_id in keys:
+        updated = conn.execute(update(table).where(
+            table.c.kind == kind, table.c.entity_id == entity_id
+        ).values(version=table.c.version + 1))
+        if not updated.rowcount:
+            conn.execute(table.insert().values(kind=kind, entity_id=entity_id, version=1))
+
+
+def touch_feeds(session: Session, bookings: Iterable[Booking]) -> None:
+    """Marks the feeds showing `bookings` as changed; for bulk writes that bypass the ORM."""
+    bookings = list(bookings)
+    course_ids = {booking.course_id for booking in bookings}
+    if not course_ids:
+        return
+    owners = session.connection().execute(
+        select(Course.teacher_id, Course.group_id).where(Course.id.in_(course_ids))
+    ).all()
+    keys: Set[FeedKey] = {(ROOM, b.room_id) for b in bookings if b.room_id is not None}
+    for teacher_id, group_id in owners:
+        keys.add((TEACHER, teacher_id))
+        keys.add((GROUP, group_id))
+    bump_versions(session, keys)
+
+
+def current_etag(db: Session, kind: str, entity_id: int) -> str:
+    """ETag of a feed, read from two version rows only (no event rows are touched)."""
+    rows = dict(db.query(FeedVersion.kind, FeedVersion.version).filter(
+        ((FeedVersion.kind == kind) & (FeedVersion.entity_id == entity_id)) |
+        ((FeedVersion.kind == GLOBAL) & (FeedVersion.entity_id == 0))
+    ).all())
+    return f'"{kind}-{entity_id}-{rows.get(kind, 0)}.{rows.get(GLOBAL, 0)}-{window_start():%Y%m%d}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def window_start() -> date:
+    return date.today() - timedelta(days=get_settings().CALENDAR_FEED_PAST_DAYS)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    """RFC 5545 line folding: at most 75 octets per line, continuation lines start with a space."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        # Nie tniemy w środku znaku UTF-8
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+    return "\r\n ".join(parts)
+
+
+def render_feed(db: Session, kind: str, entity_id: int, name: str) -> str:
+    filters = {
+        TEACHER: Course.teacher_id == entity_id,
+        GROUP: Course.group_id == entity_id,
+        ROOM: CourseEvent.room_id == entity_id,
+    }
+    rows = db.execute(select(
+        CourseEvent.id, CourseEvent.day, CourseEvent.canceled, TimeSlots.start_time, TimeSlots.end_time,
+        Course.name, Room.name, Group.name, User.name, User.surname,
+    ).select_from(CourseEvent).join(
+        Course, CourseEvent.course_id == Course.id
+    ).join(
+        TimeSlots, CourseEvent.time_slot_id == TimeSlots.id
+    ).join(
+        Group, Course.group_id == Group.id
+    ).join(
+        User, Course.teacher_id == User.id
+    ).outerjoin(
+        Room, CourseEvent.room_id == Room.id
+    ).where(
+        filters[kind], CourseEvent.day >= window_start()
+    ).order_by(CourseEvent.day, TimeSlots.start_time, CourseEvent.id))
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//AGH//System Rezerwacji Sal//PL",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_escape(name)}",
+        f"X-WR-TIMEZONE:{_TIMEZONE}",
+    ]
+    for event_id, day, canceled, start, end, course, room, group, teacher_name, teacher_surname in rows:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:course-event-{event_id}@rezerwacje.agh",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;TZID={_TIMEZONE}:{datetime.combine(day, start):%Y%m%dT%H%M%S}",
+            f"DTEND;TZID={_TIMEZONE}:{datetime.combine(day, end):%Y%m%dT%H%M%S}",
+            f"SUMMARY:{_escape(course)}",
+            f"LOCATION:{_escape(room or '')}",
+            f"DESCRIPTION:{_escape(f'{teacher_name} {teacher_surname}, {group}')}",
+            f"STATUS:{'CANCELLED' if canceled else 'CONFIRMED'}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+class _FeedCache:
+    """Rendered feeds by (kind, id), each kept with the ETag it was rendered for (LRU)."""
+
+    def __init__(self):
+        self._items: "OrderedDict[FeedKey, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: FeedKey, etag: str) -> Optional[str]:
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is None or cached[0] != etag:
+                return None
+            self._items.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: FeedKey, etag: str, body: str) -> None:
+        with self._lock:
+            self._items[key] = (etag, body)
+            self._items.move_to_end(key)
+            while len(self._items) > get_settings().CALENDAR_FEED_CACHE_SIZE:
+                self._items.popitem(last=False)
+
+
+feed_cache = _FeedCache()
+
+
+def get_feed(db: Session, kind: str, entity_id: int, name: str, etag: str) -> str:
+    """Returns the cached body for `etag`, rendering it only when the feed's version moved."""
+    body = feed_cache.get((kind, entity_id), etag)
+    if body is None:
+        body = render_feed(db, kind, entity_id, name)
+        feed_cache.put((kind, entity_id), etag, body)
+    return body
+
+
+def _values(obj, key: str) -> Set:
+    """Current and pre-flush values of an attribute."""
+    history = inspect(obj).attrs[key].history
+    return {value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None}
+
+
+@event.listens_for(CourseEvent.room_id, "set", active_history=True)
+@event.listens_for(CourseEvent.course_id, "set", active_history=True)
+@event.listens_for(Course.teacher_id, "set", active_history=True)
+@event.listens_for(Course.group_id, "set", active_history=True)
+def _load_replaced_owner(target, value, oldvalue, initiator) -> None:
+    """Nothing to do: active_history makes the ORM load an expired old value, so the feed it leaves is bumped too."""
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session: Session, flush_context) -> None:
+    keys: Set[FeedKey] = set()
+    course_ids: Set[int] = set()
+    changed = list(session.new) + [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in changed + list(session.deleted):
+        if isinstance(obj, CourseEvent):
+            keys.update((ROOM, room_id) for room_id in _values(obj, "room_id"))
+            course_ids.update(_values(obj, "course_id"))
+        elif isinstance(obj, Course):
+            keys.update((TEACHER, teacher_id) for teacher_id in _values(obj, "teacher_id"))
+            keys.update((GROUP, group_id) for group_id in _values(obj, "group_id"))
+        elif isinstance(obj, (Room, Group, User, TimeSlots)) and obj not in session.new:
+            keys.add((GLOBAL, 0))
+    if course_ids:
+        for teacher_id, group_id in session.connection().execute(
+            select(Course.teacher_id, Course.group_id).where(Course.id.in_(course_ids))
+        ):
+            keys.add((TEACHER, teacher_id))
+            keys.add((GROUP, group_id))
+    bump_versions(session, keys)
@@ -0,0 +1,170 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+QUEUE = "queue"
+NULL = "null"
+
+
+class PoolMetrics:
+    """Checkout counters of one pool, shared by the pools an engine recreates on dispose()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.overflow_events = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def checked_out(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def waited(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def timed_out(self, seconds: float) -> None:
+        self.waited(seconds)
+        with self._lock:
+            self.timeouts += 1
+
+    def overflowed(self) -> None:
+        with self._lock:
+            self.overflow_events += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "peak_checked_out": self.peak_in_use,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_total * 1000, 2),
+                "wait_ms_avg": round(self.wait_total * 1000 / self.waits, 3) if self.waits else None,
+                "wait_ms_max": round(self.wait_max * 1000, 2),
+            }
+
+
+class _MeteredPool:
+    """
+    Mixin timing every checkout (waiting for a free connection, opening a new
+    one, pre-ping) through the public Pool.connect(). Checkouts, checkins and
+    overflow connections are counted by the pool event listeners that
+    `instrument_pool` registers on the engine.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        # QueuePool nie udostępnia publicznie max_overflow, a raport go pokazuje
+        self.max_overflow_limit: Optional[int] = kwargs.get("max_overflow")
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.timed_out(time.perf_counter() - started)
+            raise
+        self.metrics.waited(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class MeteredNullPool(_MeteredPool, NullPool):
+    pass
+
+
+def instrument_pool(engine: Engine) -> None:
+    """
+    Feeds the engine's pool metrics from the checkout/checkin/connect pool events.
+
+    Listeners registered on the engine are carried over to the pool that
+    dispose() creates, and look the metrics up on whichever pool is current.
+    """
+    def metrics() -> PoolMetrics:
+        # Pula bez liczników (np. domyślna dla SQLite w pamięci) dostaje jednorazowy obiekt
+        return getattr(engine.pool, "metrics", None) or PoolMetrics()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        metrics().checked_out()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record) -> None:
+        metrics().checked_in()
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record) -> None:
+        # Nowe połączenie przy dodatnim overflow() to połączenie ponad pool_size
+        pool = engine.pool
+        if isinstance(pool, QueuePool) and pool.overflow() > 0:
+            metrics().overflowed()
+
+
+def engine_pool_options(url: str, settings, is_async: bool = False) -> Dict:
+    """
+    Pool keyword arguments of create_engine/create_async_engine from Settings.
+
+    In-memory SQLite keeps the dialect's default pool, because every new
+    connection would otherwise see a different, empty database.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING, "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS}
+    if settings.DB_POOL_MODE == NULL:
+        return {**options, "poolclass": MeteredNullPool}
+    return {
+        **options,
+        "poolclass": MeteredAsyncQueuePool if is_async else MeteredQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def pool_stats(name: str, pool) -> Dict:
+    """Current state of `pool` together with its checkout counters (zeros for an unmetered pool)."""
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    queued = isinstance(pool, QueuePool)
+    stats = {
+        "engine": name,
+        "pool_class": type(pool).__name__,
+        "size": pool.size() if queued else None,
+        "max_overflow": getattr(pool, "max_overflow_limit", None) if queued else None,
+        "checked_in": pool.checkedin() if queued else None,
+        "checked_out": pool.checkedout() if queued else (metrics.in_use if metrics else 0),
+        "overflow": max(0, pool.overflow()) if queued else None,
+    }
+    stats.update(metrics.snapshot() if metrics else PoolMetrics().snapshot())
+    return stats
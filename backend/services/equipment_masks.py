@@ -0,0 +1,124 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config import get_settings
+from model import Equipment, Room, room_equipment_association
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Maska, której nie spełnia żadna sala (wymagane wyposażenie nie istnieje)
+UNSATISFIABLE = -1
+
+
+def parse_room_requirements(room_requirements: Optional[str]) -> List[str]:
+    if not room_requirements:
+        return []
+    return [name.strip().lower() for name in room_requirements.split(',') if name.strip()]
+
+
+def combine_masks(*masks: int) -> int:
+    combined = 0
+    for mask in masks:
+        if mask == UNSATISFIABLE:
+            return UNSATISFIABLE
+        combined |= mask
+    return combined
+
+
+class EquipmentMasks:
+    """
+    Per-room equipment bitmasks; bit `n` is set when the room has equipment with id `n`.
+
+    A room satisfies a requirement mask when `room_mask & mask == mask`, which
+    replaces the per-slot GROUP BY / HAVING join over room_equipment_association.
+    """
+
+    def __init__(self, name_bits: Dict[str, int], room_masks: Dict[int, int]):
+        self.name_bits = name_bits
+        self.room_masks = room_masks
+        self.known_bits = 0
+        for bit in name_bits.values():
+            self.known_bits |= bit
+        self._requirement_cache: Dict[str, int] = {}
+        self.loaded_at = time.monotonic()
+
+    def requirement_mask(self, room_requirements: Optional[str]) -> int:
+        """Parses a comma separated list of equipment names into a mask (cached per string)."""
+        key = room_requirements or ""
+        mask = self._requirement_cache.get(key)
+        if mask is None:
+            mask = 0
+            for name in parse_room_requirements(room_requirements):
+                bit = self.name_bits.get(name)
+                if bit is None:
+                    mask = UNSATISFIABLE
+                    break
+                mask |= bit
+            self._requirement_cache[key] = mask
+        return mask
+
+    def ids_mask(self, equipment_ids: Iterable[int]) -> int:
+        mask = 0
+        for equipment_id in equipment_ids:
+            bit = 1 << equipment_id
+            if not self.known_bits & bit:
+                return UNSATISFIABLE
+            mask |= bit
+        return mask
+
+    def matches(self, room_id: int, mask: int) -> bool:
+        if mask == UNSATISFIABLE:
+            return False
+        return self.room_masks.get(room_id, 0) & mask == mask
+
+
+def load_masks(db: Session) -> EquipmentMasks:
+    name_bits: Dict[str, int] = {}
+    for equipment_id, name in db.query(Equipment.id, Equipment.name).all():
+        key = name.strip().lower()
+        name_bits[key] = name_bits.get(key, 0) | (1 << equipment_id)
+
+    room_masks: Dict[int, int] = {room_id: 0 for room_id, in db.query(Room.id).all()}
+    rows = db.query(room_equipment_association.c.room_id, room_equipment_association.c.equipment_id).all()
+    for room_id, equipment_id in rows:
+        room_masks[room_id] = room_masks.get(room_id, 0) | (1 << equipment_id)
+    return EquipmentMasks(name_bits, room_masks)
+
+
+_masks: Optional[EquipmentMasks] = None
+_lock = threading.Lock()
+
+
+def get_equipment_masks(db: Session) -> EquipmentMasks:
+    global _masks
+    ttl = get_settings().EQUIPMENT_MASKS_TTL_SECONDS
+    with _lock:
+        if _masks is None or time.monotonic() - _masks.loaded_at > ttl:
+            _masks = load_masks(db)
+        return _masks
+
+
+def invalidate_equipment_masks() -> None:
+    global _masks
+    with _lock:
+        _masks = None
+
+
+@event.listens_for(Session, "after_flush")
+def _detect_equipment_changes(session: Session, flush_context) -> None:
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Room, Equipment)):
+            session.info["equipment_masks_stale"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop("equipment_masks_stale", False):
+        invalidate_equipment_masks()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("equipment_masks_stale", None)
@@ -0,0 +1,202 @@
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from model import Course, CourseEvent, Room, TimeSlots
+from services.calendar_feeds import touch_feeds
+from services.occupancy import Booking, record_bookings
+from services.recommendation_invalidation import invalidate_recommendations
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+REQUIRED_COLUMNS = ("course", "room", "day", "slot")
+_COPY_COLUMNS = ("course_id", "room_id", "day", "time_slot_id", "canceled", "was_rescheduled")
+
+
+@dataclass
+class RowError:
+    row: int  # numer wiersza w pliku (nagłówek = 1)
+    errors: List[str]
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    imported: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+
+class _Lookup:
+    """
+    Resolves a CSV value given either as an ID or as a (case-insensitive) name.
+
+    IDs win over names, so a name that looks like another entity's ID cannot
+    shadow it. A name shared by several entities resolves to nothing and is
+    reported as ambiguous.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[int, str]]):
+        self.by_id: Dict[str, int] = {}
+        self.by_name: Dict[str, Set[int]] = {}
+        for entity_id, name in pairs:
+            self.by_id[str(entity_id)] = entity_id
+            self.by_name.setdefault(name.strip().lower(), set()).add(entity_id)
+
+    def resolve(self, value: str) -> Optional[int]:
+        key = value.strip().lower()
+        if key in self.by_id:
+            return self.by_id[key]
+        ids = self.by_name.get(key, ())
+        return next(iter(ids)) if len(ids) == 1 else None
+
+    def is_ambiguous(self, value: str) -> bool:
+        key = value.strip().lower()
+        return key not in self.by_id and len(self.by_name.get(key, ())) > 1
+
+
+def _resolve(lookup: _Lookup, value: str, label: str, errors: List[str]) -> Optional[int]:
+    entity_id = lookup.resolve(value)
+    if entity_id is None:
+        if lookup.is_ambiguous(value):
+            errors.append(f"Ambiguous {label} name '{value}', use the ID")
+        else:
+            errors.append(f"Unknown {label} '{value}'")
+    return entity_id
+
+
+def _load_lookups(db: Session):
+    courses = db.execute(select(Course.id, Course.name, Course.teacher_id, Course.group_id)).all()
+    owners = {course_id: (teacher_id, group_id) for course_id, _, teacher_id, group_id in courses}
+    slot_pairs = [(slot_id, start.strftime("%H:%M")) for slot_id, start in db.execute(select(TimeSlots.id, TimeSlots.start_time))]
+    return (
+        _Lookup((course_id, name) for course_id, name, _, _ in courses),
+        _Lookup(db.execute(select(Room.id, Room.name)).all()),
+        _Lookup(slot_pairs),
+        owners,
+    )
+
+
+def _parse_rows(
+    reader: csv.DictReader,
+    course_lookup: _Lookup,
+    room_lookup: _Lookup,
+    slot_lookup: _Lookup,
+    report: ImportReport,
+) -> List[Tuple[int, Booking]]:
+    parsed = []
+    for line, record in enumerate(reader, start=2):
+        report.rows += 1
+        errors = []
+        course_id = _resolve(course_lookup, record.get("course") or "", "course", errors)
+        room_value = (record.get("room") or "").strip()
+        room_id = _resolve(room_lookup, room_value, "room", errors) if room_value else None
+        slot_id = _resolve(slot_lookup, record.get("slot") or "", "time slot", errors)
+        try:
+            day = date.fromisoformat((record.get("day") or "").strip())
+        except ValueError:
+            errors.append(f"Invalid day '{record.get('day')}' (expected YYYY-MM-DD)")
+            day = None
+        if errors:
+            report.errors.append(RowError(line, errors))
+        else:
+            parsed.append((line, Booking(course_id, room_id, day, slot_id)))
+    return parsed
+
+
+def _check_conflicts(db: Session, parsed: List[Tuple[int, Booking]], owners, report: ImportReport) -> List[Booking]:
+    """
+    Marks rows colliding with the timetable or with earlier rows of the same file.
+
+    Existing bookings of the file's date range are read with one query and kept
+    as sets of (room|teacher|group, day, slot) cells. A cancelled event still
+    holds its room cell, because uq_room_day_time covers it.
+    """
+    if not parsed:
+        return []
+    days = [booking.day for _, booking in parsed]
+    taken: Set[Tuple[str, int, date, int]] = set()
+    rows = db.execute(select(
+        CourseEvent.room_id, CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.canceled,
+        Course.teacher_id, Course.group_id
+    ).join(Course, CourseEvent.course_id == Course.id).where(
+        CourseEvent.day >= min(days), CourseEvent.day <= max(days)
+    ))
+    for room_id, day, slot_id, canceled, teacher_id, group_id in rows:
+        if room_id is not None:
+            taken.add(("room", room_id, day, slot_id))
+        if canceled:
+            continue
+        taken.add(("teacher", teacher_id, day, slot_id))
+        taken.add(("group", group_id, day, slot_id))
+
+    accepted = []
+    for line, booking in parsed:
+        teacher_id, group_id = owners[booking.course_id]
+        cells = [("teacher", teacher_id), ("group", group_id)]
+        if booking.room_id is not None:
+            cells.insert(0, ("room", booking.room_id))
+        cells = [(kind, entity_id, booking.day, booking.time_slot_id) for kind, entity_id in cells]
+        clashes = [cell[0] for cell in cells if cell in taken]
+        if clashes:
+            report.errors.append(RowError(line, [f"Conflict on {booking.day.isoformat()}: {', '.join(clashes)} busy"]))
+            continue
+        taken.update(cells)
+        accepted.append(booking)
+    return accepted
+
+
+def _copy_bookings(db: Session, bookings: List[Booking]) -> None:
+    """Loads rows with COPY on Postgres and with one executemany INSERT elsewhere."""
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for booking in bookings:
+            writer.writerow((booking.course_id, "" if booking.room_id is None else booking.room_id,
+                             booking.day.isoformat(), booking.time_slot_id, "f", "f"))
+        buffer.seek(0)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY course_events ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        return
+    connection.execute(insert(CourseEvent.__table__), [
+        {"course_id": b.course_id, "room_id": b.room_id, "day": b.day, "time_slot_id": b.time_slot_id,
+         "canceled": False, "was_rescheduled": False}
+        for b in bookings
+    ])
+
+
+def import_events(db: Session, stream: io.TextIOBase, atomic: bool = True) -> ImportReport:
+    """
+    Imports course events from a CSV with `course,room,day,slot` columns.
+
+    Courses and rooms may be given by ID or name and slots by ID or start time
+    ("HH:MM"); an empty room leaves the event unassigned. With `atomic` nothing
+    is written when any row fails, otherwise the valid rows are loaded. The
+    caller commits.
+    """
+    report = ImportReport()
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        report.errors.append(RowError(1, [f"Missing column(s): {', '.join(missing)}"]))
+        return report
+
+    course_lookup, room_lookup, slot_lookup, owners = _load_lookups(db)
+    parsed = _parse_rows(reader, course_lookup, room_lookup, slot_lookup, report)
+    accepted = _check_conflicts(db, parsed, owners, report)
+    report.errors.sort(key=lambda error: error.row)
+    if not accepted or (atomic and report.errors):
+        return report
+
+    _copy_bookings(db, accepted)
+    # Zapis z pominięciem unit of work nie uruchamia hooków after_flush
+    record_bookings(db, added=accepted)
+    invalidate_recommendations(db, bookings=accepted)
+    touch_feeds(db, accepted)
+    report.imported = len(accepted)
+    return report
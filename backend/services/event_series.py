@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+from model import CourseEvent
+from services.calendar_feeds import touch_feeds
+from services.occupancy import Booking, record_bookings
+from services.recommendation_invalidation import invalidate_recommendations
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+
+def series_days(
+    start_date: date,
+    end_date: date,
+    weekday: int,
+    interval_weeks: int = 1,
+    skip_dates: Iterable[date] = (),
+) -> List[date]:
+    """Every `interval_weeks`-th `weekday` (0=pon) from the first one on or after `start_date`."""
+    first = start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+    skipped = set(skip_dates)
+    days = []
+    day = first
+    while day <= end_date:
+        if day not in skipped:
+            days.append(day)
+        day += timedelta(weeks=interval_weeks)
+    return days
+
+
+def insert_series(
+    db: Session,
+    course_id: int,
+    room_id: Optional[int],
+    time_slot_id: int,
+    days: List[date],
+) -> List[CourseEvent]:
+    """Inserts all occurrences with one statement; the caller has checked conflicts and commits."""
+    events = list(db.scalars(insert(CourseEvent).returning(CourseEvent), [
+        {
+            "course_id": course_id,
+            "room_id": room_id,
+            "day": day,
+            "time_slot_id": time_slot_id,
+            "canceled": False,
+            "was_rescheduled": False,
+        }
+        for day in days
+    ]))
+
+    # Zapis z pominięciem unit of work nie uruchamia hooków after_flush
+    bookings = [Booking(course_id, room_id, day, time_slot_id) for day in days]
+    record_bookings(db, added=bookings)
+    invalidate_recommendations(db, bookings=bookings)
+    touch_feeds(db, bookings)
+    return events
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Iterable, Iterator, Optional, Sequence
+
+from database import engine
+from model import Course, CourseEvent, Group, Room, TimeSlots, User
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+CSV = "csv"
+NDJSON = "ndjson"
+MEDIA_TYPES = {CSV: "text/csv", NDJSON: "application/x-ndjson"}
+
+EXPORT_COLUMNS = [
+    "id", "day", "time_slot_id", "start_time", "end_time", "course_id", "course",
+    "teacher", "group", "room", "canceled", "was_rescheduled",
+]
+EXPORT_BATCH_ROWS = 5000
+
+
+def export_events_query(date_from: Optional[date] = None, date_to: Optional[date] = None):
+    query = select(
+        CourseEvent.id, CourseEvent.day, CourseEvent.time_slot_id, TimeSlots.start_time, TimeSlots.end_time,
+        CourseEvent.course_id, Course.name, (User.name + " " + User.surname), Group.name, Room.name,
+        CourseEvent.canceled, CourseEvent.was_rescheduled,
+    ).select_from(CourseEvent).join(Course, CourseEvent.course_id == Course.id).join(
+        User, Course.teacher_id == User.id
+    ).join(
+        Group, Course.group_id == Group.id
+    ).join(
+        TimeSlots, CourseEvent.time_slot_id == TimeSlots.id
+    ).outerjoin(
+        Room, CourseEvent.room_id == Room.id
+    ).order_by(CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.id)
+    if date_from:
+        query = query.where(CourseEvent.day >= date_from)
+    if date_to:
+        query = query.where(CourseEvent.day <= date_to)
+    return query
+
+
+def stream_event_batches(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    bind: Optional[Engine] = None,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> Iterator[Sequence[tuple]]:
+    """
+    Yields export rows in batches of plain Core tuples from a server-side cursor.
+
+    Only one batch is held in memory at a time, so the cost does not depend on
+    the size of the export. Runs on its own connection, which also lets the
+    generator outlive the request-scoped session of a streaming response.
+    """
+    with (bind or engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_rows).execute(
+            export_events_query(date_from, date_to)
+        )
+        for batch in result.partitions():
+            yield batch
+
+
+def encode_csv(batches: Iterable[Sequence[tuple]], header: bool = True) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_ndjson(batches: Iterable[Sequence[tuple]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in batch)
+
+
+ENCODERS = {CSV: encode_csv, NDJSON: encode_ndjson}
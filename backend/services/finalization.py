@@ -0,0 +1,235 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from model import AvailabilityProposal, ChangeRecomendation, ChangeRequest, ChangeRequestStatus, Course, CourseEvent
+from services.calendar_feeds import touch_feeds
+from services.occupancy import GROUP, HELD, TEACHER, Booking, OccupancyIndex, record_bookings
+from services.recommendation_invalidation import invalidate_recommendations
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_409_CONFLICT
+
+ROOM_CONFLICT = "room"
+TEACHER_CONFLICT = "teacher"
+GROUP_CONFLICT = "group"
+
+
+def shift_to_weekday(original_date: date, target_weekday: int) -> date:
+    """Zwraca datę z tego samego tygodnia co `original_date`, ale z podmienionym dniem tygodnia (0=pon, 6=niedz)."""
+    current_weekday = original_date.weekday()
+    return original_date + timedelta(days=(target_weekday - current_weekday))
+
+
+@dataclass
+class FinalizationPlan:
+    """What accepting a recommendation does to the timetable: one moved event per affected week."""
+    change_request: ChangeRequest
+    recommendation: ChangeRecomendation
+    # Pary (odwoływane wydarzenie, nowy termin)
+    moves: List[Tuple[CourseEvent, Booking]]
+    was_rescheduled: bool
+    conflicts: Dict[date, Set[str]] = field(default_factory=dict)
+
+    @property
+    def cancelled(self) -> List[CourseEvent]:
+        return [event for event, _ in self.moves]
+
+    @property
+    def created(self) -> List[Booking]:
+        return [booking for _, booking in self.moves]
+
+    def conflict_detail(self) -> str:
+        return describe_conflicts(self.conflicts)
+
+
+def related_events(db: Session, change_request: ChangeRequest, recommendation: ChangeRecomendation) -> List[CourseEvent]:
+    """Events moved by the request: the original one, or every week of it for cyclical requests."""
+    original_event = change_request.course_event
+    if not change_request.cyclical:
+        return [original_event]
+
+    start = change_request.start_date or recommendation.recommended_day
+    end = change_request.end_date or date.max
+    events = db.query(CourseEvent).filter(
+        CourseEvent.course_id == original_event.course_id,
+        CourseEvent.time_slot_id == original_event.time_slot_id,
+        CourseEvent.day >= start,
+        CourseEvent.day <= end,
+        CourseEvent.canceled == False
+    ).order_by(CourseEvent.day).all()
+    # Dzień tygodnia filtrowany w Pythonie: wydarzeń jednego kursu jest kilkanaście
+    return [event for event in events if event.day.weekday() == original_event.day.weekday()]
+
+
+def plan_finalization(db: Session, recommendation: ChangeRecomendation) -> FinalizationPlan:
+    change_request = recommendation.change_request
+    target_weekday = recommendation.recommended_day.weekday()
+    moves = []
+    for event in related_events(db, change_request, recommendation):
+        new_day = shift_to_weekday(event.day, target_weekday) if change_request.cyclical else recommendation.recommended_day
+        moves.append((event, Booking(
+            event.course_id, recommendation.recommended_room_id, new_day, recommendation.recommended_slot_id
+        )))
+    return FinalizationPlan(
+        change_request=change_request,
+        recommendation=recommendation,
+        moves=moves,
+        was_rescheduled=not change_request.cyclical,
+    )
+
+
+def find_slot_conflicts(
+    db: Session,
+    days: Iterable[date],
+    time_slot_id: int,
+    room_id: Optional[int],
+    teacher_id: int,
+    group_id: int,
+    excluded_event_ids: Iterable[int] = (),
+) -> Dict[date, Set[str]]:
+    """
+    Room, teacher and group conflicts of one time slot on many days, one query per kind.
+
+    Any existing row occupies its room cell, also a cancelled one or one in
+    `excluded_event_ids` (cancelling keeps the row), because uq_room_day_time
+    covers it. Teacher and group conflicts only count active, non-excluded events.
+    """
+    days = sorted(set(days))
+    if not days:
+        return {}
+    excluded = list(excluded_event_ids)
+
+    def conflicting_days(criterion, active_only: bool = True) -> Set[date]:
+        stmt = select(CourseEvent.day).join(Course, CourseEvent.course_id == Course.id).where(
+            CourseEvent.day.in_(days),
+            CourseEvent.time_slot_id == time_slot_id,
+            criterion
+        ).distinct()
+        if active_only:
+            stmt = stmt.where(CourseEvent.canceled == False)
+            if excluded:
+                stmt = stmt.where(CourseEvent.id.not_in(excluded))
+        return set(db.scalars(stmt))
+
+    checks = [
+        (TEACHER_CONFLICT, Course.teacher_id == teacher_id, True),
+        (GROUP_CONFLICT, Course.group_id == group_id, True),
+    ]
+    if room_id is not None:
+        checks.insert(0, (ROOM_CONFLICT, CourseEvent.room_id == room_id, False))
+    conflicts: Dict[date, Set[str]] = {}
+    for kind, criterion, active_only in checks:
+        for day in conflicting_days(criterion, active_only):
+            conflicts.setdefault(day, set()).add(kind)
+    return conflicts
+
+
+def find_conflicts(db: Session, plan: FinalizationPlan) -> Dict[date, Set[str]]:
+    """
+    Room, teacher and group conflicts of every target date of the plan.
+
+    Events cancelled by the plan itself are ignored for teacher and group
+    conflicts, so moving an event within the same day does not collide with
+    its own old slot. Their rows stay in the table, so they still hold the room.
+    """
+    course = plan.change_request.course_event.course
+    rec = plan.recommendation
+    return find_slot_conflicts(
+        db,
+        [booking.day for booking in plan.created],
+        rec.recommended_slot_id,
+        rec.recommended_room_id,
+        course.teacher_id,
+        course.group_id,
+        [event.id for event in plan.cancelled],
+    )
+
+
+def describe_conflicts(conflicts: Dict[date, Set[str]]) -> str:
+    weeks = ", ".join(f"{day.isoformat()} ({', '.join(sorted(kinds))})" for day, kinds in sorted(conflicts.items()))
+    return f"Conflicts in {len(conflicts)} week(s): {weeks}"
+
+
+def find_conflicts_in_index(index: OccupancyIndex, plan: FinalizationPlan) -> Dict[date, Set[str]]:
+    """
+    Same answer as `find_conflicts`, read from the in-memory occupancy index.
+
+    The plan is laid over the index without touching it: teacher and group
+    cells of the events it cancels are subtracted from the stored counts
+    before checking. Rooms are read from the HELD layer and nothing is
+    subtracted, because cancelled rows keep their room cell.
+    """
+    course = plan.change_request.course_event.course
+    kinds = ((ROOM_CONFLICT, HELD), (TEACHER_CONFLICT, TEACHER), (GROUP_CONFLICT, GROUP))
+
+    def cells(booking: Booking):
+        owners = {HELD: booking.room_id, TEACHER: course.teacher_id, GROUP: course.group_id}
+        return [(name, kind, owners[kind], booking.day, booking.time_slot_id)
+                for name, kind in kinds if owners[kind] is not None]
+
+    freed = Counter()
+    for event in plan.cancelled:
+        freed.update(cell for cell in cells(Booking(event.course_id, event.room_id, event.day, event.time_slot_id))
+                     if cell[1] != HELD)
+
+    conflicts: Dict[date, Set[str]] = {}
+    for booking in plan.created:
+        for cell in cells(booking):
+            name, kind, entity_id, day, slot_id = cell
+            if index.count(kind, entity_id, day, slot_id) - freed[cell] > 0:
+                conflicts.setdefault(day, set()).add(name)
+    return conflicts
+
+
+def apply_plan(db: Session, plan: FinalizationPlan) -> None:
+    """Bulk-inserts the new events and cancels the old ones; the caller commits."""
+    if not plan.moves:
+        return
+    removed = [Booking(e.course_id, e.room_id, e.day, e.time_slot_id) for e in plan.cancelled]
+    db.execute(insert(CourseEvent), [
+        {
+            "course_id": booking.course_id,
+            "room_id": booking.room_id,
+            "day": booking.day,
+            "time_slot_id": booking.time_slot_id,
+            "canceled": False,
+            "was_rescheduled": plan.was_rescheduled,
+        }
+        for booking in plan.created
+    ])
+    db.execute(
+        update(CourseEvent).where(CourseEvent.id.in_([event.id for event in plan.cancelled])).values(canceled=True)
+    )
+
+    # Zapisy z pominięciem unit of work nie uruchamiają hooków after_flush
+    record_bookings(db, added=plan.created, cancelled=removed)
+    invalidate_recommendations(db, bookings=plan.created)
+    touch_feeds(db, plan.created + removed)
+
+
+def finalize_recommendation(rec: ChangeRecomendation, db: Session) -> ChangeRequest:
+    """Applies an accepted recommendation and closes its request; 409 when the target slot is no longer free."""
+    plan = plan_finalization(db, rec)
+    plan.conflicts = find_conflicts(db, plan)
+    if plan.conflicts:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=plan.conflict_detail())
+    apply_plan(db, plan)
+    change_request = plan.change_request
+
+    change_request.status = ChangeRequestStatus.ACCEPTED
+
+    # Czyszczenie danych pomocniczych
+    db.query(ChangeRecomendation).filter(
+        ChangeRecomendation.change_request_id == change_request.id
+    ).delete(synchronize_session=False)
+
+    db.query(AvailabilityProposal).filter(
+        AvailabilityProposal.change_request_id == change_request.id
+    ).delete(synchronize_session=False)
+
+    db.commit()
+    db.refresh(change_request)
+    return change_request
@@ -0,0 +1,110 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from model import CourseEvent, TimeSlots
+from services.unavailability_index import UnavailabilityIndex
+from sqlalchemy.orm import Session
+
+# Przedział komórek [początek, koniec)
+Run = Tuple[int, int]
+
+
+class CellGrid:
+    """
+    Numbers the (day, time slot) cells of a date range.
+
+    cell = (day - date_from).days * len(slot_ids) + position of the slot,
+    with slots ordered by start time, so cells follow each other in time.
+    """
+
+    def __init__(self, date_from: date, date_to: date, slots: Sequence[TimeSlots]):
+        self.date_from = date_from
+        self.n_days = (date_to - date_from).days + 1
+        ordered = sorted(slots, key=lambda slot: slot.start_time)
+        self.slot_ids = [slot.id for slot in ordered]
+        self.slot_pos = {slot_id: pos for pos, slot_id in enumerate(self.slot_ids)}
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for offset in range(self.n_days):
+            day = date_from + timedelta(days=offset)
+            for slot in ordered:
+                self.starts.append(datetime.combine(day, slot.start_time))
+                self.ends.append(datetime.combine(day, slot.end_time))
+
+    @property
+    def size(self) -> int:
+        return len(self.starts)
+
+    def cell(self, day: date, time_slot_id: int) -> int:
+        return (day - self.date_from).days * len(self.slot_ids) + self.slot_pos[time_slot_id]
+
+    def cells_overlapping(self, start: datetime, end: datetime) -> Run:
+        """Cells whose window shares a moment with [start, end); empty when start >= end."""
+        return bisect_right(self.ends, start), bisect_left(self.starts, end)
+
+
+def sweep_merge(runs: Iterable[Run]) -> List[Run]:
+    """Merges overlapping or touching [start, end) runs with one sweep over sorted endpoints."""
+    points = []
+    for start, end in runs:
+        if start < end:
+            points.append((start, 1))
+            points.append((end, -1))
+    # Przy równych współrzędnych otwarcia przed zamknięciami: stykające się przedziały się łączą
+    points.sort(key=lambda p: (p[0], -p[1]))
+
+    merged: List[Run] = []
+    depth = 0
+    opened = 0
+    for position, delta in points:
+        if depth == 0 and delta == 1:
+            opened = position
+        depth += delta
+        if depth == 0:
+            merged.append((opened, position))
+    return merged
+
+
+def free_runs(busy: List[Run], size: int) -> List[Run]:
+    """Complement of merged busy runs, run-length encoded as (first cell, length)."""
+    free: List[Run] = []
+    cursor = 0
+    for start, end in busy:
+        if start > cursor:
+            free.append((cursor, start - cursor))
+        cursor = max(cursor, end)
+    if cursor < size:
+        free.append((cursor, size - cursor))
+    return free
+
+
+def compute_free_busy(
+    db: Session,
+    grid: CellGrid,
+    room_ids: List[int],
+    unavailability: UnavailabilityIndex,
+) -> Dict[int, List[Run]]:
+    """Free cells of every room: bookings and unavailability blocks are swept into busy runs."""
+    if not grid.size:
+        return {room_id: [] for room_id in room_ids}
+    busy: Dict[int, List[Run]] = {room_id: [] for room_id in room_ids}
+
+    date_to = grid.date_from + timedelta(days=grid.n_days - 1)
+    bookings = db.query(CourseEvent.room_id, CourseEvent.day, CourseEvent.time_slot_id).filter(
+        CourseEvent.room_id.in_(room_ids),
+        CourseEvent.day >= grid.date_from,
+        CourseEvent.day <= date_to,
+        CourseEvent.canceled == False
+    ).all()
+    for room_id, day, time_slot_id in bookings:
+        if time_slot_id in grid.slot_pos:
+            cell = grid.cell(day, time_slot_id)
+            busy[room_id].append((cell, cell + 1))
+
+    range_start, range_end = grid.starts[0], grid.ends[-1]
+    for room_id in room_ids:
+        for start, end, _ in unavailability.overlapping(room_id, range_start, range_end):
+            busy[room_id].append(grid.cells_overlapping(start, end))
+
+    return {room_id: free_runs(sweep_merge(runs), grid.size) for room_id, runs in busy.items()}
@@ -0,0 +1,33 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from config import get_settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def hashing_executor() -> ThreadPoolExecutor:
+    """
+    Bounded pool for bcrypt work, separate from the threadpool serving sync endpoints.
+
+    bcrypt releases the GIL, so the pool hashes in parallel on up to
+    PASSWORD_HASH_WORKERS cores; further logins queue here instead of taking
+    threads needed by other requests.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = get_settings().PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        return _executor
+
+
+async def run_hashing(fn: Callable[..., T], *args) -> T:
+    """Runs a password hashing call off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(hashing_executor(), fn, *args)
@@ -0,0 +1,87 @@
+from datetime import date
+
+from config import get_settings
+from model import ChangeRecomendation, ChangeRequest, ChangeRequestStatus, Job
+from services.export import encode_csv, stream_event_batches
+from services.finalization import finalize_recommendation
+from services.jobs import CYCLICAL_FINALIZE, EXPORT_EVENTS, RECOMMENDATIONS, job_handler, write_output
+from services.recommendation_engine import compute_candidates, save_recommendations
+from sqlalchemy.orm import Session
+
+
+@job_handler(RECOMMENDATIONS)
+def generate_recommendations(db: Session, job: Job) -> dict:
+    change_request_id = job.payload["change_request_id"]
+    change_request = db.query(ChangeRequest).filter(ChangeRequest.id == change_request_id).first()
+    if not change_request:
+        raise ValueError(f"Change request {change_request_id} not found")
+
+    existing = db.query(ChangeRecomendation).filter(ChangeRecomendation.change_request_id == change_request_id).count()
+    # `refill` dopełnia listę do top-K po unieważnieniu części rekomendacji
+    if existing and not job.payload.get("refill"):
+        return {"change_request_id": change_request_id, "recommendations": existing}
+    if change_request.status != ChangeRequestStatus.PENDING:
+        return {"change_request_id": change_request_id, "recommendations": existing}
+
+    top_k = max(get_settings().RECOMMENDATION_TOP_K - existing, 0)
+    candidates = compute_candidates(db, change_request, top_k=top_k)
+    saved = save_recommendations(db, change_request_id, candidates)
+    db.commit()
+    return {"change_request_id": change_request_id, "recommendations": existing + len(saved)}
+
+
+@job_handler(CYCLICAL_FINALIZE)
+def finalize_cyclical(db: Session, job: Job) -> dict:
+    """
+    Finalizes an accepted cyclical recommendation.
+
+    The change request is locked and re-read first: one rejected, cancelled or
+    already finalized after the job was enqueued makes the job a no-op.
+    """
+    recommendation_id = job.payload["recommendation_id"]
+    change_request_id = job.payload.get("change_request_id")
+    if change_request_id is None:
+        # Zadania zlecone przed dodaniem change_request_id do payloadu
+        change_request_id = db.query(ChangeRecomendation.change_request_id).filter(
+            ChangeRecomendation.id == recommendation_id
+        ).scalar()
+        if change_request_id is None:
+            raise ValueError(f"Recommendation {recommendation_id} not found")
+
+    change_request = db.query(ChangeRequest).filter(
+        ChangeRequest.id == change_request_id
+    ).with_for_update(of=ChangeRequest).first()
+    if not change_request:
+        raise ValueError(f"Change request {change_request_id} not found")
+    if change_request.status != ChangeRequestStatus.PENDING:
+        return {"change_request_id": change_request.id, "status": change_request.status.value, "skipped": True}
+
+    rec = db.query(ChangeRecomendation).filter(
+        ChangeRecomendation.id == recommendation_id,
+        ChangeRecomendation.change_request_id == change_request.id
+    ).first()
+    if not rec:
+        raise ValueError(f"Recommendation {recommendation_id} not found")
+    change_request = finalize_recommendation(rec, db)
+    return {"change_request_id": change_request.id, "status": change_request.status.value}
+
+
+@job_handler(EXPORT_EVENTS)
+def export_events(db: Session, job: Job) -> dict:
+    date_from = job.payload.get("from")
+    date_to = job.payload.get("to")
+    rows = 0
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    batches = stream_event_batches(
+        date.fromisoformat(date_from) if date_from else None,
+        date.fromisoformat(date_to) if date_to else None,
+    )
+    # Każda paczka wierszy trafia do bazy jako osobny fragment, bez składania całego pliku w pamięci
+    chunks = write_output(db, job, encode_csv(counted(batches)))
+    return {"format": "csv", "rows": rows, "chunks": chunks, "filename": f"timetable-{job.id}.csv"}
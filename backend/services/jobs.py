@@ -0,0 +1,251 @@
+import logging
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from config import get_settings
+from database import SessionLocal, engine
+from fastapi import HTTPException
+from model import Job, JobOutputChunk, JobStatus
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS = "recommendations"
+CYCLICAL_FINALIZE = "cyclical_finalize"
+EXPORT_EVENTS = "export_events"
+
+JobHandler = Callable[[Session, Job], Any]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(job_type: str) -> Callable[[JobHandler], JobHandler]:
+    def register(fn: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return register
+
+
+def enqueue(
+    db: Session, job_type: str, payload: dict, key: Optional[str] = None, created_by: Optional[int] = None
+) -> Job:
+    """
+    Adds a job to the queue in the caller's transaction (the caller commits).
+
+    Jobs sharing a `key` are deduplicated: while one is queued or running,
+    enqueueing another returns the existing job. `created_by` is the user
+    allowed to follow the job; system jobs leave it empty.
+    """
+    if key is not None:
+        existing = db.query(Job).filter(
+            Job.key == key,
+            Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+        ).first()
+        if existing:
+            return existing
+
+    job = Job(
+        type=job_type,
+        key=key,
+        payload=payload,
+        status=JobStatus.QUEUED,
+        max_attempts=get_settings().JOB_MAX_ATTEMPTS,
+        created_by_id=created_by,
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+
+def write_output(db: Session, job: Job, pieces: Iterable[str]) -> int:
+    """
+    Stores the output of `job` as one job_output_chunks row per piece, in the
+    job's transaction; only one piece is held in memory at a time. Output
+    left by an earlier attempt is replaced. Returns the number of chunks.
+    """
+    db.query(JobOutputChunk).filter(JobOutputChunk.job_id == job.id).delete(synchronize_session=False)
+    chunks = 0
+    for piece in pieces:
+        if piece:
+            db.execute(insert(JobOutputChunk), [{"job_id": job.id, "seq": chunks, "data": piece}])
+            chunks += 1
+    return chunks
+
+
+def has_output(db: Session, job_id: int) -> bool:
+    return db.query(JobOutputChunk.seq).filter(JobOutputChunk.job_id == job_id).first() is not None
+
+
+def stream_output(job_id: int, bind: Optional[Engine] = None) -> Iterator[str]:
+    """
+    Yields the stored output of a job chunk by chunk from a server-side cursor.
+
+    Runs on its own connection, like services.export.stream_event_batches, so
+    it can outlive the request-scoped session of a streaming response.
+    """
+    with (bind or engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=1).execute(
+            select(JobOutputChunk.data).where(JobOutputChunk.job_id == job_id).order_by(JobOutputChunk.seq)
+        )
+        for data, in result:
+            yield data
+
+
+def requeue_timed_out(db: Session) -> int:
+    """
+    Puts back jobs left RUNNING by a worker that died or hung mid-way.
+
+    A live run refreshes updated_at through its heartbeat, so only runs that
+    stopped beating for JOB_TIMEOUT_SECONDS are taken back. The timed-out run already used up the attempt counted by claim_next, so a
+    job that has no attempts left is failed instead of being retried forever.
+    """
+    settings = get_settings()
+    now = datetime.utcnow()
+    timed_out = db.query(Job).filter(
+        Job.status == JobStatus.RUNNING,
+        Job.updated_at < now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    )
+    failed = timed_out.filter(Job.attempts >= Job.max_attempts).update({
+        Job.status: JobStatus.FAILED,
+        Job.error: f"Timed out after {settings.JOB_TIMEOUT_SECONDS} s",
+        Job.updated_at: now,
+    }, synchronize_session=False)
+    count = timed_out.filter(Job.attempts < Job.max_attempts).update({
+        Job.status: JobStatus.QUEUED,
+        Job.run_after: now + timedelta(seconds=settings.JOB_RETRY_BASE_SECONDS),
+        Job.updated_at: now,
+    }, synchronize_session=False)
+    db.commit()
+    if failed:
+        logger.warning("%s timed-out job(s) failed after their last attempt", failed)
+    return count
+
+
+def claim_next(db: Session) -> Optional[Job]:
+    """Marks the oldest due job as RUNNING; SKIP LOCKED lets several workers poll safely."""
+    job = db.query(Job).filter(
+        Job.status == JobStatus.QUEUED,
+        Job.run_after <= datetime.utcnow()
+    ).order_by(Job.id).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.rollback()
+        return None
+    job.status = JobStatus.RUNNING
+    job.attempts += 1
+    db.commit()
+    return job
+
+
+def heartbeat(job_id: int, attempt: int, bind: Optional[Engine] = None) -> bool:
+    """
+    Refreshes updated_at of a job still held by run `attempt`, on its own
+    connection. Returns False once the claim is lost (the job was timed out
+    and requeued or failed).
+    """
+    with (bind or engine).begin() as conn:
+        result = conn.execute(update(Job).where(
+            Job.id == job_id,
+            Job.status == JobStatus.RUNNING,
+            Job.attempts == attempt
+        ).values(updated_at=datetime.utcnow()))
+        return result.rowcount == 1
+
+
+def _start_heartbeat(job_id: int, attempt: int) -> Tuple[threading.Event, threading.Thread]:
+    stop = threading.Event()
+    interval = get_settings().JOB_HEARTBEAT_SECONDS
+
+    def beat() -> None:
+        while not stop.wait(interval):
+            try:
+                if not heartbeat(job_id, attempt):
+                    return
+            except Exception:
+                logger.exception("Heartbeat of job %s failed", job_id)
+
+    thread = threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True)
+    thread.start()
+    return stop, thread
+
+
+def _still_owned(db: Session, job_id: int, attempt: int) -> bool:
+    """Locks the job row and checks that no timeout handed it to another run meanwhile."""
+    status, attempts = db.query(Job.status, Job.attempts).filter(Job.id == job_id).with_for_update().one()
+    return status == JobStatus.RUNNING and attempts == attempt
+
+
+def run_job(job_id: int) -> None:
+    """
+    Runs a claimed job and stores its result or schedules a retry.
+
+    A heartbeat keeps the claim alive while the handler runs. If the job timed
+    out anyway (e.g. the worker stalled), the run's transaction is rolled back
+    instead of overwriting the state owned by the next run.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).one()
+        attempt = job.attempts
+        stop, beating = _start_heartbeat(job_id, attempt)
+        try:
+            handler = JOB_HANDLERS.get(job.type)
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown job type: {job.type}")
+                result = handler(db, job)
+                if not _still_owned(db, job_id, attempt):
+                    db.rollback()
+                    logger.warning("Job %s lost its claim on attempt %s, result discarded", job_id, attempt)
+                    return
+                job.result = result
+                job.status = JobStatus.SUCCEEDED
+                job.error = None
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                if not _still_owned(db, job_id, attempt):
+                    db.rollback()
+                    logger.warning("Job %s lost its claim on attempt %s, failure discarded", job_id, attempt)
+                    return
+                job = db.query(Job).filter(Job.id == job_id).one()
+                # Konflikty i błędy walidacji nie znikną po ponowieniu
+                permanent = isinstance(exc, (HTTPException, ValueError))
+                job.error = str(exc.detail) if isinstance(exc, HTTPException) else traceback.format_exc(limit=5)
+                if permanent or job.attempts >= job.max_attempts:
+                    job.status = JobStatus.FAILED
+                else:
+                    job.status = JobStatus.QUEUED
+                    delay = get_settings().JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+                    job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+                db.commit()
+                logger.warning("Job %s (%s) failed on attempt %s", job.id, job.type, job.attempts)
+        finally:
+            # Heartbeat może czekać na blokadę wiersza tej sesji, więc transakcja musi się skończyć przed join()
+            stop.set()
+            db.rollback()
+            beating.join()
+    finally:
+        db.close()
+
+
+def work(poll_interval: Optional[float] = None, once: bool = False) -> None:
+    poll_interval = poll_interval if poll_interval is not None else get_settings().JOB_POLL_INTERVAL_SECONDS
+    while True:
+        db = SessionLocal()
+        try:
+            requeue_timed_out(db)
+            job = claim_next(db)
+            job_id = job.id if job else None
+        finally:
+            db.close()
+
+        if job_id is not None:
+            run_job(job_id)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,397 @@
+import threading
+import time as time_module
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from config import get_settings
+from model import Course, CourseEvent, TimeSlots
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+Booking = namedtuple("Booking", ["course_id", "room_id", "day", "time_slot_id"])
+
+ROOM, TEACHER, GROUP = "room", "teacher", "group"
+# Komórka sali zajęta przez dowolny wiersz, także odwołany: obejmuje go uq_room_day_time
+HELD = "held_room"
+KINDS = (ROOM, TEACHER, GROUP, HELD)
+
+_PENDING_KEY = "occupancy_pending"
+
+
+class _Grid:
+    """Occupancy counters for one kind of entity, shaped (entity, day, slot)."""
+
+    def __init__(self, n_days: int, n_slots: int):
+        self.rows: Dict[int, int] = {}
+        self.counts = np.zeros((8, n_days, n_slots), dtype=np.uint16)
+
+    def row(self, entity_id: int) -> int:
+        row = self.rows.get(entity_id)
+        if row is None:
+            row = len(self.rows)
+            if row >= self.counts.shape[0]:
+                grown = np.zeros((row * 2,) + self.counts.shape[1:], dtype=self.counts.dtype)
+                grown[:row] = self.counts
+                self.counts = grown
+            self.rows[entity_id] = row
+        return row
+
+    def rows_for(self, entity_ids: Sequence[int]) -> np.ndarray:
+        return np.fromiter((self.row(e) for e in entity_ids), dtype=np.int64, count=len(entity_ids))
+
+    def extend_days(self, before: int, after: int) -> None:
+        n, d, s = self.counts.shape
+        grown = np.zeros((n, d + before + after, s), dtype=self.counts.dtype)
+        grown[:, before:before + d] = self.counts
+        self.counts = grown
+
+    def copy(self) -> "_Grid":
+        clone = _Grid.__new__(_Grid)
+        clone.rows = dict(self.rows)
+        clone.counts = self.counts.copy()
+        return clone
+
+
+class OccupancyIndex:
+    """
+    In-memory occupancy of rooms, teachers and groups.
+
+    Every non-canceled CourseEvent increments one cell per entity kind, so a cell
+    is busy when its counter is non-zero. Counters (instead of plain bits) keep
+    removals exact when two events share a teacher or group slot. The HELD
+    layer counts every row with a room, cancelled ones too, because the unique
+    constraint still reserves their room cell.
+
+    A published index is never modified: writes are applied to a copy that
+    replaces it, so readers can use it without holding the lock.
+    """
+
+    def __init__(self, origin: date, n_days: int, slot_ids: Sequence[int]):
+        self.origin = origin
+        self.n_days = max(n_days, 1)
+        self.slot_pos = {slot_id: pos for pos, slot_id in enumerate(sorted(slot_ids))}
+        self.grids = {kind: _Grid(self.n_days, max(len(self.slot_pos), 1)) for kind in KINDS}
+        self.course_owners: Dict[int, Tuple[int, int]] = {}
+        self.loaded_at = time_module.monotonic()
+        self.stale = False
+
+    @classmethod
+    def build(
+        cls,
+        bookings: Sequence[Booking],
+        slot_ids: Sequence[int],
+        course_owners: Dict[int, Tuple[int, int]],
+        cancelled: Sequence[Booking] = (),
+    ) -> "OccupancyIndex":
+        days = [b.day for b in bookings] + [b.day for b in cancelled]
+        origin = min(days) if days else date.today()
+        n_days = (max(days) - origin).days + 1 if days else 1
+        index = cls(origin, n_days, slot_ids)
+        index.course_owners = dict(course_owners)
+        index._bulk_add(bookings)
+        index._bulk_add(cancelled, held_only=True)
+        return index
+
+    def copy(self) -> "OccupancyIndex":
+        clone = OccupancyIndex.__new__(OccupancyIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.grids = {kind: grid.copy() for kind, grid in self.grids.items()}
+        clone.course_owners = dict(self.course_owners)
+        return clone
+
+    def _bulk_add(self, bookings: Sequence[Booking], held_only: bool = False) -> None:
+        known = [b for b in bookings if b.time_slot_id in self.slot_pos and b.course_id in self.course_owners]
+        if len(known) != len(bookings):
+            self.stale = True
+        if not known:
+            return
+        day_idx = np.fromiter(((b.day - self.origin).days for b in known), dtype=np.int64, count=len(known))
+        slot_idx = np.fromiter((self.slot_pos[b.time_slot_id] for b in known), dtype=np.int64, count=len(known))
+
+        with_room = [i for i, b in enumerate(known) if b.room_id is not None]
+        room_ids = [known[i].room_id for i in with_room]
+        held_rows = self.grids[HELD].rows_for(room_ids)
+        np.add.at(self.grids[HELD].counts, (held_rows, day_idx[with_room], slot_idx[with_room]), 1)
+        if held_only:
+            return
+
+        room_rows = self.grids[ROOM].rows_for(room_ids)
+        np.add.at(self.grids[ROOM].counts, (room_rows, day_idx[with_room], slot_idx[with_room]), 1)
+
+        teacher_rows = self.grids[TEACHER].rows_for([self.course_owners[b.course_id][0] for b in known])
+        np.add.at(self.grids[TEACHER].counts, (teacher_rows, day_idx, slot_idx), 1)
+
+        group_rows = self.grids[GROUP].rows_for([self.course_owners[b.course_id][1] for b in known])
+        np.add.at(self.grids[GROUP].counts, (group_rows, day_idx, slot_idx), 1)
+
+    def _day_index(self, day: date, grow: bool = False) -> Optional[int]:
+        offset = (day - self.origin).days
+        if 0 <= offset < self.n_days:
+            return offset
+        if not grow:
+            return None
+        before = max(-offset, 0)
+        after = max(offset - self.n_days + 1, 0)
+        for grid in self.grids.values():
+            grid.extend_days(before, after)
+        self.origin -= timedelta(days=before)
+        self.n_days += before + after
+        return offset + before
+
+    def apply(self, booking: Booking, delta: int, held_only: bool = False) -> None:
+        """Adds `delta` to the cells of a booking; `held_only` touches only the HELD layer (cancelled rows)."""
+        owners = self.course_owners.get(booking.course_id)
+        slot = self.slot_pos.get(booking.time_slot_id)
+        if owners is None or slot is None:
+            self.stale = True
+            return
+        day = self._day_index(booking.day, grow=True)
+        cells = [] if held_only else [(TEACHER, owners[0]), (GROUP, owners[1])]
+        if booking.room_id is not None:
+            cells.append((HELD, booking.room_id))
+            if not held_only:
+                cells.append((ROOM, booking.room_id))
+        for kind, entity_id in cells:
+            grid = self.grids[kind]
+            row = grid.row(entity_id)
+            value = int(grid.counts[row, day, slot]) + delta
+            if value < 0:
+                self.stale = True
+                continue
+            grid.counts[row, day, slot] = value
+
+    def count(self, kind: str, entity_id: int, day: date, time_slot_id: int) -> int:
+        grid = self.grids[kind]
+        row = grid.rows.get(entity_id)
+        day_idx = self._day_index(day)
+        slot = self.slot_pos.get(time_slot_id)
+        if row is None or day_idx is None or slot is None:
+            return 0
+        return int(grid.counts[row, day_idx, slot])
+
+    def is_busy(self, kind: str, entity_id: int, day: date, time_slot_id: int) -> bool:
+        return self.count(kind, entity_id, day, time_slot_id) > 0
+
+    def busy_mask(self, kind: str, entity_ids: Sequence[int], day: date, time_slot_id: int) -> np.ndarray:
+        """Boolean vector telling which of `entity_ids` are busy in the given cell."""
+        mask = np.zeros(len(entity_ids), dtype=bool)
+        grid = self.grids[kind]
+        day_idx = self._day_index(day)
+        slot = self.slot_pos.get(time_slot_id)
+        if day_idx is None or slot is None:
+            return mask
+        known = np.fromiter((grid.rows.get(e, -1) for e in entity_ids), dtype=np.int64, count=len(entity_ids))
+        present = known >= 0
+        mask[present] = grid.counts[known[present], day_idx, slot] > 0
+        return mask
+
+    def busy_cells(self, kind: str, entity_id: int, cells: Sequence[Tuple[date, int]]) -> np.ndarray:
+        """Boolean vector telling which (day, time_slot_id) cells are busy for one entity."""
+        mask = np.zeros(len(cells), dtype=bool)
+        grid = self.grids[kind]
+        row = grid.rows.get(entity_id)
+        if row is None:
+            return mask
+        day_idx = np.fromiter(((d - self.origin).days for d, _ in cells), dtype=np.int64, count=len(cells))
+        slot_idx = np.fromiter((self.slot_pos.get(s, -1) for _, s in cells), dtype=np.int64, count=len(cells))
+        valid = (day_idx >= 0) & (day_idx < self.n_days) & (slot_idx >= 0)
+        mask[valid] = grid.counts[row, day_idx[valid], slot_idx[valid]] > 0
+        return mask
+
+    def free_rooms(self, room_ids: Sequence[int], day: date, time_slot_id: int) -> List[int]:
+        """Rooms whose cell no row holds, so a new event can be inserted there."""
+        busy = self.busy_mask(HELD, room_ids, day, time_slot_id)
+        return [room_id for room_id, is_busy in zip(room_ids, busy) if not is_busy]
+
+    def dense(self, kind: str, entity_ids: Sequence[int], origin: date, n_days: int, slot_ids: Sequence[int]) -> np.ndarray:
+        """Counters of `entity_ids` re-projected onto an explicit day range and slot order."""
+        out = np.zeros((len(entity_ids), n_days, len(slot_ids)), dtype=np.uint16)
+        grid = self.grids[kind]
+        shift = (self.origin - origin).days
+        lo, hi = max(shift, 0), min(shift + self.n_days, n_days)
+        if lo >= hi:
+            return out
+        for col, slot_id in enumerate(slot_ids):
+            pos = self.slot_pos.get(slot_id)
+            if pos is None:
+                continue
+            for i, entity_id in enumerate(entity_ids):
+                row = grid.rows.get(entity_id)
+                if row is not None:
+                    out[i, lo:hi, col] = grid.counts[row, lo - shift:hi - shift, pos]
+        return out
+
+    def diff(self, other: "OccupancyIndex") -> List[dict]:
+        """Cells whose counters differ between two indexes."""
+        origin = min(self.origin, other.origin)
+        end = max(self.origin + timedelta(days=self.n_days), other.origin + timedelta(days=other.n_days))
+        n_days = (end - origin).days
+        slot_ids = sorted(set(self.slot_pos) | set(other.slot_pos))
+        mismatches = []
+        for kind in KINDS:
+            entity_ids = sorted(set(self.grids[kind].rows) | set(other.grids[kind].rows))
+            mine = self.dense(kind, entity_ids, origin, n_days, slot_ids)
+            theirs = other.dense(kind, entity_ids, origin, n_days, slot_ids)
+            for i, d, s in zip(*np.nonzero(mine != theirs)):
+                mismatches.append({
+                    "kind": kind,
+                    "entity_id": entity_ids[i],
+                    "day": origin + timedelta(days=int(d)),
+                    "time_slot_id": slot_ids[s],
+                    "index": int(mine[i, d, s]),
+                    "table": int(theirs[i, d, s]),
+                })
+        return mismatches
+
+
+def load_index(db: Session) -> OccupancyIndex:
+    slot_ids = [slot_id for slot_id, in db.query(TimeSlots.id).all()]
+    course_owners = {
+        course_id: (teacher_id, group_id)
+        for course_id, teacher_id, group_id in db.query(Course.id, Course.teacher_id, Course.group_id).all()
+    }
+    active, cancelled = [], []
+    for course_id, room_id, day, time_slot_id, canceled in db.query(
+        CourseEvent.course_id, CourseEvent.room_id, CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.canceled
+    ).all():
+        (cancelled if canceled else active).append(Booking(course_id, room_id, day, time_slot_id))
+    return OccupancyIndex.build(active, slot_ids, course_owners, cancelled)
+
+
+_index: Optional[OccupancyIndex] = None
+_lock = threading.RLock()
+
+
+def get_occupancy_index(db: Session) -> OccupancyIndex:
+    """
+    Returns the process-wide occupancy index, (re)loading it when needed.
+
+    The index only sees writes made through this process, so it is also reloaded
+    every OCCUPANCY_INDEX_TTL_SECONDS to pick up changes made by other workers.
+    """
+    global _index
+    ttl = get_settings().OCCUPANCY_INDEX_TTL_SECONDS
+    with _lock:
+        if _index is None or _index.stale or time_module.monotonic() - _index.loaded_at > ttl:
+            _index = load_index(db)
+        return _index
+
+
+def invalidate_occupancy_index() -> None:
+    with _lock:
+        if _index is not None:
+            _index.stale = True
+
+
+def check_consistency(db: Session) -> List[dict]:
+    """Compares the live index with a fresh load from `course_events`."""
+    with _lock:
+        current = get_occupancy_index(db)
+        return current.diff(load_index(db))
+
+
+def record_bookings(
+    session: Session,
+    added: Iterable[Booking] = (),
+    removed: Iterable[Booking] = (),
+    cancelled: Iterable[Booking] = (),
+) -> None:
+    """
+    Registers bookings written outside of the ORM unit of work (bulk statements).
+
+    `removed` are active rows deleted or moved away; `cancelled` are active rows
+    marked canceled, which keep holding their room cell.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    pending.extend((booking, 1, False) for booking in added)
+    pending.extend((booking, -1, False) for booking in removed)
+    for booking in cancelled:
+        pending.append((booking, -1, False))
+        pending.append((booking, 1, True))
+
+
+class _UnknownHistoryError(Exception):
+    """The pre-flush value of an attribute was not loaded, so it cannot be undone."""
+
+
+def _previous(obj, key: str):
+    history = inspect(obj).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if history.added:
+        raise _UnknownHistoryError(key)
+    return None
+
+
+def _booking(obj, previous: bool = False) -> Tuple[Booking, bool]:
+    """The row's cells and whether it only holds its room (cancelled)."""
+    value = (lambda key: _previous(obj, key)) if previous else (lambda key: getattr(obj, key))
+    booking = Booking(value("course_id"), value("room_id"), value("day"), value("time_slot_id"))
+    return booking, bool(value("canceled"))
+
+
+def _is_course_owner_change(obj) -> bool:
+    state = inspect(obj)
+    return state.attrs.teacher_id.history.has_changes() or state.attrs.group_id.history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    added, removed = [], []
+    for obj in session.new:
+        if isinstance(obj, CourseEvent):
+            added.append(_booking(obj))
+        elif isinstance(obj, Course):
+            session.info.setdefault("occupancy_courses", {})[obj.id] = (obj.teacher_id, obj.group_id)
+        elif isinstance(obj, TimeSlots):
+            session.info["occupancy_stale"] = True
+    try:
+        for obj in session.dirty:
+            if isinstance(obj, CourseEvent) and session.is_modified(obj, include_collections=False):
+                removed.append(_booking(obj, previous=True))
+                added.append(_booking(obj))
+            elif isinstance(obj, Course) and _is_course_owner_change(obj):
+                session.info["occupancy_stale"] = True
+        for obj in session.deleted:
+            if isinstance(obj, CourseEvent):
+                removed.append(_booking(obj, previous=True))
+            elif isinstance(obj, (Course, TimeSlots)):
+                session.info["occupancy_stale"] = True
+    except _UnknownHistoryError:
+        session.info["occupancy_stale"] = True
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    pending.extend((booking, 1, held_only) for booking, held_only in added)
+    pending.extend((booking, -1, held_only) for booking, held_only in removed)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, [])
+    courses = session.info.pop("occupancy_courses", {})
+    stale = session.info.pop("occupancy_stale", False)
+    global _index
+    with _lock:
+        if _index is None:
+            return
+        if stale:
+            _index.stale = True
+            return
+        if not pending and not courses:
+            return
+        # Kopia przy zapisie: czytelnicy bez blokady widzą stary albo nowy indeks, nigdy w połowie zmiany
+        updated = _index.copy()
+        updated.course_owners.update(courses)
+        for booking, delta, held_only in pending:
+            updated.apply(booking, delta, held_only)
+        _index = updated
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop("occupancy_courses", None)
+    session.info.pop("occupancy_stale", None)
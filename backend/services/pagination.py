@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import date
+from typing import Tuple
+
+from fastapi import HTTPException
+from starlette.status import HTTP_400_BAD_REQUEST
+
+EventKey = Tuple[date, int, int]
+
+
+def encode_cursor(day: date, time_slot_id: int, event_id: int) -> str:
+    """Opaque keyset cursor pointing at the last (day, time_slot_id, id) of a page."""
+    raw = json.dumps([day.isoformat(), time_slot_id, event_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> EventKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, time_slot_id, event_id = json.loads(raw)
+        return date.fromisoformat(day), int(time_slot_id), int(event_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Invalid cursor")
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from config import get_settings
+from model import User
+from services.cache_versions import PRINCIPALS, bump_cache_version, cache_version, cache_version_async
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+class PrincipalCache:
+    """
+    Column values of authenticated users by token subject (e-mail), LRU with a TTL.
+
+    Only plain values are kept, never ORM instances, so entries can be shared
+    between requests and threads. Entries are tagged with the `principals`
+    cache version, which every User update or delete bumps, so a user
+    deactivated or demoted by another process stops being served once this
+    process re-reads the version.
+    """
+
+    def __init__(self):
+        self._items: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, subject: str, version: int) -> Optional[Dict]:
+        ttl = get_settings().AUTH_CACHE_TTL_SECONDS
+        with self._lock:
+            cached = self._items.get(subject)
+            if cached is None or cached[1] != version or time.monotonic() - cached[0] > ttl:
+                if cached is not None:
+                    del self._items[subject]
+                self.misses += 1
+                return None
+            self._items.move_to_end(subject)
+            self.hits += 1
+            return cached[2]
+
+    def put(self, subject: str, values: Dict, version: int) -> None:
+        with self._lock:
+            self._items[subject] = (time.monotonic(), version, values)
+            self._items.move_to_end(subject)
+            while len(self._items) > get_settings().AUTH_CACHE_SIZE:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        with self._lock:
+            stale = [subject for subject, (_, _, values) in self._items.items() if values["id"] in user_ids]
+            for subject in stale:
+                del self._items[subject]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": get_settings().AUTH_CACHE_SIZE,
+                "ttl_seconds": get_settings().AUTH_CACHE_TTL_SECONDS,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def _cached_instance(values: Dict) -> User:
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def load_principal(db: Session, subject: str) -> Optional[User]:
+    """
+    The user of a token subject, attached to `db`.
+
+    On a cache hit the instance is rebuilt from the cached values and merged
+    with load=False, which puts it in the session without a SELECT.
+    """
+    version = cache_version(db, PRINCIPALS)
+    values = principal_cache.get(subject, version)
+    if values is None:
+        user = db.query(User).filter(User.email == subject).first()
+        if user is not None:
+            principal_cache.put(subject, {key: getattr(user, key) for key in _COLUMNS}, version)
+        return user
+    return db.merge(_cached_instance(values), load=False)
+
+
+async def load_principal_async(db: AsyncSession, subject: str) -> Optional[User]:
+    """`load_principal` for an AsyncSession."""
+    version = await cache_version_async(db, PRINCIPALS)
+    values = principal_cache.get(subject, version)
+    if values is None:
+        user = (await db.execute(select(User).where(User.email == subject))).scalars().first()
+        if user is not None:
+            principal_cache.put(subject, {key: getattr(user, key) for key in _COLUMNS}, version)
+        return user
+    return await db.merge(_cached_instance(values), load=False)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    changed: Set[int] = {
+        inspect(obj).identity[0]
+        for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and inspect(obj).identity is not None
+    }
+    if changed:
+        if "principal_cache_stale" not in session.info:
+            bump_cache_version(session, PRINCIPALS)
+        session.info.setdefault("principal_cache_stale", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    changed = session.info.pop("principal_cache_stale", None)
+    if changed:
+        principal_cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("principal_cache_stale", None)
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from database import SessionLocal
+from model import ChangeRecomendation, ChangeRequest, ChangeRequestStatus
+from services.recommendation_engine import (
+    ReferenceData, compute_candidates, load_reference_data, save_recommendations
+)
+from sqlalchemy.orm import Session
+
+
+def pending_change_request_ids(db: Session) -> List[int]:
+    rows = db.query(ChangeRequest.id).filter(
+        ChangeRequest.status == ChangeRequestStatus.PENDING
+    ).order_by(ChangeRequest.created_at).all()
+    return [request_id for request_id, in rows]
+
+
+def _process_one(change_request_id: int, reference: ReferenceData) -> dict:
+    started = time.perf_counter()
+    result = {"change_request_id": change_request_id, "status": "ok", "recommendations": 0, "detail": None}
+    db = SessionLocal()
+    try:
+        change_request = db.query(ChangeRequest).filter(ChangeRequest.id == change_request_id).first()
+        if not change_request:
+            result.update(status="not_found", detail="Change request not found")
+        elif db.query(ChangeRecomendation.id).filter(ChangeRecomendation.change_request_id == change_request_id).first():
+            result["status"] = "existing"
+            result["recommendations"] = db.query(ChangeRecomendation).filter(
+                ChangeRecomendation.change_request_id == change_request_id
+            ).count()
+        else:
+            candidates = compute_candidates(db, change_request, reference=reference)
+            result["recommendations"] = len(save_recommendations(db, change_request_id, candidates))
+            db.commit()
+    except Exception as exc:
+        db.rollback()
+        result.update(status="error", detail=str(exc))
+    finally:
+        db.close()
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def run_batch(change_request_ids: List[int], max_workers: int) -> List[dict]:
+    """
+    Generates recommendations for many change requests concurrently.
+
+    Rooms, equipment masks and the occupancy index are loaded once and shared
+    read-only; every worker runs its request on its own session.
+    """
+    # Sesja jest zamykana od razu, więc sale trafiają do wątków jako obiekty odłączone
+    with SessionLocal() as db:
+        reference = load_reference_data(db)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(lambda request_id: _process_one(request_id, reference), change_request_ids))
@@ -0,0 +1,288 @@
+import heapq
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator, List, Optional, Set, Tuple
+
+from config import get_settings
+from model import AvailabilityProposal, ChangeRecomendation, ChangeRequest, Room
+from services.equipment_masks import EquipmentMasks, get_equipment_masks
+from services.occupancy import GROUP, HELD, TEACHER, OccupancyIndex, get_occupancy_index
+from services.unavailability_index import UnavailabilityIndex, get_unavailability_index
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, selectinload
+
+Slot = Tuple[date, int]
+
+_UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+_INSERT_CHUNK_ROWS = 1000
+# Kolumny uq_unique_recommendation
+_RECOMMENDATION_KEY = ["change_request_id", "recommended_day", "recommended_slot_id", "recommended_room_id"]
+
+
+@dataclass(frozen=True)
+class Candidate:
+    day: date
+    time_slot_id: int
+    room: Room
+    score: float = 0.0
+
+
+@dataclass(frozen=True)
+class ScoringWeights:
+    capacity: float
+    day: float
+    room_type: float
+
+    @classmethod
+    def from_settings(cls) -> "ScoringWeights":
+        settings = get_settings()
+        return cls(
+            capacity=settings.RECOMMENDATION_WEIGHT_CAPACITY,
+            day=settings.RECOMMENDATION_WEIGHT_DAY,
+            room_type=settings.RECOMMENDATION_WEIGHT_ROOM_TYPE,
+        )
+
+
+def score_candidate(
+    room: Room,
+    day: date,
+    change_request: ChangeRequest,
+    original_room: Optional[Room],
+    weights: ScoringWeights,
+) -> float:
+    """
+    Weighted sum of three components, each in [0, 1]:
+    capacity fit (needed seats vs room capacity), closeness to the original
+    event day (one week away scores 0.5) and matching the original room type.
+    """
+    needed = change_request.minimum_capacity or (original_room.capacity if original_room else 0)
+    capacity_fit = min(needed, room.capacity) / max(needed, room.capacity) if needed else 1.0
+
+    distance = abs((day - change_request.course_event.day).days)
+    day_closeness = 1.0 / (1.0 + distance / 7.0)
+
+    type_match = 1.0 if original_room is not None and room.type == original_room.type else 0.0
+
+    return weights.capacity * capacity_fit + weights.day * day_closeness + weights.room_type * type_match
+
+
+def find_common_slots(db: Session, change_request_id: int, teacher_id: int, leader_id: int) -> List[Slot]:
+    """(day, time_slot_id) pairs proposed by both the teacher and the group leader."""
+    teacher_proposal = aliased(AvailabilityProposal)
+    rows = db.query(
+        AvailabilityProposal.day,
+        AvailabilityProposal.time_slot_id
+    ).join(
+        teacher_proposal,
+        (teacher_proposal.change_request_id == AvailabilityProposal.change_request_id) &
+        (teacher_proposal.day == AvailabilityProposal.day) &
+        (teacher_proposal.time_slot_id == AvailabilityProposal.time_slot_id)
+    ).filter(
+        AvailabilityProposal.change_request_id == change_request_id,
+        AvailabilityProposal.user_id == leader_id,
+        teacher_proposal.user_id == teacher_id,
+    ).distinct().order_by(AvailabilityProposal.day, AvailabilityProposal.time_slot_id).all()
+    return [(day, slot_id) for day, slot_id in rows]
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Timetable-wide data shared by every change request (rooms, equipment, occupancy, room blocks)."""
+    rooms: List[Room]
+    masks: EquipmentMasks
+    index: OccupancyIndex
+    unavailability: UnavailabilityIndex
+
+
+def load_reference_data(db: Session) -> ReferenceData:
+    rooms = db.query(Room).options(selectinload(Room.equipment)).order_by(Room.capacity, Room.id).all()
+    return ReferenceData(
+        rooms=rooms,
+        masks=get_equipment_masks(db),
+        index=get_occupancy_index(db),
+        unavailability=get_unavailability_index(db),
+    )
+
+
+def select_candidate_rooms(reference: ReferenceData, change_request: ChangeRequest) -> List[Room]:
+    """Rooms satisfying the static requirements of the request, smallest first."""
+    minimum_capacity = change_request.minimum_capacity or 0
+    required = reference.masks.requirement_mask(change_request.room_requirements)
+    return [
+        room for room in reference.rooms
+        if room.capacity >= minimum_capacity and reference.masks.matches(room.id, required)
+    ]
+
+
+def load_existing_keys(db: Session, change_request_id: int) -> Set[Tuple[date, int, int]]:
+    rows = db.query(
+        ChangeRecomendation.recommended_day,
+        ChangeRecomendation.recommended_slot_id,
+        ChangeRecomendation.recommended_room_id
+    ).filter(ChangeRecomendation.change_request_id == change_request_id).all()
+    return {tuple(row) for row in rows}
+
+
+class TopK:
+    """Keeps the `k` best candidates seen so far; on equal scores the earlier one wins."""
+
+    def __init__(self, k: int):
+        self.k = k
+        # Kopiec minimalny: na szczycie najgorszy z zachowanych kandydatów.
+        # Przy równym wyniku wygrywa kandydat znaleziony wcześniej (niższy `seq`).
+        self._heap: List[Tuple[float, int, Candidate]] = []
+        self._seq = 0
+
+    def push(self, candidate: Candidate) -> None:
+        entry = (candidate.score, -self._seq, candidate)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def best(self) -> List[Candidate]:
+        return [candidate for _, _, candidate in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+def iter_candidates(
+    db: Session,
+    change_request: ChangeRequest,
+    weights: Optional[ScoringWeights] = None,
+    reference: Optional[ReferenceData] = None,
+) -> Iterator[Candidate]:
+    """
+    Yields every feasible (day, slot, room) for a change request in scan order
+    (day, slot, then smallest room first), each one as soon as it is validated.
+
+    Common slots, rooms and already stored recommendations are each fetched once;
+    room, teacher and group conflicts are answered by the in-memory occupancy
+    index and room blocks by the unavailability interval index, so the cost no
+    longer grows with rooms times slots.
+    """
+    weights = weights or ScoringWeights.from_settings()
+
+    course_event = change_request.course_event
+    course = course_event.course
+    teacher_id = course.teacher_id
+    group_id = course.group_id
+    leader_id = course.group.leader_id
+
+    common_slots = find_common_slots(db, change_request.id, teacher_id, leader_id)
+    if not common_slots:
+        return
+
+    reference = reference or load_reference_data(db)
+    rooms = select_candidate_rooms(reference, change_request)
+    if not rooms:
+        return
+
+    index = reference.index
+    existing = load_existing_keys(db, change_request.id)
+    room_ids = [room.id for room in rooms]
+    original_room = course_event.room
+
+    for day, slot_id in common_slots:
+        if index.is_busy(TEACHER, teacher_id, day, slot_id) or index.is_busy(GROUP, group_id, day, slot_id):
+            continue
+        # Odwołane wiersze nadal trzymają komórkę sali (uq_room_day_time)
+        booked = index.busy_mask(HELD, room_ids, day, slot_id)
+        blocked = reference.unavailability.blocked_rooms(room_ids, day, slot_id)
+        for room, is_booked in zip(rooms, booked):
+            if is_booked or room.id in blocked or (day, slot_id, room.id) in existing:
+                continue
+            score = score_candidate(room, day, change_request, original_room, weights)
+            yield Candidate(day=day, time_slot_id=slot_id, room=room, score=score)
+
+
+def compute_candidates(
+    db: Session,
+    change_request: ChangeRequest,
+    top_k: Optional[int] = None,
+    weights: Optional[ScoringWeights] = None,
+    reference: Optional[ReferenceData] = None,
+) -> List[Candidate]:
+    """
+    Computes the best `top_k` feasible (day, slot, room) for a change request, best first.
+
+    Only a bounded heap of the best candidates is kept while scanning. Pass
+    `reference` to reuse rooms, equipment masks and occupancy across requests.
+    """
+    top_k = top_k if top_k is not None else get_settings().RECOMMENDATION_TOP_K
+    if top_k <= 0:
+        return []
+    best = TopK(top_k)
+    for candidate in iter_candidates(db, change_request, weights, reference):
+        best.push(candidate)
+    return best.best()
+
+
+def _recommendation_rows(change_request_id: int, candidates: List[Candidate]) -> List[dict]:
+    return [
+        {
+            "change_request_id": change_request_id,
+            "recommended_day": candidate.day,
+            "recommended_slot_id": candidate.time_slot_id,
+            "recommended_room_id": candidate.room.id,
+            "source_proposal_id": None,
+            "score": candidate.score,
+            "accepted_by_teacher": False,
+            "accepted_by_leader": False,
+            "rejected_by_teacher": False,
+            "rejected_by_leader": False,
+        }
+        for candidate in candidates
+    ]
+
+
+def save_recommendations(db: Session, change_request_id: int, candidates: List[Candidate]) -> List[ChangeRecomendation]:
+    """
+    Writes recommendations in one multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+    Rows clashing with uq_unique_recommendation are skipped without aborting the
+    transaction. Dialects without INSERT ... RETURNING fall back to one savepoint
+    per row, which still keeps the rows written before a conflict.
+    """
+    if not candidates:
+        return []
+    rows = _recommendation_rows(change_request_id, candidates)
+    dialect = db.get_bind().dialect
+
+    if dialect.name in _UPSERT_INSERTS and dialect.insert_returning:
+        saved = []
+        # Limit parametrów w jednym zapytaniu (Postgres: 65535)
+        for start in range(0, len(rows), _INSERT_CHUNK_ROWS):
+            stmt = _UPSERT_INSERTS[dialect.name](ChangeRecomendation).values(
+                rows[start:start + _INSERT_CHUNK_ROWS]
+            ).on_conflict_do_nothing(index_elements=_RECOMMENDATION_KEY).returning(ChangeRecomendation)
+            saved.extend(db.scalars(stmt))
+    else:
+        saved = []
+        for row in rows:
+            recommendation = ChangeRecomendation(**row)
+            try:
+                with db.begin_nested():
+                    db.add(recommendation)
+            except IntegrityError:
+                continue
+            saved.append(recommendation)
+
+    saved.sort(key=lambda r: r.score or 0.0, reverse=True)
+    return saved
+
+
+def save_recommendations_one_by_one(db: Session, change_request_id: int, candidates: List[Candidate]) -> List[ChangeRecomendation]:
+    """The previous write path (one flush per row); kept for benchmark.py comparisons."""
+    saved = []
+    for row in _recommendation_rows(change_request_id, candidates):
+        recommendation = ChangeRecomendation(**row)
+        try:
+            db.add(recommendation)
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            continue
+        saved.append(recommendation)
+    return saved
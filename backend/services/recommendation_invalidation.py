@@ -0,0 +1,172 @@
+from datetime import datetime
+from typing import Iterable, List, Set, Tuple
+
+from database import SessionLocal
+from model import (
+    ChangeRecomendation, ChangeRequest, ChangeRequestStatus, Course, CourseEvent, RoomUnavailability, TimeSlots
+)
+from services.jobs import RECOMMENDATIONS, enqueue
+from services.occupancy import Booking
+from sqlalchemy import and_, delete, event, inspect, or_, select
+from sqlalchemy.orm import Session
+
+_INVALIDATED_KEY = "invalidated_change_requests"
+_CHUNK = 500
+
+Block = Tuple[int, datetime, datetime]
+
+
+def _changed(obj, *keys: str) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[key].history.has_changes() for key in keys)
+
+
+def _chunks(items: List, size: int = _CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _recommendation_dependencies():
+    """Each recommendation with the cells it relies on: its room and its course's teacher and group."""
+    return select(
+        ChangeRecomendation.id,
+        ChangeRecomendation.change_request_id,
+        ChangeRecomendation.recommended_day,
+        ChangeRecomendation.recommended_slot_id,
+        ChangeRecomendation.recommended_room_id,
+        Course.teacher_id,
+        Course.group_id,
+    ).join(
+        ChangeRequest, ChangeRecomendation.change_request_id == ChangeRequest.id
+    ).join(
+        CourseEvent, ChangeRequest.course_event_id == CourseEvent.id
+    ).join(
+        Course, CourseEvent.course_id == Course.id
+    )
+
+
+def _stale_by_bookings(conn, bookings: List[Booking]) -> Set[Tuple[int, int]]:
+    course_ids = list({b.course_id for b in bookings})
+    owners = {}
+    for chunk in _chunks(course_ids):
+        for course_id, teacher_id, group_id in conn.execute(
+            select(Course.id, Course.teacher_id, Course.group_id).where(Course.id.in_(chunk))
+        ):
+            owners[course_id] = (teacher_id, group_id)
+
+    rooms, teachers, groups = set(), set(), set()
+    for b in bookings:
+        teacher_id, group_id = owners.get(b.course_id, (None, None))
+        if b.room_id is not None:
+            rooms.add((b.day, b.time_slot_id, b.room_id))
+        teachers.add((b.day, b.time_slot_id, teacher_id))
+        groups.add((b.day, b.time_slot_id, group_id))
+
+    stale = set()
+    days = list({b.day for b in bookings})
+    slot_ids = list({b.time_slot_id for b in bookings})
+    for chunk in _chunks(days):
+        rows = conn.execute(_recommendation_dependencies().where(
+            ChangeRecomendation.recommended_day.in_(chunk),
+            ChangeRecomendation.recommended_slot_id.in_(slot_ids),
+        ))
+        for rec_id, request_id, day, slot_id, room_id, teacher_id, group_id in rows:
+            if ((day, slot_id, room_id) in rooms or (day, slot_id, teacher_id) in teachers
+                    or (day, slot_id, group_id) in groups):
+                stale.add((rec_id, request_id))
+    return stale
+
+
+def _stale_by_blocks(conn, blocks: List[Block]) -> Set[Tuple[int, int]]:
+    """Recommendations whose slot window [start, end) overlaps a new block of their room."""
+    stale = set()
+    for chunk in _chunks(blocks):
+        rows = conn.execute(select(
+            ChangeRecomendation.id,
+            ChangeRecomendation.change_request_id,
+            ChangeRecomendation.recommended_day,
+            ChangeRecomendation.recommended_room_id,
+            TimeSlots.start_time,
+            TimeSlots.end_time,
+        ).join(
+            TimeSlots, ChangeRecomendation.recommended_slot_id == TimeSlots.id
+        ).where(or_(*[
+            and_(
+                ChangeRecomendation.recommended_room_id == room_id,
+                ChangeRecomendation.recommended_day >= start.date(),
+                ChangeRecomendation.recommended_day <= end.date(),
+            )
+            for room_id, start, end in chunk
+        ])))
+        for rec_id, request_id, day, room_id, slot_start, slot_end in rows:
+            window_start, window_end = datetime.combine(day, slot_start), datetime.combine(day, slot_end)
+            if any(r == room_id and start < window_end and end > window_start for r, start, end in chunk):
+                stale.add((rec_id, request_id))
+    return stale
+
+
+def invalidate_recommendations(
+    session: Session,
+    bookings: Iterable[Booking] = (),
+    blocks: Iterable[Block] = (),
+) -> int:
+    """
+    Deletes recommendations whose (room, day, slot), teacher or group cell was just taken.
+
+    Runs in the caller's transaction. Bulk write paths that bypass the ORM call
+    this directly; ORM writes are picked up by the after_flush hook below.
+    """
+    bookings, blocks = list(bookings), list(blocks)
+    if not bookings and not blocks:
+        return 0
+    conn = session.connection()
+    stale = set()
+    if bookings:
+        stale |= _stale_by_bookings(conn, bookings)
+    if blocks:
+        stale |= _stale_by_blocks(conn, blocks)
+    if not stale:
+        return 0
+
+    rec_ids = [rec_id for rec_id, _ in stale]
+    for chunk in _chunks(rec_ids):
+        conn.execute(delete(ChangeRecomendation.__table__).where(ChangeRecomendation.__table__.c.id.in_(chunk)))
+    session.info.setdefault(_INVALIDATED_KEY, set()).update(request_id for _, request_id in stale)
+    return len(rec_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session: Session, flush_context) -> None:
+    bookings, blocks = [], []
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, CourseEvent):
+            is_new = obj in session.new
+            if obj.canceled or not (is_new or _changed(obj, "day", "time_slot_id", "room_id", "canceled", "course_id")):
+                continue
+            bookings.append(Booking(obj.course_id, obj.room_id, obj.day, obj.time_slot_id))
+        elif isinstance(obj, RoomUnavailability):
+            if obj in session.new or _changed(obj, "room_id", "start_datetime", "end_datetime"):
+                blocks.append((obj.room_id, obj.start_datetime, obj.end_datetime))
+    invalidate_recommendations(session, bookings, blocks)
+
+
+@event.listens_for(Session, "after_commit")
+def _refill_after_commit(session: Session) -> None:
+    """Tops up the recommendation list of every still pending request that lost entries."""
+    request_ids = session.info.pop(_INVALIDATED_KEY, None)
+    if not request_ids:
+        return
+    with SessionLocal() as db:
+        pending = db.query(ChangeRequest.id).filter(
+            ChangeRequest.id.in_(request_ids),
+            ChangeRequest.status == ChangeRequestStatus.PENDING
+        ).all()
+        for request_id, in pending:
+            enqueue(db, RECOMMENDATIONS, {"change_request_id": request_id, "refill": True},
+                    key=f"recommendations-refill:{request_id}")
+        db.commit()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_INVALIDATED_KEY, None)
@@ -0,0 +1,78 @@
+import json
+import time
+from typing import Iterator
+
+from config import get_settings
+from database import SessionLocal
+from model import ChangeRecomendation, ChangeRequest
+from routers.schemas import ChangeRecomendationResponse
+from services.recommendation_engine import Candidate, TopK, iter_candidates, save_recommendations
+
+NDJSON = "ndjson"
+SSE = "sse"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", SSE: "text/event-stream"}
+
+
+def encode(record: dict, fmt: str) -> str:
+    data = json.dumps(record, default=str)
+    if fmt == SSE:
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def _candidate_record(candidate: Candidate) -> dict:
+    room = candidate.room
+    return {
+        "type": "candidate",
+        "recommended_day": candidate.day.isoformat(),
+        "recommended_slot_id": candidate.time_slot_id,
+        "recommended_room_id": room.id,
+        "recommended_room": {"id": room.id, "name": room.name, "capacity": room.capacity, "type": room.type.value},
+        "score": candidate.score,
+    }
+
+
+def stream_recommendations(change_request_id: int, fmt: str = NDJSON) -> Iterator[str]:
+    """
+    Streams recommendations for a change request as NDJSON lines or SSE events.
+
+    Every feasible candidate is emitted as soon as it passes the conflict checks,
+    so the first result does not wait for the whole search. The best
+    RECOMMENDATION_TOP_K candidates are stored once the scan ends and the stream
+    closes with a `summary` record listing them. When recommendations already
+    exist they are streamed as `recommendation` records instead.
+
+    Runs on its own session: the request-scoped one is closed before the body is sent.
+    """
+    started = time.perf_counter()
+    summary = {"type": "summary", "change_request_id": change_request_id, "existing": False, "candidates": 0}
+    db = SessionLocal()
+    try:
+        existing = db.query(ChangeRecomendation).filter(
+            ChangeRecomendation.change_request_id == change_request_id
+        ).order_by(ChangeRecomendation.score.desc().nullslast(), ChangeRecomendation.id).all()
+        if existing:
+            for recommendation in existing:
+                record = ChangeRecomendationResponse.model_validate(recommendation).model_dump(mode="json")
+                yield encode({"type": "recommendation", **record}, fmt)
+            summary.update(existing=True, saved=[r.id for r in existing])
+        else:
+            change_request = db.query(ChangeRequest).filter(ChangeRequest.id == change_request_id).one()
+            best = TopK(get_settings().RECOMMENDATION_TOP_K)
+            for candidate in iter_candidates(db, change_request):
+                if not summary["candidates"]:
+                    summary["first_result_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                summary["candidates"] += 1
+                best.push(candidate)
+                yield encode(_candidate_record(candidate), fmt)
+            saved = save_recommendations(db, change_request_id, best.best())
+            db.commit()
+            summary["saved"] = [recommendation.id for recommendation in saved]
+    except Exception as exc:
+        db.rollback()
+        yield encode({"type": "error", "change_request_id": change_request_id, "detail": str(exc)}, fmt)
+        return
+    finally:
+        db.close()
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    yield encode(summary, fmt)
@@ -0,0 +1,277 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from model import Course, CourseEvent, Group, Room
+from services.calendar_feeds import touch_feeds
+from services.equipment_masks import EquipmentMasks, get_equipment_masks
+from services.occupancy import Booking, record_bookings
+from services.recommendation_invalidation import invalidate_recommendations
+from services.unavailability_index import get_unavailability_index
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+NO_SUITABLE_ROOM = "no_suitable_room"
+NO_FREE_ROOM = "no_free_room"
+
+# Poniżej tej liczby par (wydarzenie, sala) start procesów kosztuje więcej niż samo liczenie
+_PARALLEL_MIN_PAIRS = 50_000
+
+# (id wydarzenia, potrzebne miejsca, maska wyposażenia)
+EventNeed = Tuple[int, int, int]
+# (id sali, pojemność, maska wyposażenia)
+RoomOffer = Tuple[int, int, int]
+
+
+@dataclass
+class Cell:
+    """Unassigned events of one (day, time slot) and the rooms still free in it."""
+    day: date
+    time_slot_id: int
+    events: List[EventNeed]
+    rooms: List[RoomOffer]
+
+    @property
+    def pairs(self) -> int:
+        return len(self.events) * len(self.rooms)
+
+
+@dataclass
+class CellSolution:
+    day: date
+    time_slot_id: int
+    # (id wydarzenia, id sali, niewykorzystane miejsca)
+    assigned: List[Tuple[int, int, int]]
+    unassigned: List[int]
+
+
+@dataclass
+class AssignmentResult:
+    assigned: Dict[int, int] = field(default_factory=dict)
+    # id wydarzenia -> (dzień, slot, powód)
+    unassigned: Dict[int, Tuple[date, int, str]] = field(default_factory=dict)
+    wasted_seats: int = 0
+    cells: int = 0
+    shards: int = 0
+    load_ms: float = 0.0
+    solve_ms: float = 0.0
+
+
+def fits(need: int, event_mask: int, capacity: int, room_mask: int) -> bool:
+    return capacity >= need and room_mask & event_mask == event_mask
+
+
+def min_cost_assignment(cost: Sequence[Sequence[int]]) -> List[int]:
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials), O(n^2 * m).
+
+    Takes an n x m matrix with n <= m and returns, for every row, the column
+    it is matched to so that the summed cost is minimal.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float("inf")
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    match = [0] * (m + 1)  # match[j] = wiersz przypisany do kolumny j (numeracja od 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            u_i0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row[j - 1] - u_i0 - v[j]
+                    if reduced < minv[j]:
+                        minv[j] = reduced
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            assignment[match[j] - 1] = j - 1
+    return assignment
+
+
+def solve_cell(cell: Cell) -> CellSolution:
+    """
+    Assigns rooms to the events of one cell: as many events as possible, then least wasted seats.
+
+    An unsuitable pair costs more than the waste of any complete matching, so
+    the minimum-cost assignment never trades a placed event for fewer empty seats.
+    """
+    events = [e for e in cell.events if any(fits(e[1], e[2], r[1], r[2]) for r in cell.rooms)]
+    unassigned = [e[0] for e in cell.events if e not in events]
+    rooms = [r for r in cell.rooms if any(fits(e[1], e[2], r[1], r[2]) for e in events)]
+    if not events:
+        return CellSolution(cell.day, cell.time_slot_id, [], unassigned)
+
+    infeasible = (max(r[1] for r in rooms) + 1) * (len(events) + 1)
+    # Brakujące kolumny (więcej wydarzeń niż sal) to "brak sali"
+    padding = [infeasible] * max(0, len(events) - len(rooms))
+    cost = [
+        [room[1] - need if fits(need, mask, room[1], room[2]) else infeasible for room in rooms] + padding
+        for _, need, mask in events
+    ]
+
+    assigned = []
+    for row, column in enumerate(min_cost_assignment(cost)):
+        event_id = events[row][0]
+        if cost[row][column] < infeasible:
+            assigned.append((event_id, rooms[column][0], cost[row][column]))
+        else:
+            unassigned.append(event_id)
+    return CellSolution(cell.day, cell.time_slot_id, assigned, unassigned)
+
+
+def solve_shard(cells: List[Cell]) -> List[CellSolution]:
+    return [solve_cell(cell) for cell in cells]
+
+
+def split_shards(cells: List[Cell], n_shards: int) -> List[List[Cell]]:
+    """Greedy balancing: the largest cells first, each to the currently lightest shard."""
+    shards: List[List[Cell]] = [[] for _ in range(max(1, min(n_shards, len(cells))))]
+    loads = [0] * len(shards)
+    for cell in sorted(cells, key=lambda c: c.pairs * len(c.events), reverse=True):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(cell)
+        loads[lightest] += cell.pairs * len(cell.events)
+    return [shard for shard in shards if shard]
+
+
+def build_cells(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    masks: Optional[EquipmentMasks] = None,
+) -> Tuple[List[Cell], Dict[int, int], Dict[int, Tuple[date, int, str]]]:
+    """
+    Unassigned events of the range grouped by cell, each with the rooms still free in it.
+
+    A room is taken in a cell when any event (also a cancelled one, because
+    uq_room_day_time covers it) uses it or a RoomUnavailability block overlaps
+    the slot. Also returns the course of every event and, separately, the
+    events no room could ever host.
+    """
+    masks = masks or get_equipment_masks(db)
+    unavailability = get_unavailability_index(db)
+    rooms = db.execute(select(Room.id, Room.capacity).order_by(Room.capacity, Room.id)).all()
+    offers = [(room_id, capacity, masks.room_masks.get(room_id, 0)) for room_id, capacity in rooms]
+
+    events = db.execute(select(
+        CourseEvent.id, CourseEvent.course_id, CourseEvent.day, CourseEvent.time_slot_id,
+        Group.size, Course.room_requirements
+    ).join(Course, CourseEvent.course_id == Course.id).join(Group, Course.group_id == Group.id).where(
+        CourseEvent.room_id.is_(None),
+        CourseEvent.canceled == False,
+        CourseEvent.day >= date_from,
+        CourseEvent.day <= date_to,
+    ).order_by(CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.id)).all()
+
+    taken: Dict[Tuple[date, int], Set[int]] = {}
+    for day, slot_id, room_id in db.execute(select(CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.room_id).where(
+        CourseEvent.room_id.is_not(None), CourseEvent.day >= date_from, CourseEvent.day <= date_to
+    )):
+        taken.setdefault((day, slot_id), set()).add(room_id)
+
+    cells: Dict[Tuple[date, int], Cell] = {}
+    courses: Dict[int, int] = {}
+    hopeless: Dict[int, Tuple[date, int, str]] = {}
+    for event_id, course_id, day, slot_id, size, requirements in events:
+        courses[event_id] = course_id
+        need, mask = size or 0, masks.requirement_mask(requirements)
+        if not any(fits(need, mask, capacity, room_mask) for _, capacity, room_mask in offers):
+            hopeless[event_id] = (day, slot_id, NO_SUITABLE_ROOM)
+            continue
+        cell = cells.get((day, slot_id))
+        if cell is None:
+            busy = taken.get((day, slot_id), set()) | unavailability.blocked_rooms([offer[0] for offer in offers], day, slot_id)
+            cell = cells[(day, slot_id)] = Cell(day, slot_id, [], [o for o in offers if o[0] not in busy])
+        cell.events.append((event_id, need, mask))
+    return list(cells.values()), courses, hopeless
+
+
+def solve_cells(cells: List[Cell], workers: int) -> Tuple[List[CellSolution], int]:
+    """Solves cells in `workers` processes; small problems are solved in the calling process."""
+    workers = min(workers, os.cpu_count() or 1)
+    if workers <= 1 or len(cells) < 2 or sum(cell.pairs for cell in cells) < _PARALLEL_MIN_PAIRS:
+        return solve_shard(cells), 1
+    shards = split_shards(cells, workers)
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        solutions = [solution for shard in pool.map(solve_shard, shards) for solution in shard]
+    return solutions, len(shards)
+
+
+def assign_rooms(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    workers: int = 1,
+    apply: bool = True,
+) -> AssignmentResult:
+    """
+    Gives a room to every unassigned event of [date_from, date_to] that can get one.
+
+    Every (day, slot) cell is an independent minimum-cost bipartite matching
+    between its events and free rooms, weighted by wasted seats (room capacity
+    minus group size). Cells are solved in a process pool split into shards.
+    With `apply` the rooms are written with one bulk UPDATE; the caller commits.
+    """
+    result = AssignmentResult()
+    started = time.perf_counter()
+    cells, courses, hopeless = build_cells(db, date_from, date_to)
+    result.unassigned.update(hopeless)
+    result.cells = len(cells)
+    result.load_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    started = time.perf_counter()
+    solutions, result.shards = solve_cells(cells, workers)
+    result.solve_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    added: List[Booking] = []
+    removed: List[Booking] = []
+    for solution in solutions:
+        for event_id, room_id, waste in solution.assigned:
+            result.assigned[event_id] = room_id
+            result.wasted_seats += waste
+            added.append(Booking(courses[event_id], room_id, solution.day, solution.time_slot_id))
+            removed.append(Booking(courses[event_id], None, solution.day, solution.time_slot_id))
+        for event_id in solution.unassigned:
+            result.unassigned[event_id] = (solution.day, solution.time_slot_id, NO_FREE_ROOM)
+
+    if apply and result.assigned:
+        db.execute(update(CourseEvent), [
+            {"id": event_id, "room_id": room_id} for event_id, room_id in result.assigned.items()
+        ])
+        # Zapis z pominięciem unit of work nie uruchamia hooków after_flush
+        record_bookings(db, added=added, removed=removed)
+        invalidate_recommendations(db, bookings=added)
+        touch_feeds(db, added)
+    return result
@@ -0,0 +1,186 @@
+import threading
+import time as clock
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from config import get_settings
+from model import RoomUnavailability, TimeSlots
+from sqlalchemy import and_, event, func
+from sqlalchemy.orm import Query, Session
+
+# (początek, koniec, id blokady); przedziały półotwarte [początek, koniec)
+Interval = Tuple[datetime, datetime, int]
+
+_MOMENT = timedelta(microseconds=1)
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over half-open [start, end) intervals.
+
+    Each node keeps the intervals containing its center sorted by start and by
+    end; intervals entirely left or right of the center go to the children.
+    Queries cost O(log n + k) for k results.
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals: Sequence[Interval]):
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        # Dolna mediana końców: każde dziecko dostaje ściśle mniej przedziałów
+        self.center = points[(len(points) - 1) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end <= self.center:
+                left.append(interval)
+            elif start > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Intervals sharing at least one moment with [start, end)."""
+        found: List[Interval] = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if end <= node.center:
+                for interval in node.by_start:
+                    if interval[0] >= end:
+                        break
+                    found.append(interval)
+                if node.left:
+                    stack.append(node.left)
+            elif start > node.center:
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    found.append(interval)
+                if node.right:
+                    stack.append(node.right)
+            else:
+                found.extend(node.by_start)
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+        return found
+
+    def containing(self, start: datetime, end: datetime) -> List[Interval]:
+        """Intervals covering the whole of [start, end)."""
+        return [i for i in self.overlapping(start, end) if i[0] <= start and i[1] >= end]
+
+    def at(self, moment: datetime) -> List[Interval]:
+        """Intervals in force at `moment`."""
+        return self.overlapping(moment, moment + _MOMENT)
+
+
+class UnavailabilityIndex:
+    """RoomUnavailability blocks as one interval tree per room, queried at time slot granularity."""
+
+    def __init__(self, blocks: Iterable[Tuple[int, int, datetime, datetime]], slots: Dict[int, Tuple[time, time]]):
+        per_room: Dict[int, List[Interval]] = {}
+        for block_id, room_id, start, end in blocks:
+            if start < end:
+                per_room.setdefault(room_id, []).append((start, end, block_id))
+        self.trees = {room_id: IntervalTree(intervals) for room_id, intervals in per_room.items()}
+        self.slots = slots
+        self.loaded_at = clock.monotonic()
+
+    def slot_window(self, day: date, time_slot_id: int) -> Tuple[datetime, datetime]:
+        start, end = self.slots[time_slot_id]
+        return datetime.combine(day, start), datetime.combine(day, end)
+
+    def overlapping(self, room_id: int, start: datetime, end: datetime) -> List[Interval]:
+        tree = self.trees.get(room_id)
+        return tree.overlapping(start, end) if tree else []
+
+    def containing(self, room_id: int, start: datetime, end: datetime) -> List[Interval]:
+        tree = self.trees.get(room_id)
+        return tree.containing(start, end) if tree else []
+
+    def at(self, room_id: int, moment: datetime) -> List[Interval]:
+        tree = self.trees.get(room_id)
+        return tree.at(moment) if tree else []
+
+    def is_blocked(self, room_id: int, day: date, time_slot_id: int) -> bool:
+        """A slot is lost when any block overlaps its time window, even partially."""
+        return bool(self.overlapping(room_id, *self.slot_window(day, time_slot_id)))
+
+    def blocked_rooms(self, room_ids: Iterable[int], day: date, time_slot_id: int) -> Set[int]:
+        start, end = self.slot_window(day, time_slot_id)
+        return {room_id for room_id in room_ids if room_id in self.trees and self.overlapping(room_id, start, end)}
+
+
+def load_index(db: Session) -> UnavailabilityIndex:
+    blocks = db.query(
+        RoomUnavailability.id,
+        RoomUnavailability.room_id,
+        RoomUnavailability.start_datetime,
+        RoomUnavailability.end_datetime
+    ).all()
+    slots = {slot.id: (slot.start_time, slot.end_time) for slot in db.query(TimeSlots).all()}
+    return UnavailabilityIndex(blocks, slots)
+
+
+def filter_overlapping(query: Query, start: Optional[datetime], end: Optional[datetime], dialect: str) -> Query:
+    """
+    Narrows a RoomUnavailability query to blocks overlapping [start, end); either bound may be open.
+
+    On Postgres the test is `tsrange(...) && tsrange(...)`, answered by the GiST
+    index ix_room_unavailability_period; elsewhere plain comparisons.
+    """
+    if start is None and end is None:
+        return query
+    if dialect == "postgresql":
+        period = func.tsrange(RoomUnavailability.start_datetime, RoomUnavailability.end_datetime, "[)")
+        return query.filter(period.op("&&")(func.tsrange(start, end, "[)")))
+    criteria = []
+    if end is not None:
+        criteria.append(RoomUnavailability.start_datetime < end)
+    if start is not None:
+        criteria.append(RoomUnavailability.end_datetime > start)
+    return query.filter(and_(*criteria))
+
+
+_index: Optional[UnavailabilityIndex] = None
+_lock = threading.Lock()
+
+
+def get_unavailability_index(db: Session) -> UnavailabilityIndex:
+    global _index
+    ttl = get_settings().UNAVAILABILITY_INDEX_TTL_SECONDS
+    with _lock:
+        if _index is None or clock.monotonic() - _index.loaded_at > ttl:
+            _index = load_index(db)
+        return _index
+
+
+def invalidate_unavailability_index() -> None:
+    global _index
+    with _lock:
+        _index = None
+
+
+@event.listens_for(Session, "after_flush")
+def _detect_unavailability_changes(session: Session, flush_context) -> None:
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (RoomUnavailability, TimeSlots)):
+            session.info["unavailability_index_stale"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop("unavailability_index_stale", False):
+        invalidate_unavailability_index()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("unavailability_index_stale", None)
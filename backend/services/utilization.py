@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+from config import get_settings
+from model import Course, CourseEvent, FeedVersion, Group, Room, RoomType, RoomUnavailability, TimeSlots
+from services.free_busy import CellGrid
+from services.unavailability_index import get_unavailability_index
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+_CACHE_SIZE = 32
+PEAK_COUNT = 5
+
+
+def _rates(booked: np.ndarray, available: np.ndarray) -> np.ndarray:
+    """booked / available, NaN where nothing was available."""
+    return np.divide(booked, available, out=np.full(booked.shape, np.nan), where=available > 0)
+
+
+def _listed(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(value) else round(float(value), 4) for value in values]
+
+
+def _scalar(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def compute_utilization(db: Session, date_from: date, date_to: date) -> dict:
+    """
+    Room utilization of [date_from, date_to] from one read of `course_events`.
+
+    Bookings become a boolean (room, day, slot) matrix and RoomUnavailability
+    blocks remove cells from the available ones; every rate is then a sum over
+    matrix axes (weekday sums through a one-hot day -> weekday matrix).
+    Capacity fit is group size / room capacity averaged over booked events of
+    groups with a known size.
+    """
+    settings = get_settings()
+    slots = db.query(TimeSlots).order_by(TimeSlots.start_time).all()
+    grid = CellGrid(date_from, date_to, slots)
+    rooms = db.query(Room.id, Room.name, Room.capacity, Room.type).order_by(Room.id).all()
+    n_rooms, n_days, n_slots = len(rooms), grid.n_days, len(grid.slot_ids)
+
+    room_pos = {room.id: pos for pos, room in enumerate(rooms)}
+    slot_pos = {slot_id: pos for pos, slot_id in enumerate(grid.slot_ids)}
+    rows = db.execute(select(
+        CourseEvent.room_id, CourseEvent.day, CourseEvent.time_slot_id, Group.size
+    ).join(Course, CourseEvent.course_id == Course.id).join(Group, Course.group_id == Group.id).where(
+        CourseEvent.room_id.is_not(None),
+        CourseEvent.canceled == False,
+        CourseEvent.day >= date_from,
+        CourseEvent.day <= date_to,
+    )).all()
+    rows = [row for row in rows if row[0] in room_pos and row[2] in slot_pos]
+    event_room = np.fromiter((room_pos[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+    event_cell = np.fromiter(
+        ((row[1] - date_from).days * n_slots + slot_pos[row[2]] for row in rows), dtype=np.int64, count=len(rows)
+    )
+    event_size = np.fromiter((np.nan if row[3] is None else row[3] for row in rows), dtype=np.float64, count=len(rows))
+
+    busy = np.zeros((n_rooms, grid.size), dtype=bool)
+    busy[event_room, event_cell] = True
+    available = np.ones((n_rooms, grid.size), dtype=bool)
+    if grid.size:
+        unavailability = get_unavailability_index(db)
+        for pos, room in enumerate(rooms):
+            for start, end, _ in unavailability.overlapping(room.id, grid.starts[0], grid.ends[-1]):
+                first, last = grid.cells_overlapping(start, end)
+                available[pos, first:last] = False
+    # Zajęcia w zablokowanej komórce i tak się odbyły, więc komórka się liczy
+    available |= busy
+
+    busy3 = busy.reshape(n_rooms, n_days, n_slots).astype(np.int64)
+    available3 = available.reshape(n_rooms, n_days, n_slots).astype(np.int64)
+    weekdays = np.zeros((n_days, 7), dtype=np.int64)
+    weekdays[np.arange(n_days), (date_from.weekday() + np.arange(n_days)) % 7] = 1
+
+    booked_total = busy3.sum(axis=(1, 2))
+    available_total = available3.sum(axis=(1, 2))
+    booked_weekday = np.einsum("rds,dw->rw", busy3, weekdays)
+    available_weekday = np.einsum("rds,dw->rw", available3, weekdays)
+    booked_slot = busy3.sum(axis=1)
+    available_slot = available3.sum(axis=1)
+
+    capacities = np.array([room.capacity for room in rooms], dtype=np.float64)
+    known = ~np.isnan(event_size)
+    fit = np.where(known, event_size / np.maximum(capacities[event_room], 1), 0.0)
+    fit_sum = np.bincount(event_room, weights=fit, minlength=n_rooms)
+    fit_count = np.bincount(event_room, weights=known.astype(np.float64), minlength=n_rooms)
+
+    room_types = list(RoomType)
+    type_matrix = np.zeros((n_rooms, len(room_types)), dtype=np.int64)
+    type_matrix[np.arange(n_rooms), [room_types.index(room.type) for room in rooms]] = 1
+
+    room_rates = _rates(booked_total, available_total)
+    idle_threshold = settings.UTILIZATION_IDLE_THRESHOLD
+    idle = (available_total > 0) & (np.nan_to_num(room_rates) < idle_threshold)
+
+    report_rooms = []
+    for pos, room in enumerate(rooms):
+        report_rooms.append({
+            "room_id": room.id,
+            "name": room.name,
+            "type": room.type,
+            "capacity": room.capacity,
+            "available_slots": int(available_total[pos]),
+            "booked_slots": int(booked_total[pos]),
+            "occupancy_rate": _scalar(room_rates[pos]),
+            "by_weekday": _listed(_rates(booked_weekday[pos], available_weekday[pos])),
+            "by_time_slot": _listed(_rates(booked_slot[pos], available_slot[pos])),
+            "capacity_fit": _scalar(_rates(fit_sum[pos], fit_count[pos])),
+            "idle": bool(idle[pos]),
+        })
+
+    report_types = []
+    for column, room_type in enumerate(room_types):
+        members = type_matrix[:, column]
+        if not members.any():
+            continue
+        report_types.append({
+            "type": room_type,
+            "rooms": int(members.sum()),
+            "occupancy_rate": _scalar(_rates(members @ booked_total, members @ available_total)),
+            "by_weekday": _listed(_rates(members @ booked_weekday, members @ available_weekday)),
+            "by_time_slot": _listed(_rates(members @ booked_slot, members @ available_slot)),
+            "capacity_fit": _scalar(_rates(members @ fit_sum, members @ fit_count)),
+        })
+
+    # Mapa (dzień tygodnia, slot) dla wszystkich sal razem
+    heat_booked = weekdays.T @ busy3.sum(axis=0)
+    heat_available = weekdays.T @ available3.sum(axis=0)
+    heat = np.nan_to_num(_rates(heat_booked, heat_available), nan=-1.0)
+    order = np.lexsort((-heat_booked.ravel(), -heat.ravel()))
+    peaks = []
+    for flat in order[:PEAK_COUNT]:
+        weekday, pos = divmod(int(flat), n_slots)
+        if heat_booked[weekday, pos] == 0:
+            break
+        peaks.append({
+            "weekday": weekday,
+            "time_slot_id": grid.slot_ids[pos],
+            "start_time": slots[pos].start_time,
+            "booked_slots": int(heat_booked[weekday, pos]),
+            "occupancy_rate": _scalar(heat[weekday, pos]),
+        })
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "time_slot_ids": grid.slot_ids,
+        "occupancy_rate": _scalar(_rates(booked_total.sum(), available_total.sum())),
+        "rooms": report_rooms,
+        "room_types": report_types,
+        "peak_hours": peaks,
+        "idle_threshold": idle_threshold,
+        "idle_room_ids": [room.id for pos, room in enumerate(rooms) if idle[pos]],
+        "computed_at": datetime.utcnow(),
+    }
+
+
+def timetable_stamp(db: Session) -> int:
+    """
+    Changes whenever any booking, room, group or time slot changes.
+
+    Feed versions are bumped by every such write, ORM or bulk, in every
+    worker, so one aggregate over feed_versions detects them.
+    """
+    return db.query(func.coalesce(func.sum(FeedVersion.version), 0)).scalar()
+
+
+class _UtilizationCache:
+    """Reports by date window, reused while the timetable stamp is unchanged and the TTL lasts."""
+
+    def __init__(self):
+        self._items: "OrderedDict[Tuple[date, date], Tuple[int, float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[date, date], stamp: int) -> Optional[dict]:
+        ttl = get_settings().UTILIZATION_CACHE_TTL_SECONDS
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is None or cached[0] != stamp or time.monotonic() - cached[1] > ttl:
+                return None
+            self._items.move_to_end(key)
+            return cached[2]
+
+    def put(self, key: Tuple[date, date], stamp: int, report: dict) -> None:
+        with self._lock:
+            self._items[key] = (stamp, time.monotonic(), report)
+            self._items.move_to_end(key)
+            while len(self._items) > _CACHE_SIZE:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+utilization_cache = _UtilizationCache()
+
+
+def get_utilization(db: Session, date_from: date, date_to: date) -> Tuple[dict, bool]:
+    """Returns the report of the window and whether it came from the cache."""
+    stamp = timetable_stamp(db)
+    report = utilization_cache.get((date_from, date_to), stamp)
+    if report is not None:
+        return report, True
+    report = compute_utilization(db, date_from, date_to)
+    utilization_cache.put((date_from, date_to), stamp, report)
+    return report, False
+
+
+@event.listens_for(Session, "after_flush")
+def _detect_blocking_changes(session: Session, flush_context) -> None:
+    # Blokady sal i nowe sale nie zmieniają wersji feedów
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (RoomUnavailability, Room)):
+            session.info["utilization_stale"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_on_commit(session: Session) -> None:
+    if session.info.pop("utilization_stale", False):
+        utilization_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("utilization_stale", None)
@@ -0,0 +1,9 @@
+import os
+
+# Settings() czyta zmienne środowiskowe przy pierwszym get_settings(), a moduły
+# aplikacji wołają je przy imporcie; fixture'y (i importy aplikacji) są więc
+# w pluginie ładowanym dopiero po wykonaniu tego pliku
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+pytest_plugins = ["tests.fixtures"]
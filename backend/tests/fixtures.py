@@ -0,0 +1,77 @@
+from datetime import time
+from types import SimpleNamespace
+
+import pytest
+from database import SessionLocal
+from model import Base, Course, Group, Room, RoomType, TimeSlots, User, UserRole
+from services.authorization import authorization_cache
+from services.cache_versions import version_watch
+from services.equipment_masks import invalidate_equipment_masks
+from services.occupancy import invalidate_occupancy_index
+from services.principal_cache import principal_cache
+from services.unavailability_index import invalidate_unavailability_index
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+def make_session():
+    """Session bound to a fresh in-memory SQLite database with all tables created."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+@pytest.fixture
+def db():
+    session = make_session()
+    # Hooki po commicie (np. uzupełnianie rekomendacji) otwierają własne sesje przez SessionLocal
+    SessionLocal.configure(bind=session.get_bind())
+    yield session
+    session.close()
+    session.get_bind().dispose()
+
+
+def reset_process_state():
+    invalidate_occupancy_index()
+    invalidate_equipment_masks()
+    invalidate_unavailability_index()
+    authorization_cache.clear()
+    principal_cache.clear()
+    version_watch.reset()
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes():
+    """Per-process indexes and caches must not leak between test databases."""
+    reset_process_state()
+    yield
+    reset_process_state()
+
+
+def seed_timetable(db):
+    """Two courses with their own teacher and group, two rooms and four time slots."""
+    teacher = User(email="t@agh.edu.pl", password="x", name="T", surname="T", role=UserRole.PROWADZACY)
+    leader = User(email="s@agh.edu.pl", password="x", name="S", surname="S", role=UserRole.STAROSTA)
+    other = User(email="o@agh.edu.pl", password="x", name="O", surname="O", role=UserRole.PROWADZACY)
+    slots = [TimeSlots(id=i, start_time=time(6 + 2 * i), end_time=time(7 + 2 * i)) for i in range(1, 5)]
+    rooms = [Room(name=f"S{i}", capacity=30, type=RoomType.SEMINAR_ROOM) for i in range(2)]
+    db.add_all([teacher, leader, other, *slots, *rooms])
+    db.flush()
+    group = Group(name="G1", leader_id=leader.id)
+    other_group = Group(name="G2", leader_id=other.id)
+    db.add_all([group, other_group])
+    db.flush()
+    course = Course(name="Algebra", teacher_id=teacher.id, group_id=group.id)
+    other_course = Course(name="Analiza", teacher_id=other.id, group_id=other_group.id)
+    db.add_all([course, other_course])
+    db.commit()
+    return SimpleNamespace(
+        teacher=teacher, leader=leader, other=other, group=group, other_group=other_group,
+        course=course, other_course=other_course, rooms=rooms, slots=slots,
+    )
+
+
+@pytest.fixture
+def timetable(db):
+    return seed_timetable(db)
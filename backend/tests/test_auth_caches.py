@@ -0,0 +1,75 @@
+import pytest
+from config import get_settings
+from model import CacheVersion, Course, User
+from services.authorization import get_authorization_context
+from services.cache_versions import AUTHORIZATION, PRINCIPALS, bump_cache_version
+from services.principal_cache import load_principal
+from sqlalchemy import update
+
+
+@pytest.fixture
+def check_versions_every_request(monkeypatch):
+    monkeypatch.setattr(get_settings(), "CACHE_VERSION_CHECK_SECONDS", 0)
+
+
+def version(db, name: str) -> int:
+    row = db.get(CacheVersion, name)
+    return row.version if row else 0
+
+
+def revoke_in_other_process(db, statement, name: str) -> None:
+    """A write made by another worker: this process only sees the bumped version row."""
+    db.execute(statement)
+    bump_cache_version(db, name)
+    db.commit()
+
+
+def test_course_write_bumps_the_authorization_version(db, timetable):
+    before = version(db, AUTHORIZATION)
+    timetable.course.teacher_id = timetable.other.id
+    db.commit()
+    assert version(db, AUTHORIZATION) == before + 1
+
+
+def test_authorization_revoked_elsewhere_is_not_served(db, timetable, check_versions_every_request):
+    teacher_id, course_id = timetable.teacher.id, timetable.course.id
+    assert get_authorization_context(db, teacher_id).is_teacher(course_id)
+
+    revoke_in_other_process(
+        db, update(Course).where(Course.id == course_id).values(teacher_id=timetable.other.id), AUTHORIZATION
+    )
+
+    assert not get_authorization_context(db, teacher_id).is_teacher(course_id)
+
+
+def test_authorization_is_cached_while_the_version_is_unchanged(db, timetable, check_versions_every_request):
+    teacher_id, course_id = timetable.teacher.id, timetable.course.id
+    assert get_authorization_context(db, teacher_id).is_teacher(course_id)
+
+    db.execute(update(Course).where(Course.id == course_id).values(teacher_id=timetable.other.id))
+    db.commit()
+
+    assert get_authorization_context(db, teacher_id).is_teacher(course_id)
+
+
+def test_user_write_bumps_the_principal_version_and_drops_the_entry(db, timetable):
+    email = timetable.teacher.email
+    assert load_principal(db, email).active
+    before = version(db, PRINCIPALS)
+
+    timetable.teacher.active = False
+    db.commit()
+
+    assert version(db, PRINCIPALS) == before + 1
+    db.expunge_all()
+    assert not load_principal(db, email).active
+
+
+def test_principal_deactivated_elsewhere_is_not_served(db, timetable, check_versions_every_request):
+    email, user_id = timetable.teacher.email, timetable.teacher.id
+    assert load_principal(db, email).active
+    db.expunge_all()
+
+    revoke_in_other_process(db, update(User).where(User.id == user_id).values(active=False), PRINCIPALS)
+
+    assert not load_principal(db, email).active
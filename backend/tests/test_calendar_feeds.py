@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from model import CourseEvent
+from services.calendar_feeds import current_etag, get_feed, touch_feeds
+from services.occupancy import GROUP, ROOM, TEACHER, Booking
+
+DAY = date.today() + timedelta(days=7)
+
+
+def etags(db, timetable):
+    keys = {
+        "room0": (ROOM, timetable.rooms[0].id),
+        "room1": (ROOM, timetable.rooms[1].id),
+        "teacher": (TEACHER, timetable.teacher.id),
+        "group": (GROUP, timetable.group.id),
+        "other_teacher": (TEACHER, timetable.other.id),
+    }
+    return {name: current_etag(db, kind, entity_id) for name, (kind, entity_id) in keys.items()}
+
+
+def changed(before, after):
+    return {name for name in before if before[name] != after[name]}
+
+
+def test_moving_an_event_changes_only_the_affected_feeds(db, timetable):
+    event = CourseEvent(course_id=timetable.course.id, room_id=timetable.rooms[0].id, time_slot_id=1, day=DAY)
+    db.add(event)
+    db.commit()
+    before = etags(db, timetable)
+
+    event.room_id = timetable.rooms[1].id
+    db.commit()
+
+    assert changed(before, etags(db, timetable)) == {"room0", "room1", "teacher", "group"}
+
+
+def test_bulk_writes_touch_their_feeds(db, timetable):
+    before = etags(db, timetable)
+
+    touch_feeds(db, [Booking(timetable.other_course.id, timetable.rooms[1].id, DAY, 1)])
+    db.commit()
+
+    assert changed(before, etags(db, timetable)) == {"room1", "other_teacher"}
+
+
+def test_renaming_a_room_changes_every_feed(db, timetable):
+    before = etags(db, timetable)
+
+    timetable.rooms[0].name = "Aula"
+    db.commit()
+
+    assert changed(before, etags(db, timetable)) == set(before)
+
+
+def test_cached_feed_is_rendered_again_after_a_change(db, timetable):
+    room = timetable.rooms[0]
+    etag = current_etag(db, ROOM, room.id)
+    empty = get_feed(db, ROOM, room.id, room.name, etag)
+    assert "BEGIN:VEVENT" not in empty
+
+    db.add(CourseEvent(course_id=timetable.course.id, room_id=room.id, time_slot_id=1, day=DAY))
+    db.commit()
+
+    assert get_feed(db, ROOM, room.id, room.name, etag) is empty
+    assert "BEGIN:VEVENT" in get_feed(db, ROOM, room.id, room.name, current_etag(db, ROOM, room.id))
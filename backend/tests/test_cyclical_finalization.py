@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from model import ChangeRecomendation, ChangeRequest, ChangeRequestStatus, CourseEvent
+from services.finalization import finalize_recommendation
+from services.occupancy import check_consistency, get_occupancy_index
+
+MONDAY = date(2026, 10, 5)
+WEEKS = 3
+
+
+def cyclical_request(db, timetable):
+    """Wednesday slot 1 classes for three weeks, recommended to move to Monday slot 2 in room 1."""
+    events = [
+        CourseEvent(course_id=timetable.course.id, room_id=timetable.rooms[0].id, time_slot_id=1,
+                    day=MONDAY + timedelta(weeks=week, days=2))
+        for week in range(WEEKS)
+    ]
+    db.add_all(events)
+    db.flush()
+    change_request = ChangeRequest(
+        course_event_id=events[0].id, initiator_id=timetable.teacher.id, reason="test", cyclical=True
+    )
+    db.add(change_request)
+    db.flush()
+    rec = ChangeRecomendation(
+        change_request_id=change_request.id, recommended_day=MONDAY,
+        recommended_slot_id=2, recommended_room_id=timetable.rooms[1].id,
+    )
+    db.add(rec)
+    db.commit()
+    return rec
+
+
+def test_every_week_is_moved_in_one_go(db, timetable):
+    rec = cyclical_request(db, timetable)
+    get_occupancy_index(db)
+
+    change_request = finalize_recommendation(rec, db)
+
+    assert change_request.status == ChangeRequestStatus.ACCEPTED
+    active = db.query(CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.room_id).filter(
+        CourseEvent.canceled == False
+    ).order_by(CourseEvent.day).all()
+    assert active == [(MONDAY + timedelta(weeks=week), 2, timetable.rooms[1].id) for week in range(WEEKS)]
+    assert db.query(CourseEvent).filter(CourseEvent.canceled == True).count() == WEEKS
+    assert check_consistency(db) == []
+
+
+def test_one_busy_week_rejects_the_whole_series(db, timetable):
+    rec = cyclical_request(db, timetable)
+    busy_week = MONDAY + timedelta(weeks=1)
+    db.add(CourseEvent(course_id=timetable.course.id, room_id=None, time_slot_id=2, day=busy_week))
+    db.commit()
+
+    with pytest.raises(HTTPException) as raised:
+        finalize_recommendation(rec, db)
+
+    db.rollback()
+    assert raised.value.status_code == 409
+    assert raised.value.detail == f"Conflicts in 1 week(s): {busy_week.isoformat()} (group, teacher)"
+    assert db.query(CourseEvent).filter(CourseEvent.canceled == True).count() == 0
+    assert db.get(ChangeRequest, rec.change_request_id).status == ChangeRequestStatus.PENDING
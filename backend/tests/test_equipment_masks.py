@@ -0,0 +1,36 @@
+from model import Equipment
+from services.equipment_masks import UNSATISFIABLE, get_equipment_masks
+
+
+def test_requirements_match_rooms_with_all_listed_equipment(db, timetable):
+    projector, board = Equipment(name="Projektor"), Equipment(name="Tablica")
+    s0, s1 = timetable.rooms
+    s0.equipment = [projector, board]
+    s1.equipment = [projector]
+    db.commit()
+
+    masks = get_equipment_masks(db)
+    both = masks.requirement_mask(" projektor, TABLICA ")
+    assert masks.matches(s0.id, both)
+    assert not masks.matches(s1.id, both)
+    assert masks.requirement_mask("Projektor, Rzutnik") == UNSATISFIABLE
+    assert masks.ids_mask([projector.id]) == masks.requirement_mask("projektor")
+
+
+def test_equipment_change_is_visible_after_commit_only(db, timetable):
+    room = timetable.rooms[1]
+    projector = Equipment(name="Projektor")
+    db.add(projector)
+    db.commit()
+    before = get_equipment_masks(db)
+    mask = before.requirement_mask("Projektor")
+    assert not before.matches(room.id, mask)
+
+    room.equipment.append(projector)
+    db.flush()
+    db.rollback()
+    assert get_equipment_masks(db) is before
+
+    room.equipment.append(projector)
+    db.commit()
+    assert get_equipment_masks(db).matches(room.id, mask)
@@ -0,0 +1,53 @@
+import io
+from datetime import date
+
+from model import Course, CourseEvent
+from services.event_import import import_events
+
+DAY = date(2026, 10, 5)
+
+
+def run_import(db, *rows):
+    stream = io.StringIO("\n".join(["course,room,day,slot", *rows]) + "\n")
+    return import_events(db, stream, atomic=False)
+
+
+def test_ambiguous_course_name_is_a_row_error(db, timetable):
+    db.add(Course(name="Algebra", teacher_id=timetable.other.id, group_id=timetable.other_group.id))
+    db.commit()
+
+    report = run_import(db, "algebra,S0,2026-10-05,1", f"{timetable.course.id},S0,2026-10-06,1")
+
+    assert report.imported == 1
+    assert [(error.row, error.errors) for error in report.errors] == [
+        (2, ["Ambiguous course name 'algebra', use the ID"])
+    ]
+
+
+def test_name_looking_like_an_id_does_not_shadow_that_id(db, timetable):
+    # Sala o nazwie równej ID innej sali: wartość liczbowa zawsze oznacza ID
+    s0, s1 = timetable.rooms
+    s1.name = str(s0.id)
+    db.commit()
+
+    report = run_import(db, f"Algebra,{s0.id},2026-10-05,1")
+
+    assert report.errors == []
+    assert db.query(CourseEvent.room_id).one() == (s0.id,)
+
+
+def test_cancelled_event_still_holds_its_room(db, timetable):
+    db.add(CourseEvent(
+        course_id=timetable.other_course.id, room_id=timetable.rooms[0].id,
+        time_slot_id=1, day=DAY, canceled=True,
+    ))
+    db.commit()
+
+    report = run_import(db, "Algebra,S0,2026-10-05,1", "Algebra,S1,2026-10-05,2", "Analiza,S1,2026-10-05,2")
+
+    assert report.imported == 1
+    assert [(error.row, error.errors) for error in report.errors] == [
+        (2, ["Conflict on 2026-10-05: room busy"]),
+        (4, ["Conflict on 2026-10-05: room busy"]),
+    ]
+
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from model import Base, CourseEvent
+from routers.courses import get_all_events
+from services.pagination import decode_cursor, encode_cursor
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from tests.fixtures import seed_timetable
+
+MONDAY = date(2026, 10, 5)
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    """Sync session on a SQLite file, so that an AsyncSession can read the same data."""
+    path = tmp_path / "events.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session, f"sqlite+aiosqlite:///{path}"
+    session.close()
+    engine.dispose()
+
+
+def fetch_pages(url: str, limit: int, on_page=None, **filters):
+    async def run():
+        engine = create_async_engine(url)
+        pages = []
+        cursor = None
+        try:
+            while True:
+                async with AsyncSession(engine) as db:
+                    response = Response()
+                    events = await get_all_events(
+                        response, cursor=cursor, limit=limit, date_from=filters.get("date_from"),
+                        date_to=filters.get("date_to"), room_id=None, course_id=None, teacher_id=None,
+                        group_id=None, canceled=None, db=db, current_user=None,
+                    )
+                    pages.append([event.id for event in events])
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    return pages
+                if on_page is not None:
+                    on_page()
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def add_events(db, course, days_and_slots):
+    events = [CourseEvent(course_id=course.id, day=day, time_slot_id=slot) for day, slot in days_and_slots]
+    db.add_all(events)
+    db.commit()
+    return events
+
+
+def ordered_ids(db):
+    return [event_id for event_id, in db.query(CourseEvent.id).order_by(
+        CourseEvent.day, CourseEvent.time_slot_id, CourseEvent.id
+    )]
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(MONDAY, 3, 42)) == (MONDAY, 3, 42)
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor("not-a-cursor")
+    assert raised.value.status_code == 400
+
+
+def test_pages_cover_every_event_once_in_order(file_db):
+    db, url = file_db
+    timetable = seed_timetable(db)
+    add_events(db, timetable.course, [(MONDAY + timedelta(days=d), slot) for d in range(3) for slot in (3, 1)])
+
+    pages = fetch_pages(url, limit=4)
+
+    assert [len(page) for page in pages] == [4, 2]
+    assert [event_id for page in pages for event_id in page] == ordered_ids(db)
+
+
+def test_rows_inserted_before_the_cursor_do_not_shift_later_pages(file_db):
+    db, url = file_db
+    timetable = seed_timetable(db)
+    add_events(db, timetable.course, [(MONDAY + timedelta(days=d), 1) for d in range(1, 5)])
+    before = ordered_ids(db)
+
+    pages = fetch_pages(url, limit=2, on_page=lambda: add_events(db, timetable.course, [(MONDAY, 1)]))
+
+    assert [event_id for page in pages for event_id in page] == before
+
+
+def test_date_window_limits_the_pages(file_db):
+    db, url = file_db
+    timetable = seed_timetable(db)
+    events = add_events(db, timetable.course, [(MONDAY + timedelta(days=d), 1) for d in range(5)])
+
+    pages = fetch_pages(url, limit=10, date_from=MONDAY + timedelta(days=1), date_to=MONDAY + timedelta(days=3))
+
+    assert pages == [[event.id for event in events[1:4]]]
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from model import CourseEvent
+from routers.courses import create_event_series
+from routers.schemas import CourseEventSeriesCreate
+from services.event_series import series_days
+from services.occupancy import check_consistency, get_occupancy_index
+
+MONDAY = date(2026, 10, 5)
+
+
+def series(timetable, **overrides) -> CourseEventSeriesCreate:
+    values = dict(
+        course_id=timetable.course.id, room_id=timetable.rooms[0].id, time_slot_id=1,
+        weekday=0, start_date=MONDAY, end_date=MONDAY + timedelta(weeks=3),
+    )
+    values.update(overrides)
+    return CourseEventSeriesCreate(**values)
+
+
+def test_series_days_respect_interval_and_skipped_dates():
+    days = series_days(MONDAY + timedelta(days=1), MONDAY + timedelta(weeks=6), 0, 2, [MONDAY + timedelta(weeks=3)])
+    assert days == [MONDAY + timedelta(weeks=1), MONDAY + timedelta(weeks=5)]
+
+
+def test_series_is_created_in_one_transaction(db, timetable):
+    get_occupancy_index(db)
+
+    events = create_event_series(series(timetable), db=db, current_user=timetable.teacher)
+
+    assert [event.day for event in events] == [MONDAY + timedelta(weeks=week) for week in range(4)]
+    assert check_consistency(db) == []
+
+
+def test_cancelled_row_in_one_week_rejects_the_series(db, timetable):
+    # Odwołane zajęcia innego kursu nadal trzymają salę (uq_room_day_time)
+    held = MONDAY + timedelta(weeks=2)
+    db.add(CourseEvent(
+        course_id=timetable.other_course.id, room_id=timetable.rooms[0].id, time_slot_id=1, day=held, canceled=True
+    ))
+    db.commit()
+
+    with pytest.raises(HTTPException) as raised:
+        create_event_series(series(timetable), db=db, current_user=timetable.teacher)
+
+    assert raised.value.status_code == 409
+    assert raised.value.detail == f"Conflicts in 1 week(s): {held.isoformat()} (room)"
+    assert db.query(CourseEvent).count() == 1
@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+from model import ChangeRecomendation, ChangeRequest, CourseEvent
+from services.finalization import apply_plan, find_conflicts, find_conflicts_in_index, plan_finalization
+from services.occupancy import check_consistency, get_occupancy_index
+
+DAY = date(2026, 10, 5)
+
+
+def recommend(db, timetable, room, slot_id, event=None):
+    """Change request moving `event` (by default a new one in room 0, slot 1) to `room` and `slot_id` on the same day."""
+    if event is None:
+        event = CourseEvent(course_id=timetable.course.id, room_id=timetable.rooms[0].id, time_slot_id=1, day=DAY)
+        db.add(event)
+        db.flush()
+    change_request = ChangeRequest(course_event_id=event.id, initiator_id=timetable.teacher.id, reason="test")
+    db.add(change_request)
+    db.flush()
+    rec = ChangeRecomendation(
+        change_request_id=change_request.id, recommended_day=DAY,
+        recommended_slot_id=slot_id, recommended_room_id=room.id,
+    )
+    db.add(rec)
+    db.commit()
+    return rec
+
+
+@pytest.mark.parametrize("target", ["cancelled_room", "own_old_cell", "teacher_busy", "free"])
+def test_simulate_and_accept_agree(db, timetable, target):
+    room, slot_id = timetable.rooms[1], 2
+    if target == "cancelled_room":
+        db.add(CourseEvent(
+            course_id=timetable.other_course.id, room_id=room.id, time_slot_id=2, day=DAY, canceled=True
+        ))
+    elif target == "own_old_cell":
+        room, slot_id = timetable.rooms[0], 1
+    elif target == "teacher_busy":
+        db.add(CourseEvent(course_id=timetable.course.id, room_id=None, time_slot_id=2, day=DAY))
+    db.commit()
+    rec = recommend(db, timetable, room, slot_id)
+
+    plan = plan_finalization(db, rec)
+    simulated = find_conflicts_in_index(get_occupancy_index(db), plan)
+    accepted = find_conflicts(db, plan)
+
+    assert simulated == accepted
+    expected = {"cancelled_room": {"room"}, "own_old_cell": {"room"}, "teacher_busy": {"teacher", "group"}}
+    assert simulated == ({DAY: expected[target]} if target in expected else {})
+
+
+def test_applied_plan_keeps_the_index_consistent(db, timetable):
+    rec = recommend(db, timetable, timetable.rooms[1], 2)
+    get_occupancy_index(db)
+
+    plan = plan_finalization(db, rec)
+    apply_plan(db, plan)
+    db.commit()
+    # Rekomendacja została usunięta poleceniem SQL, więc nie może zostać w mapie tożsamości
+    db.expunge(rec)
+
+    assert check_consistency(db) == []
+    # Odwołane wydarzenie nadal trzyma swoją salę, więc powrót do starego terminu jest konfliktem
+    moved = db.query(CourseEvent).filter(CourseEvent.canceled == False).one()
+    back = recommend(db, timetable, timetable.rooms[0], 1, event=moved)
+    assert find_conflicts_in_index(get_occupancy_index(db), plan_finalization(db, back)) == {DAY: {"room"}}
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from config import get_settings
+from model import Job, JobStatus
+from services.jobs import JOB_HANDLERS, claim_next, enqueue, heartbeat, requeue_timed_out, run_job
+
+TEST_JOB = "test_job"
+
+
+def stall(db, job: Job) -> None:
+    """Moves updated_at of a claimed job past the timeout, as if its worker had hung."""
+    job.updated_at = datetime.utcnow() - timedelta(seconds=get_settings().JOB_TIMEOUT_SECONDS + 1)
+    db.commit()
+
+
+def test_claim_takes_the_oldest_due_job_once(db):
+    first = enqueue(db, TEST_JOB, {})
+    enqueue(db, TEST_JOB, {})
+    later = enqueue(db, TEST_JOB, {})
+    later.run_after = datetime.utcnow() + timedelta(hours=1)
+    db.commit()
+
+    claimed = claim_next(db)
+    assert (claimed.id, claimed.status, claimed.attempts) == (first.id, JobStatus.RUNNING, 1)
+    assert claim_next(db).id != first.id
+    assert claim_next(db) is None
+
+
+def test_enqueue_deduplicates_by_key(db):
+    job = enqueue(db, TEST_JOB, {}, key="k")
+    db.commit()
+    assert enqueue(db, TEST_JOB, {}, key="k").id == job.id
+
+
+def test_timed_out_job_is_retried_then_failed(db):
+    job = enqueue(db, TEST_JOB, {})
+    job.max_attempts = 2
+    db.commit()
+
+    claim_next(db)
+    stall(db, job)
+    assert requeue_timed_out(db) == 1
+    db.refresh(job)
+    assert job.status == JobStatus.QUEUED
+
+    job.run_after = datetime.utcnow()
+    db.commit()
+    claim_next(db)
+    stall(db, job)
+    assert requeue_timed_out(db) == 0
+    db.refresh(job)
+    assert job.status == JobStatus.FAILED
+    assert job.error.startswith("Timed out")
+
+
+def test_heartbeat_keeps_the_claim_until_it_is_lost(db):
+    job = enqueue(db, TEST_JOB, {})
+    db.commit()
+    claim_next(db)
+    stall(db, job)
+
+    assert heartbeat(job.id, 1, bind=db.get_bind())
+    assert requeue_timed_out(db) == 0
+
+    stall(db, job)
+    assert requeue_timed_out(db) == 1
+    assert not heartbeat(job.id, 1, bind=db.get_bind())
+
+
+def test_run_that_lost_its_claim_does_not_overwrite_the_job(db, monkeypatch):
+    def handler(session, job):
+        # Inny worker uznał zadanie za zawieszone i oddał je do kolejki
+        session.query(Job).filter(Job.id == job.id).update({Job.status: JobStatus.QUEUED})
+        session.commit()
+        return {"done": True}
+
+    monkeypatch.setitem(JOB_HANDLERS, TEST_JOB, handler)
+    job = enqueue(db, TEST_JOB, {})
+    db.commit()
+    claim_next(db)
+
+    run_job(job.id)
+
+    db.refresh(job)
+    assert (job.status, job.result) == (JobStatus.QUEUED, None)
+
+
+def test_run_stores_the_result_of_an_owned_claim(db, monkeypatch):
+    monkeypatch.setitem(JOB_HANDLERS, TEST_JOB, lambda session, job: {"done": True})
+    job = enqueue(db, TEST_JOB, {})
+    db.commit()
+    claim_next(db)
+
+    run_job(job.id)
+
+    db.refresh(job)
+    assert (job.status, job.result) == (JobStatus.SUCCEEDED, {"done": True})
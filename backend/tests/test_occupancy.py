@@ -0,0 +1,60 @@
+from datetime import date
+
+from model import CourseEvent
+from routers.courses import room_booked
+from services.occupancy import HELD, ROOM, TEACHER, check_consistency, get_occupancy_index
+
+DAY = date(2026, 10, 5)
+
+
+def test_cancelled_rows_hold_only_the_room_cell(db, timetable):
+    room = timetable.rooms[0]
+    db.add(CourseEvent(course_id=timetable.course.id, room_id=room.id, time_slot_id=1, day=DAY, canceled=True))
+    db.commit()
+
+    index = get_occupancy_index(db)
+    assert index.count(HELD, room.id, DAY, 1) == 1
+    assert index.count(ROOM, room.id, DAY, 1) == 0
+    assert index.count(TEACHER, timetable.teacher.id, DAY, 1) == 0
+    assert room_booked(db, room.id, DAY, 1)
+    assert not room_booked(db, timetable.rooms[1].id, DAY, 1)
+
+
+def test_commit_publishes_a_new_index_and_keeps_the_old_snapshot(db, timetable):
+    room = timetable.rooms[0]
+    before = get_occupancy_index(db)
+
+    db.add(CourseEvent(course_id=timetable.course.id, room_id=room.id, time_slot_id=2, day=DAY))
+    db.commit()
+
+    after = get_occupancy_index(db)
+    assert after is not before
+    assert before.count(ROOM, room.id, DAY, 2) == 0
+    assert after.count(ROOM, room.id, DAY, 2) == 1
+    assert after.count(TEACHER, timetable.teacher.id, DAY, 2) == 1
+
+
+def test_index_follows_cancellation_and_stays_consistent(db, timetable):
+    room = timetable.rooms[0]
+    event = CourseEvent(course_id=timetable.course.id, room_id=room.id, time_slot_id=3, day=DAY)
+    db.add(event)
+    db.commit()
+    get_occupancy_index(db)
+
+    event.canceled = True
+    db.commit()
+
+    index = get_occupancy_index(db)
+    assert index.count(ROOM, room.id, DAY, 3) == 0
+    assert index.count(HELD, room.id, DAY, 3) == 1
+    assert check_consistency(db) == []
+
+
+def test_room_booked_ignores_the_edited_event_itself(db, timetable):
+    room = timetable.rooms[0]
+    event = CourseEvent(course_id=timetable.course.id, room_id=room.id, time_slot_id=4, day=DAY)
+    db.add(event)
+    db.commit()
+
+    assert room_booked(db, room.id, DAY, 4)
+    assert not room_booked(db, room.id, DAY, 4, exclude_event=event)
@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from model import (
+    AvailabilityProposal, ChangeRequest, Course, CourseEvent, Equipment, Group, Room,
+    RoomType, RoomUnavailability, TimeSlots, User, UserRole
+)
+from services.equipment_masks import invalidate_equipment_masks
+from services.occupancy import invalidate_occupancy_index
+from services.recommendation_engine import compute_candidates
+from services.unavailability_index import invalidate_unavailability_index
+from sqlalchemy import event
+from tests.fixtures import make_session
+
+ORIGIN = date(2026, 10, 5)
+
+
+@contextmanager
+def count_queries(session):
+    statements = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed(db, n_rooms: int, n_days: int) -> int:
+    """
+    One change request whose teacher and leader both propose every slot of
+    `n_days` days. Every day has a booked room, a blocked room and a slot in
+    which the teacher already teaches, so each filter has something to reject.
+    """
+    teacher = User(email="t@agh.edu.pl", password="x", name="T", surname="T", role=UserRole.PROWADZACY)
+    leader = User(email="s@agh.edu.pl", password="x", name="S", surname="S", role=UserRole.STAROSTA)
+    other = User(email="o@agh.edu.pl", password="x", name="O", surname="O", role=UserRole.PROWADZACY)
+    projector = Equipment(name="Projektor")
+    slots = [TimeSlots(id=i, start_time=time(6 + 2 * i), end_time=time(7 + 2 * i)) for i in range(1, 5)]
+    rooms = [
+        Room(name=f"S{i}", capacity=20 + i, type=RoomType.SEMINAR_ROOM, equipment=[projector] if i % 2 else [])
+        for i in range(n_rooms)
+    ]
+    db.add_all([teacher, leader, other, projector, *slots, *rooms])
+    db.flush()
+
+    group = Group(name="G1", leader_id=leader.id)
+    other_group = Group(name="G2", leader_id=other.id)
+    db.add_all([group, other_group])
+    db.flush()
+    course = Course(name="Algebra", teacher_id=teacher.id, group_id=group.id)
+    other_course = Course(name="Analiza", teacher_id=other.id, group_id=other_group.id)
+    db.add_all([course, other_course])
+    db.flush()
+
+    moved = CourseEvent(course_id=course.id, room_id=rooms[0].id, time_slot_id=1, day=ORIGIN)
+    db.add(moved)
+    for d in range(1, n_days + 1):
+        day = ORIGIN + timedelta(days=d)
+        db.add(CourseEvent(course_id=other_course.id, room_id=rooms[1].id, time_slot_id=2, day=day))
+        db.add(CourseEvent(course_id=course.id, room_id=rooms[0].id, time_slot_id=3, day=day))
+        db.add(RoomUnavailability(
+            room_id=rooms[3].id,
+            start_datetime=datetime.combine(day, time(0)),
+            end_datetime=datetime.combine(day, time(23)),
+        ))
+    db.flush()
+
+    change_request = ChangeRequest(
+        course_event_id=moved.id, initiator_id=teacher.id, reason="test", room_requirements="Projektor"
+    )
+    db.add(change_request)
+    db.flush()
+    db.add_all([
+        AvailabilityProposal(
+            change_request_id=change_request.id, user_id=user.id,
+            day=ORIGIN + timedelta(days=d), time_slot_id=slot.id,
+        )
+        for d in range(1, n_days + 1) for slot in slots for user in (teacher, leader)
+    ])
+    db.commit()
+    return change_request.id
+
+
+def run_counted(db, n_rooms: int, n_days: int):
+    change_request_id = seed(db, n_rooms, n_days)
+    db.expire_all()
+    change_request = db.get(ChangeRequest, change_request_id)
+    with count_queries(db) as statements:
+        candidates = compute_candidates(db, change_request, top_k=100_000)
+    return candidates, statements
+
+
+def test_query_count_is_bounded(db):
+    candidates, statements = run_counted(db, n_rooms=8, n_days=5)
+    assert candidates
+    # Grupa kursu, wspólne sloty, sale z wyposażeniem, maski wyposażenia (3),
+    # indeks zajętości (3), blokady sal (2) i zapisane rekomendacje
+    assert len(statements) <= 13, statements
+
+
+def test_query_count_does_not_grow_with_rooms_and_slots(db):
+    _, small = run_counted(db, n_rooms=4, n_days=2)
+
+    invalidate_occupancy_index()
+    invalidate_equipment_masks()
+    invalidate_unavailability_index()
+    large_db = make_session()
+    try:
+        candidates, large = run_counted(large_db, n_rooms=40, n_days=30)
+    finally:
+        large_db.close()
+        large_db.get_bind().dispose()
+
+    assert len(candidates) > 100
+    assert len(large) == len(small)
+
+
+def test_candidates_skip_conflicts(db):
+    candidates, _ = run_counted(db, n_rooms=8, n_days=2)
+    rooms = {room.name: room.id for room in db.query(Room).all()}
+
+    assert candidates
+    for candidate in candidates:
+        assert [e.name for e in candidate.room.equipment] == ["Projektor"]
+        assert candidate.time_slot_id != 3  # prowadzący ma wtedy zajęcia
+        assert (candidate.time_slot_id, candidate.room.id) != (2, rooms["S1"])  # sala zajęta
+        assert candidate.room.id != rooms["S3"]  # sala zablokowana
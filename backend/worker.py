@@ -0,0 +1,20 @@
+import logging
+import sys
+
+# Rejestruje obsługę wszystkich typów zadań
+import services.job_handlers  # noqa: F401
+import services.recommendation_invalidation  # noqa: F401
+from services.jobs import work
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print("Job worker started. Press Ctrl+C to stop.")
+    try:
+        work(once='--once' in sys.argv)
+    except KeyboardInterrupt:
+        print("Job worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
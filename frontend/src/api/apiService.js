@@ -1,6 +1,6 @@
 const API_BASE_URL = import.meta.env.VITE_API_URL || "";
 
-export const apiRequest = async (endpoint, options = {}) => {
+const sendRequest = async (endpoint, options = {}) => {
   const token = localStorage.getItem("token");
   const headers = {
     "Content-Type": "application/json",
@@ -26,9 +26,60 @@ export const apiRequest = async (endpoint, options = {}) => {
     throw new Error(errorData.detail || "An unknown error occurred.");
   }
 
+  return response;
+};
+
+export const apiRequest = async (endpoint, options = {}) => {
+  const response = await sendRequest(endpoint, options);
+
   if (response.status === 204) {
     return null;
   }
 
   return response.json();
 };
+
+// Pobiera wszystkie strony endpointu stronicowanego kursorem (nagłówek X-Next-Cursor)
+export const apiRequestAllPages = async (endpoint, options = {}) => {
+  const separator = endpoint.includes("?") ? "&" : "?";
+  const items = [];
+  let cursor = null;
+
+  do {
+    const url = cursor
+      ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}`
+      : endpoint;
+    const response = await sendRequest(url, options);
+    items.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return items;
+};
+
+// Jak apiRequest, ale zwraca też ścieżkę zadania w tle, gdy serwer odpowie 202 z nagłówkiem Location: /jobs/{id}
+export const apiRequestWithJob = async (endpoint, options = {}) => {
+  const response = await sendRequest(endpoint, options);
+  const data = response.status === 204 ? null : await response.json();
+  const jobPath = response.status === 202 ? response.headers.get("Location") : null;
+  return { data, jobPath };
+};
+
+// Odpytuje /jobs/{id}, aż zadanie się zakończy; rzuca błąd, gdy zadanie się nie powiodło
+export const waitForJob = async (
+  jobPath,
+  { interval = 2000, timeout = 10 * 60 * 1000 } = {}
+) => {
+  const deadline = Date.now() + timeout;
+  while (Date.now() < deadline) {
+    const job = await apiRequest(jobPath);
+    if (job.status === "SUCCEEDED") {
+      return job;
+    }
+    if (job.status === "FAILED") {
+      throw new Error(job.error || "Zadanie w tle zakończyło się błędem.");
+    }
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+  throw new Error("Przekroczono czas oczekiwania na zadanie w tle.");
+};
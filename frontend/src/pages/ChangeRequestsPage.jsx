@@ -11,7 +11,7 @@ import { format, parse, startOfWeek, getDay } from "date-fns";
 import { pl } from "date-fns/locale";
 import { useQuery } from "@tanstack/react-query";
 
-import { apiRequest } from "../api/apiService.js";
+import { apiRequestAllPages } from "../api/apiService.js";
 import { AuthContext } from "../contexts/AuthContext.jsx";
 import EventDialog from "../features/Calendar/EventDialog.jsx";
 import ChangeRequestDialog from "../features/Calendar/ChangeRequestDialog.jsx";
@@ -71,7 +71,7 @@ const useFilteredCalendarEvents = () => {
 
   const { data: allEvents = [], ...queryResult } = useQuery({
     queryKey: ["allEventsWithDetails"],
-    queryFn: () => apiRequest("/courses/events/all"),
+    queryFn: () => apiRequestAllPages("/courses/events/all"),
     enabled: !!user,
   });
 
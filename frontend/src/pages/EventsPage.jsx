@@ -14,7 +14,7 @@ import { useQuery } from "@tanstack/react-query";
 import { useCrud } from "../hooks/useCrud";
 import AdminDataGrid from "../features/Admin/AdminDataGrid";
 import EventFormDialog from "../features/Admin/EventFormDialog";
-import { apiRequest } from "../api/apiService";
+import { apiRequestAllPages } from "../api/apiService";
 
 const timeSlotMap = {
   1: "08:00-09:30",
@@ -50,7 +50,14 @@ const EventsPage = () => {
     error,
   } = useQuery({
     queryKey: ["allEvents"],
-    queryFn: () => apiRequest("/courses/events/all"),
+    // Najnowsze dni na górze, jak przed stronicowaniem
+    queryFn: () =>
+      apiRequestAllPages("/courses/events/all").then((items) =>
+        items.sort(
+          (a, b) =>
+            b.day.localeCompare(a.day) || a.time_slot_id - b.time_slot_id
+        )
+      ),
   });
 
   const {
@@ -30,7 +30,7 @@ import SearchIcon from "@mui/icons-material/Search";
 import HourglassTopIcon from "@mui/icons-material/HourglassTop";
 import EditIcon from "@mui/icons-material/Edit";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { apiRequest } from "../api/apiService.js";
+import { apiRequest, apiRequestWithJob, waitForJob } from "../api/apiService.js";
 import { format } from "date-fns";
 import { pl } from "date-fns/locale";
 import { AuthContext } from "../contexts/AuthContext.jsx";
@@ -210,6 +210,23 @@ const MyRecommendationsPage = () => {
         showNotification("Wygenerowano rekomendacje.", "success");
         break;
       }
+      if (res?.type === "job") {
+        // Rekomendacje liczy worker; odświeżamy listę, gdy zadanie się zakończy
+        anyRecommendationGenerated = true;
+        showNotification("Generowanie rekomendacji w tle…", "info");
+        waitForJob(`/jobs/${res.data.id}`)
+          .then(() => {
+            queryClient.invalidateQueries({
+              queryKey: ["recommendations", selectedRequestId],
+            });
+            refetchRecommendations();
+            showNotification("Wygenerowano rekomendacje.", "success");
+          })
+          .catch((error) =>
+            showNotification(`Błąd generowania rekomendacji: ${error.message}`, "error")
+          );
+        break;
+      }
     }
 
     if (!anyRecommendationGenerated) {
@@ -256,16 +273,33 @@ const MyRecommendationsPage = () => {
     replaceProposalsMutation.mutate(proposalsToAdd);
   };
 
+  const refreshAfterAccept = () => {
+    queryClient.invalidateQueries({ queryKey: ["related-requests-all"] });
+    queryClient.invalidateQueries({ queryKey: ["recommendations", selectedRequestId] });
+    queryClient.invalidateQueries({ queryKey: ["allEventsWithDetails"] });
+    refetchRecommendations();
+    refetchRecStatus();
+  };
+
   const acceptMutation = useMutation({
     mutationFn: (recommendationId) =>
-      apiRequest(`/recommendations/${recommendationId}/accept`, { method: "POST" }),
-    onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ["related-requests-all"] });
-      queryClient.invalidateQueries({ queryKey: ["recommendations", selectedRequestId] });
-      queryClient.invalidateQueries({ queryKey: ["allEventsWithDetails"] });
-      refetchRecommendations();
-      refetchRecStatus();
-      showNotification("Zaakceptowano propozycję. Czekamy na drugą stronę.", "info");
+      apiRequestWithJob(`/recommendations/${recommendationId}/accept`, { method: "POST" }),
+    onSuccess: ({ jobPath }) => {
+      refreshAfterAccept();
+      if (!jobPath) {
+        showNotification("Zaakceptowano propozycję. Czekamy na drugą stronę.", "info");
+        return;
+      }
+      // Zmiana cykliczna: cały semestr przenosi worker (202 + Location: /jobs/{id})
+      showNotification("Obie strony zaakceptowały. Przenoszenie zajęć w tle…", "info");
+      waitForJob(jobPath)
+        .then(() => {
+          refreshAfterAccept();
+          showNotification("Zmiana została zatwierdzona.", "success");
+        })
+        .catch((error) =>
+          showNotification(`Błąd zatwierdzania zmiany: ${error.message}`, "error")
+        );
     },
     onError: (error) =>
       showNotification(`Błąd akceptacji: ${error.message}`, "error"),